@@ -0,0 +1,133 @@
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+SUM_ANCHOR_AFTER_TODAY = 'סה"כ סכום יתרת חוב עד היום'   # I
+SUM_ANCHOR_TOTAL      = 'סה"כ סכום יתרת חוב'            # H
+
+# ממדי הקובייה: שם הממד -> עמודות אפשריות ב'מעובד' (הראשונה שקיימת)
+CUBE_DIMS = {
+    "מנהל סחר": ["מנהל סחר"],
+    "ערוץ": ["ערוץ"],
+    "מנהל אזור": ["מנהל אזור", "מנהל איזור"],
+    "סוכן": ["סוכן"],
+}
+EMPTY_AGENT_LABEL = "(ריק)"
+
+LabelPredicate = Callable[[str], bool]
+
+
+def _dynamic_month_cols(df_cols: List[str], anchor: str, max_cols: int = 4) -> List[str]:
+    if anchor in df_cols:
+        idx = df_cols.index(anchor)
+        return [c for c in df_cols[idx+1 : idx+1+max_cols] if c in df_cols]
+    return []
+
+
+def cube_sum_columns(df_cols: List[str], max_month_cols_after_today: int = 4) -> List[str]:
+    """H, I ו-J..M (דינמי) – אותן עמודות שהפיבוטים מסכמים."""
+    sum_cols: List[str] = []
+    if SUM_ANCHOR_TOTAL in df_cols: sum_cols.append(SUM_ANCHOR_TOTAL)
+    if SUM_ANCHOR_AFTER_TODAY in df_cols: sum_cols.append(SUM_ANCHOR_AFTER_TODAY)
+    dyn = _dynamic_month_cols(df_cols, SUM_ANCHOR_AFTER_TODAY, max_month_cols_after_today)
+    if not dyn and SUM_ANCHOR_TOTAL in df_cols:
+        dyn = _dynamic_month_cols(df_cols, SUM_ANCHOR_TOTAL, max_month_cols_after_today)
+    return sum_cols + dyn
+
+
+class AggCube:
+    """
+    קובייה מסוכמת אחת לכל הדוחות הנגזרים: groupby על (מנהל סחר, ערוץ, מנהל אזור, סוכן)
+    לפי קודים שלמים (factorize של astype(str)), עם סכום H, I ו-J..M לכל תא.
+
+    הסינונים של הדוחות (strip / _norm_text וכו') מופעלים על התוויות הייחודיות של כל ממד
+    ולא על כל שורה; פיבוט לפי סוכן = חיתוך של תאי הקובייה + rollup לפי סוכן.
+    לגיליונות ברמת שורה (w72) row_mask מחזיר את מסכת השורות מאותם קודים.
+    """
+
+    def __init__(self, df: pd.DataFrame, max_month_cols_after_today: int = 4):
+        cols = list(df.columns)
+        self.index = df.index
+        self.max_month_cols_after_today = max_month_cols_after_today
+        self.sum_cols = cube_sum_columns(cols, max_month_cols_after_today)
+
+        self.columns: Dict[str, str] = {}         # ממד -> עמודת המקור
+        self.codes: Dict[str, np.ndarray] = {}    # ממד -> קוד לכל שורה
+        self.labels: Dict[str, pd.Index] = {}     # ממד -> התוויות (astype(str)) לפי קוד
+        for dim, candidates in CUBE_DIMS.items():
+            src = next((c for c in candidates if c in cols), None)
+            if src is None:
+                continue
+            codes, uniques = pd.factorize(df[src].astype(str))
+            self.columns[dim] = src
+            self.codes[dim] = codes
+            self.labels[dim] = pd.Index(uniques, dtype=object)
+
+        values = pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce") for c in self.sum_cols}, index=df.index)
+        keys = [self.codes[d] for d in self.columns]
+        if keys and len(df):
+            grouped = values.groupby(keys, sort=False)
+            table = grouped.sum(min_count=1)
+            table["_rows"] = grouped.size()
+            self.table = table.reset_index(drop=True)
+            for level, dim in enumerate(self.columns):
+                self.table[dim] = table.index.get_level_values(level).to_numpy()
+        else:
+            self.table = pd.DataFrame(columns=self.sum_cols + ["_rows"] + list(self.columns))
+
+    def matches(self, df: pd.DataFrame, max_month_cols_after_today: int = 4) -> bool:
+        """האם הקובייה נבנתה מאותן שורות ואותן עמודות סכום (אחרת צריך לבנות חדשה)."""
+        return (
+            self.index.equals(df.index)
+            and self.max_month_cols_after_today == max_month_cols_after_today
+            and self.sum_cols == cube_sum_columns(list(df.columns), max_month_cols_after_today)
+        )
+
+    def has(self, *dims: str) -> bool:
+        return all(d in self.columns for d in dims)
+
+    def label_mask(self, dim: str, predicate: LabelPredicate) -> np.ndarray:
+        return np.fromiter((bool(predicate(s)) for s in self.labels[dim]), dtype=bool, count=len(self.labels[dim]))
+
+    def _mask(self, codes_of: Callable[[str], np.ndarray], size: int, filters: Dict[str, LabelPredicate]) -> np.ndarray:
+        mask = np.ones(size, dtype=bool)
+        for dim, predicate in filters.items():
+            mask &= self.label_mask(dim, predicate)[codes_of(dim)]
+        return mask
+
+    def row_mask(self, **filters: LabelPredicate) -> np.ndarray:
+        """מסכת שורות של ה-DataFrame המקורי: כל ממד -> פרדיקט על התווית (astype(str))."""
+        return self._mask(lambda d: self.codes[d], len(self.index), filters)
+
+    def cell_mask(self, **filters: LabelPredicate) -> np.ndarray:
+        """מסכה על תאי הקובייה, באותו פורמט כמו row_mask."""
+        return self._mask(lambda d: self.table[d].to_numpy(dtype=np.intp), len(self.table), filters)
+
+    def count(self, **filters: LabelPredicate) -> int:
+        """כמה שורות מקור עונות על הסינון (בלי לגעת בשורות עצמן)."""
+        return int(self.table["_rows"].to_numpy()[self.cell_mask(**filters)].sum())
+
+    def pivot_by_agent(self, cell_mask: np.ndarray) -> Optional[pd.DataFrame]:
+        """
+        rollup לפי 'סוכן' (strip, ריק -> '(ריק)') של התאים שנבחרו: עמודות סוכן, H, I, J..M.
+        None אם אין שורות / אין 'סוכן' / אין H ו-I – כמו _build_pivot_by_agent הקודם.
+        """
+        cells = self.table.loc[cell_mask]
+        if cells.empty or "סוכן" not in self.columns:
+            return None
+        if SUM_ANCHOR_TOTAL not in self.sum_cols and SUM_ANCHOR_AFTER_TODAY not in self.sum_cols:
+            return None
+
+        agent_col = self.columns["סוכן"]
+        agent = self.labels["סוכן"].to_series().str.strip()
+        agent[agent == ""] = EMPTY_AGENT_LABEL
+        by_agent = pd.Series(agent.to_numpy()[cells["סוכן"].to_numpy(dtype=np.intp)], index=cells.index, name=agent_col)
+        pivot = cells[self.sum_cols].groupby(by_agent).sum(min_count=1).reset_index()
+        return pivot[[agent_col] + self.sum_cols]
+
+
+def cube_for(df: pd.DataFrame, cube: Optional[AggCube] = None, max_month_cols_after_today: int = 4) -> AggCube:
+    """מחזיר את הקובייה המשותפת אם היא מתאימה ל-df, אחרת בונה אחת מ-df."""
+    if cube is not None and cube.matches(df, max_month_cols_after_today):
+        return cube
+    return AggCube(df, max_month_cols_after_today)
@@ -0,0 +1,335 @@
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+# הצורות שהפרויקט עצמו כותב (w71/w72/w73/w75 – שורת SUM, w90 – חיבורים, אחוזים והפניות לטאבי מנהלים)
+_REF = r"([A-Z]{1,3})(\d+)"
+_SUM = re.compile(rf"^=SUM\({_REF}:{_REF}\)$")
+_PLUS = re.compile(r"^=[A-Z]{1,3}\d+(?:\+[A-Z]{1,3}\d+)*$")
+_IFERROR_DIV = re.compile(rf"^=IFERROR\({_REF}/{_REF},0\)$")
+_MINUS = re.compile(rf"^={_REF}-{_REF}$")
+_SHEET_REF = re.compile(rf"^='((?:[^']|'')+)'!{_REF}$")
+_LOOKUP_LAST = re.compile(r"""^=LOOKUP\(2,1/\('((?:[^']|'')+)'!([A-Z]{1,3}):\2<>""\),'\1'!\2:\2\)$""")
+_REF_ONLY = re.compile(_REF)
+
+_CELL_F = re.compile(r'<c r="([A-Z]{1,3})(\d+)"([^>]*)><f>([^<]*)</f><v\s*/></c>')
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+class _ExcelError:
+    """#DIV/0! / #VALUE! – IFERROR תופס, כל נוסחה אחרת מעבירה הלאה."""
+
+
+_ERROR = _ExcelError()
+
+
+class _Unsupported(Exception):
+    """נוסחה שלא מהצורות המוכרות (או הפניה מעגלית) – נשארת בלי ערך מטמון."""
+
+
+def _is_number(v) -> bool:
+    if isinstance(v, (bool, np.bool_)):
+        return False
+    if isinstance(v, (int, np.integer)):
+        return True
+    return isinstance(v, (float, np.floating)) and not np.isnan(v)
+
+
+def _is_formula(v) -> bool:
+    return isinstance(v, str) and len(v) > 1 and v.startswith("=")
+
+
+class FormulaValues:
+    """
+    מחשב את ערכי הנוסחאות שהפרויקט כותב, על ה-Workbook שבזיכרון (כולל גוף גיליונות שעוד ממתין
+    לכתיבה ב-streaming – frame_of(name) מחזיר את ה-FrameSheet, או None לגיליון רגיל).
+    נוסחה בצורה אחרת / הפניה מעגלית / תוצאת שגיאה – לא מקבלת ערך (נשארת לחישוב של Excel).
+    """
+
+    def __init__(self, wb, frame_of: Optional[Callable[[str], object]] = None):
+        self.wb = wb
+        self.frame_of = frame_of or (lambda name: None)
+        self._rows: Dict[str, List[tuple]] = {}
+        self._columns: Dict[Tuple[str, int], List] = {}
+        self._memo: Dict[Tuple[str, int, int], object] = {}
+        self._active = set()
+
+    # ---------- קריאת תאים ----------
+    def _sheet_rows(self, sheet: str) -> List[tuple]:
+        if sheet not in self._rows:
+            self._rows[sheet] = list(self.wb[sheet].iter_rows(values_only=True))
+        return self._rows[sheet]
+
+    def _column(self, sheet: str, col: int) -> List:
+        """ערכי העמודה לפי שורה (אינדקס 0 = שורה 1)."""
+        key = (sheet, col)
+        if key not in self._columns:
+            rows = self._sheet_rows(sheet)
+            values = [r[col - 1] if col <= len(r) else None for r in rows]
+            frame = self.frame_of(sheet)
+            if frame is not None:
+                values = values[:1] + frame.body_column(col)
+            self._columns[key] = values
+        return self._columns[key]
+
+    def _raw(self, sheet: str, row: int, col: int):
+        values = self._column(sheet, col)
+        return values[row - 1] if row - 1 < len(values) else None
+
+    def value(self, sheet: str, row: int, col: int):
+        v = self._raw(sheet, row, col)
+        if _is_formula(v):
+            return self._formula(sheet, row, col, v)
+        if isinstance(v, (float, np.floating)) and np.isfinite(v):
+            # openpyxl שומר מספרים ב-16 ספרות משמעותיות – Excel מחשב מהערך השמור, לא מה-float שבזיכרון
+            return float("%.16g" % v)
+        return v
+
+    def _number(self, sheet: str, ref: Tuple[str, str]):
+        """ערך מספרי של הפניה בודדת: ריק = 0, טקסט = #VALUE!."""
+        v = self.value(sheet, int(ref[1]), column_index_from_string(ref[0]))
+        if v is None or v is _ERROR or _is_number(v):
+            return 0 if v is None else v
+        return _ERROR
+
+    # ---------- חישוב ----------
+    def _formula(self, sheet: str, row: int, col: int, text: str):
+        key = (sheet, row, col)
+        if key in self._memo:
+            result = self._memo[key]
+        else:
+            if key in self._active:
+                raise _Unsupported(f"circular reference at {sheet}!{get_column_letter(col)}{row}")
+            self._active.add(key)
+            try:
+                result = self._eval(sheet, text)
+            except _Unsupported as e:
+                result = e
+            finally:
+                self._active.discard(key)
+            self._memo[key] = result
+        if isinstance(result, _Unsupported):
+            raise result
+        return result
+
+    def _eval(self, sheet: str, text: str):
+        m = _SUM.match(text)
+        if m:
+            c1, r1, c2, r2 = column_index_from_string(m[1]), int(m[2]), column_index_from_string(m[3]), int(m[4])
+            total = 0
+            for c in range(min(c1, c2), max(c1, c2) + 1):
+                for r in range(min(r1, r2), max(r1, r2) + 1):
+                    v = self.value(sheet, r, c)
+                    if v is _ERROR:
+                        return _ERROR
+                    if _is_number(v):
+                        total += v
+            return total
+        if _PLUS.match(text):
+            total = 0
+            for ref in _REF_ONLY.findall(text):
+                v = self._number(sheet, ref)
+                if v is _ERROR:
+                    return _ERROR
+                total += v
+            return total
+        m = _IFERROR_DIV.match(text)
+        if m:
+            a, b = self._number(sheet, (m[1], m[2])), self._number(sheet, (m[3], m[4]))
+            if a is _ERROR or b is _ERROR or b == 0:
+                return 0
+            return a / b
+        m = _MINUS.match(text)
+        if m:
+            a, b = self._number(sheet, (m[1], m[2])), self._number(sheet, (m[3], m[4]))
+            if a is _ERROR or b is _ERROR:
+                return _ERROR
+            return a - b
+        m = _SHEET_REF.match(text)
+        if m:
+            tab = m[1].replace("''", "'")
+            if tab not in self.wb.sheetnames:
+                raise _Unsupported(f"unknown sheet {tab}")
+            v = self.value(tab, int(m[3]), column_index_from_string(m[2]))
+            return 0 if v is None else v
+        m = _LOOKUP_LAST.match(text)
+        if m:
+            tab = m[1].replace("''", "'")
+            if tab not in self.wb.sheetnames:
+                raise _Unsupported(f"unknown sheet {tab}")
+            col = column_index_from_string(m[2])
+            column = self._column(tab, col)
+            for r in range(len(column), 0, -1):
+                if column[r - 1] not in (None, ""):
+                    return self.value(tab, r, col)
+            return _ERROR
+        raise _Unsupported(text)
+
+    def cached_value(self, sheet: str, row: int, col: int):
+        """הערך של נוסחה בתא, או None אם אין לה ערך שניתן לשמור (צורה לא מוכרת / שגיאה / מעגל)."""
+        try:
+            v = self.value(sheet, row, col)
+        except _Unsupported:
+            return None
+        if v is _ERROR or not _is_number(v):
+            return None
+        return float(v) if isinstance(v, (float, np.floating)) else int(v)
+
+    # ---------- כל הנוסחאות בחוברת ----------
+    def _formula_cells(self, sheet: str):
+        frame = self.frame_of(sheet)
+        if frame is None:
+            for r, row in enumerate(self._sheet_rows(sheet), start=1):
+                for c, v in enumerate(row, start=1):
+                    if _is_formula(v):
+                        yield r, c
+            return
+        for c, v in enumerate(self._sheet_rows(sheet)[0] if self._sheet_rows(sheet) else (), start=1):
+            if _is_formula(v):
+                yield 1, c
+        for j in range(len(frame.header)):
+            col = frame.df.iloc[:, j]
+            if col.dtype != object:
+                continue
+            hits = np.flatnonzero(col.map(_is_formula).to_numpy(dtype=bool))
+            for i in hits:
+                yield 2 + int(i), j + 1
+        for k, spec in enumerate(frame.footer, start=1):
+            for c, (v, _, _) in spec.items():
+                if _is_formula(v):
+                    yield frame.data_last_row + k, c
+
+    def collect(self) -> Tuple[Dict[str, Dict[Tuple[int, int], object]], int]:
+        """({גיליון: {(שורה, עמודה): ערך}}, כמה נוסחאות נשארו בלי ערך)."""
+        values: Dict[str, Dict[Tuple[int, int], object]] = {}
+        unresolved = 0
+        for sheet in self.wb.sheetnames:
+            for r, c in self._formula_cells(sheet):
+                v = self.cached_value(sheet, r, c)
+                if v is None:
+                    unresolved += 1
+                else:
+                    values.setdefault(sheet, {})[(r, c)] = v
+        return values, unresolved
+
+
+# ---------- כתיבה ----------
+def _number_text(v) -> str:
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v)
+
+
+def _sheet_parts(z: zipfile.ZipFile) -> Dict[str, str]:
+    """שם גיליון -> נתיב ה-XML שלו בתוך הקובץ."""
+    rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    for rel in rels.iter(f"{_NS_PKG_REL}Relationship"):
+        target = rel.get("Target")
+        targets[rel.get("Id")] = target.lstrip("/") if target.startswith("/") else "xl/" + target
+    book = ET.fromstring(z.read("xl/workbook.xml"))
+    return {s.get("name"): targets[s.get(f"{_NS_REL}id")] for s in book.iter(f"{_NS_MAIN}sheet")}
+
+
+def _patch_cached_values(z: zipfile.ZipFile, out: zipfile.ZipFile,
+                         values: Dict[str, Dict[Tuple[int, int], object]], full_calc_on_load: bool) -> int:
+    written = 0
+    sheet_parts = _sheet_parts(z)
+    parts = {part: values[name] for name, part in sheet_parts.items() if values.get(name)}
+    for info in z.infolist():
+        data = z.read(info.filename)
+        if info.filename in parts:
+            sheet_values = parts[info.filename]
+
+            def _fill(m, sheet_values=sheet_values):
+                nonlocal written
+                v = sheet_values.get((int(m[2]), column_index_from_string(m[1])))
+                if v is None:
+                    return m[0]
+                written += 1
+                return f'<c r="{m[1]}{m[2]}"{m[3]}><f>{m[4]}</f><v>{_number_text(v)}</v></c>'
+
+            data = _CELL_F.sub(_fill, data.decode("utf-8")).encode("utf-8")
+        elif info.filename == "xl/workbook.xml" and not full_calc_on_load:
+            data = data.replace(b' fullCalcOnLoad="1"', b"")
+        out.writestr(info, data)
+    return written
+
+
+def write_cached_values(target, values: Dict[str, Dict[Tuple[int, int], object]],
+                        full_calc_on_load: bool = True) -> int:
+    """
+    מוסיף לקובץ xlsx שנשמר את ערכי המטמון (<v>) לצד הנוסחאות – openpyxl כותב נוסחה בלי ערך.
+    target: נתיב, או אובייקט קובץ בזיכרון (BytesIO) שמוחלף במקום, בלי קובץ זמני.
+    full_calc_on_load=False: מוריד את fullCalcOnLoad (כל הנוסחאות קיבלו ערך, אין צורך בחישוב מלא בפתיחה).
+    מחזיר כמה תאים עודכנו.
+    """
+    if hasattr(target, "read"):
+        target.seek(0)
+        patched = io.BytesIO()
+        with zipfile.ZipFile(target) as z, zipfile.ZipFile(patched, "w", zipfile.ZIP_DEFLATED) as out:
+            written = _patch_cached_values(z, out, values, full_calc_on_load)
+        target.seek(0)
+        target.truncate()
+        target.write(patched.getvalue())
+        target.seek(0)
+        return written
+
+    with zipfile.ZipFile(target) as z:
+        fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(target)))
+        os.close(fd)
+        try:
+            shutil.copymode(target, tmp)  # mkstemp יוצר 0600 – הקובץ המוחלף שומר על ההרשאות שהיו לו
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as out:
+                written = _patch_cached_values(z, out, values, full_calc_on_load)
+            os.replace(tmp, target)
+        except Exception:
+            os.remove(tmp)
+            raise
+    return written
+
+
+def replace_formulas_with_values(wb, values: Dict[str, Dict[Tuple[int, int], object]],
+                                 frame_of: Optional[Callable[[str], object]] = None) -> int:
+    """--values-only: כל נוסחה שחושבה נכתבת כמספר רגיל (בגיליון, או בשורת הסכום של FrameSheet ממתין)."""
+    frame_of = frame_of or (lambda name: None)
+    replaced = 0
+    for sheet, cells in values.items():
+        ws = wb[sheet]
+        frame = frame_of(sheet)
+        for (r, c), v in cells.items():
+            if frame is not None and r > frame.data_last_row:
+                frame.set_footer_value(r, c, v)
+            elif frame is not None and r > 1:
+                continue  # נוסחה בתוך גוף הנתונים של DataFrame – נשארת כמו שהיא
+            else:
+                ws.cell(row=r, column=c).value = v
+            replaced += 1
+    return replaced
+
+
+def save_session_with_values(session, values_only: bool = False, target=None,
+                             computed: Optional[Tuple[Dict, int]] = None, copied=None) -> Tuple[int, int]:
+    """
+    שומר את הסשן כשלצד כל נוסחה שחושבה נשמר גם ערכה (או, ב-values_only, רק הערך).
+    target: נתיב או BytesIO (ברירת מחדל: הנתיב של הסשן); computed: תוצאת collect() שכבר חושבה.
+    copied: SheetPartCopy – הגיליונות שלו נכתבים, באותה שמירה, מה-XML של הפלט הקודם.
+    מחזיר (כמה נוסחאות קיבלו ערך, כמה נשארו לחישוב של Excel).
+    """
+    values, unresolved = computed if computed is not None else FormulaValues(session.wb, session.frame).collect()
+    if values_only:
+        count = replace_formulas_with_values(session.wb, values, session.frame)
+        session.save_with_values(target, copied=copied)
+        return count, unresolved
+    # הערכים נכתבים לצד הנוסחאות תוך כדי השמירה (כתיבה אחת של הקובץ)
+    _, written = session.save_with_values(target, values, full_calc_on_load=unresolved > 0, copied=copied)
+    return written, unresolved
@@ -0,0 +1,251 @@
+import math
+from itertools import zip_longest
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_MAX_SIZE
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._reader import VALUE_TAG, WorkSheetParser, _cast_number
+
+"""
+השוואת שני קובצי פלט ("זהב" מול חדש) גיליון-גיליון: ערכים, נוסחאות (טקסט + הערך השמור), פורמט מספר,
+גופן, מילוי, גבולות, יישור, רוחבי עמודות, תאים ממוזגים ותצוגה (הקפאה / RTL).
+הקריאה בזרימה: ה-XML של כל גיליון נקרא שורה-שורה משני הקבצים במקביל (WorkSheetParser של openpyxl),
+והסגנונות נפתרים פעם אחת לכל style_id – כך שגם קבצים של מאות אלפי שורות לא נטענים לזיכרון.
+"""
+
+
+class Difference:
+    """הבדל אחד: גיליון, מיקום (תא / עמודה / '' לגיליון כולו), סוג ההבדל והערכים בשני הקבצים."""
+
+    def __init__(self, sheet: str, where: str, kind: str, a, b):
+        self.sheet = sheet
+        self.where = where
+        self.kind = kind
+        self.a = a
+        self.b = b
+
+    def __str__(self) -> str:
+        at = f"{self.sheet}!{self.where}" if self.where else self.sheet
+        return f"{at} [{self.kind}]: {self.a!r} | {self.b!r}"
+
+
+class _CellParser(WorkSheetParser):
+    """כמו WorkSheetParser, אבל בתא עם נוסחה נשמר גם הערך המחושב (<v>) – 'cached'."""
+
+    def parse_cell(self, element):
+        cell = super().parse_cell(element)
+        if cell["data_type"] == "f":
+            raw, t = element.findtext(VALUE_TAG, None) or None, element.get("t", "n")
+            if raw is None or t in ("str", "e", "s"):
+                cell["cached"] = raw
+            else:
+                cell["cached"] = bool(int(raw)) if t == "b" else _cast_number(raw)
+        return cell
+
+
+def _color(c) -> Optional[str]:
+    if c is None:
+        return None
+    return c.rgb if c.type == "rgb" else f"{c.type}:{c.value}"
+
+
+class _Book:
+    """קובץ פתוח לקריאה בזרימה: שמות גיליונות, מחרוזות משותפות וטבלאות הסגנונות."""
+
+    def __init__(self, path):
+        self.wb = load_workbook(path, read_only=True, data_only=False)
+        self._styles: Dict[int, tuple] = {}
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return self.wb.sheetnames
+
+    def style(self, style_id: int) -> tuple:
+        """(פורמט מספר, גופן, מילוי, גבולות, יישור) בצורה קומפקטית שאפשר להשוות בין קבצים."""
+        sig = self._styles.get(style_id)
+        if sig is None:
+            wb = self.wb
+            st = wb._cell_styles[style_id] if style_id < len(wb._cell_styles) else None
+            if st is None:
+                sig = ("General", None, None, None, None)
+            else:
+                fmt_id = st.numFmtId
+                fmt = (BUILTIN_FORMATS.get(fmt_id, "General") if fmt_id < BUILTIN_FORMATS_MAX_SIZE
+                       else wb._number_formats[fmt_id - BUILTIN_FORMATS_MAX_SIZE])
+                f = wb._fonts[st.fontId]
+                font = (f.name, f.sz, bool(f.b), bool(f.i), f.u, _color(f.color))
+                fl = wb._fills[st.fillId]
+                fill = (getattr(fl, "fill_type", None), _color(getattr(fl, "fgColor", None)),
+                        _color(getattr(fl, "bgColor", None))) if getattr(fl, "fill_type", None) else None
+                bd = wb._borders[st.borderId]
+                border = tuple((s.style, _color(s.color)) if s is not None and s.style else None
+                               for s in (bd.left, bd.right, bd.top, bd.bottom))
+                al = wb._alignments[st.alignmentId]
+                align = (al.horizontal, al.vertical, bool(al.wrap_text), bool(al.shrink_to_fit),
+                         al.indent, al.readingOrder)
+                sig = (fmt, font, fill, border, align)
+            self._styles[style_id] = sig
+        return sig
+
+    def open_sheet(self, name: str) -> _CellParser:
+        ws = self.wb[name]
+        return _CellParser(self.wb._archive.open(ws._worksheet_path), self.wb.shared_strings,
+                           date_formats=self.wb._date_formats, timedelta_formats=self.wb._timedelta_formats)
+
+    def close(self):
+        self.wb.close()
+
+
+def _rows(parser: _CellParser) -> Iterator[Tuple[int, Dict[int, dict]]]:
+    for idx, cells in parser.parse():
+        yield idx, {c["column"]: c for c in cells}
+
+
+def _aligned(pa: _CellParser, pb: _CellParser) -> Iterator[Tuple[int, Dict[int, dict], Dict[int, dict]]]:
+    """שורות משני הגיליונות לפי מספר השורה (שורה שחסרה באחד = שורה ריקה)."""
+    ia, ib = _rows(pa), _rows(pb)
+    ra, rb = next(ia, None), next(ib, None)
+    while ra is not None or rb is not None:
+        if rb is None or (ra is not None and ra[0] < rb[0]):
+            yield ra[0], ra[1], {}
+            ra = next(ia, None)
+        elif ra is None or rb[0] < ra[0]:
+            yield rb[0], {}, rb[1]
+            rb = next(ib, None)
+        else:
+            yield ra[0], ra[1], rb[1]
+            ra, rb = next(ia, None), next(ib, None)
+
+
+def _same_value(a, b, float_tol: float) -> bool:
+    if a == b and type(a) is type(b):
+        return True
+    num = (int, float)
+    if isinstance(a, num) and isinstance(b, num) and not isinstance(a, bool) and not isinstance(b, bool):
+        if math.isnan(a) and math.isnan(b):
+            return True
+        return a == b or abs(a - b) <= float_tol
+    return False
+
+
+def _widths(parser: _CellParser) -> Dict[str, Optional[float]]:
+    """רוחב לכל עמודה (טווח min..max נפרש לעמודות בודדות, כי כל כותב מקבץ אחרת)."""
+    out = {}
+    for attrs in parser.column_dimensions.values():
+        if attrs.get("customWidth") not in ("1", "true") or "width" not in attrs:
+            continue
+        for i in range(int(attrs["min"]), int(attrs.get("max", attrs["min"])) + 1):
+            out[get_column_letter(i)] = round(float(attrs["width"]), 4)
+    return out
+
+
+def _view(parser: _CellParser) -> Tuple[Optional[str], bool]:
+    views = getattr(parser, "views", None)
+    if views is None or not views.sheetView:
+        return None, False
+    v = views.sheetView[0]
+    frozen = v.pane.topLeftCell if v.pane is not None and v.pane.state in ("frozen", "frozenSplit") else None
+    return frozen, bool(v.rightToLeft)
+
+
+def _merged(parser: _CellParser) -> List[str]:
+    merged = parser.merged_cells
+    return sorted(m.ref for m in merged.mergeCell) if merged is not None else []
+
+
+_STYLE_PARTS = ("number_format", "font", "fill", "border", "alignment")
+_EMPTY = {"value": None, "data_type": "n", "style_id": 0}
+
+
+class SheetResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.shown: List[Difference] = []
+
+
+def compare_sheet(a: _Book, b: _Book, name: str, max_diffs: int = 20, ignore_style: bool = False,
+                  float_tol: float = 0.0, ignore_cached: bool = False) -> SheetResult:
+    """
+    משווה גיליון אחד; כל ההבדלים נספרים, רק max_diffs הראשונים נשמרים לתצוגה.
+    ignore_cached: נוסחאות מושוות רק לפי הטקסט (למשל מול פלט זהב שנשמר בלי ערכים מחושבים).
+    """
+    res = SheetResult(name)
+
+    def diff(where, kind, x, y):
+        res.count += 1
+        if len(res.shown) < max_diffs:
+            res.shown.append(Difference(name, where, kind, x, y))
+
+    pa, pb = a.open_sheet(name), b.open_sheet(name)
+    try:
+        for r, row_a, row_b in _aligned(pa, pb):
+            for c in sorted(set(row_a) | set(row_b)):
+                ca, cb = row_a.get(c, _EMPTY), row_b.get(c, _EMPTY)
+                va, vb = ca["value"], cb["value"]
+                fa, fb = ca["data_type"] == "f", cb["data_type"] == "f"
+                where = None
+                if fa or fb:
+                    if not (fa and fb) or str(va) != str(vb):
+                        where = f"{get_column_letter(c)}{r}"
+                        diff(where, "נוסחה" if fa and fb else "ערך", str(va) if fa else va, str(vb) if fb else vb)
+                    elif not ignore_cached and not _same_value(ca.get("cached"), cb.get("cached"), float_tol):
+                        where = f"{get_column_letter(c)}{r}"
+                        diff(where, "ערך מחושב", ca.get("cached"), cb.get("cached"))
+                elif not _same_value(va, vb, float_tol):
+                    where = f"{get_column_letter(c)}{r}"
+                    diff(where, "ערך", va, vb)
+                if ignore_style or ca["style_id"] == cb["style_id"] == 0:
+                    continue
+                sa, sb = a.style(ca["style_id"]), b.style(cb["style_id"])
+                if sa != sb:
+                    where = where or f"{get_column_letter(c)}{r}"
+                    for part, x, y in zip(_STYLE_PARTS, sa, sb):
+                        if x != y:
+                            diff(where, part, x, y)
+
+        # חלקי הגיליון שה-parser פוגש בדרך (cols / sheetViews / mergeCells) – זמינים רק אחרי סוף הקריאה
+        if not ignore_style:
+            wa, wb_ = _widths(pa), _widths(pb)
+            for col in sorted(set(wa) | set(wb_), key=lambda k: (len(k), k)):
+                if wa.get(col) != wb_.get(col):
+                    diff(col, "רוחב עמודה", wa.get(col), wb_.get(col))
+            if _view(pa) != _view(pb):
+                diff("", "תצוגה (הקפאה, RTL)", _view(pa), _view(pb))
+        ma, mb = _merged(pa), _merged(pb)
+        if ma != mb:
+            for x, y in zip_longest(sorted(set(ma) - set(mb)), sorted(set(mb) - set(ma))):
+                diff(x or y, "מיזוג", x, y)
+    finally:
+        pa.source.close()
+        pb.source.close()
+    return res
+
+
+def compare_workbooks(path_a, path_b, max_diffs: int = 20, ignore_style: bool = False, float_tol: float = 0.0,
+                      sheets: Optional[List[str]] = None, ignore_cached: bool = False) -> Tuple[int, List[SheetResult], List[str]]:
+    """
+    משווה שני קבצים. מחזיר (סה"כ הבדלים, תוצאה לכל גיליון משותף, הערות ברמת הקובץ – גיליונות חסרים / סדר שונה).
+    sheets: רק הגיליונות האלה (ברירת מחדל: כולם).
+    """
+    a, b = _Book(path_a), _Book(path_b)
+    try:
+        notes = []
+        names_a = [n for n in a.sheetnames if sheets is None or n in sheets]
+        names_b = [n for n in b.sheetnames if sheets is None or n in sheets]
+        only_a = [n for n in names_a if n not in names_b]
+        only_b = [n for n in names_b if n not in names_a]
+        if only_a:
+            notes.append(f"גיליונות רק ב-A: {only_a}")
+        if only_b:
+            notes.append(f"גיליונות רק ב-B: {only_b}")
+        common = [n for n in names_a if n in names_b]
+        if not only_a and not only_b and names_a != names_b:
+            notes.append(f"סדר הגיליונות שונה: {names_a} | {names_b}")
+        results = [compare_sheet(a, b, n, max_diffs, ignore_style, float_tol, ignore_cached) for n in common]
+        total = len(notes) + sum(r.count for r in results)
+        return total, results, notes
+    finally:
+        a.close()
+        b.close()
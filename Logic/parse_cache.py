@@ -0,0 +1,140 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+from typing import Dict, List, Optional
+
+CACHE_FORMAT = 1
+CACHE_EXT = ".pkl"
+
+_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# קבצי הקוד שמשפיעים על 'מעובד' (קריאה + ניקוי w10..w60) – שינוי בהם מבטל את כל הרשומות הקיימות
+_CODE_GLOBS = [
+    os.path.join("Logic", "headers_stage1.py"),
+    os.path.join("Logic", "utils.py"),
+    os.path.join("Logic", "row_rules.py"),
+    os.path.join("Logic", "w[1-6][0-9]_*.py"),
+    os.path.join("pipeline", "run_stage1.py"),
+]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_digest(source, chunk_size: int = 1 << 20) -> str:
+    """כמו file_digest, גם למקור בזיכרון: נתיב, bytes או אובייקט קובץ (המיקום בקובץ נשמר)."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    if not hasattr(source, "read"):
+        return file_digest(source, chunk_size)
+    h = hashlib.sha256()
+    pos = source.tell()
+    source.seek(0)
+    try:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            h.update(chunk)
+    finally:
+        source.seek(pos)
+    return h.hexdigest()
+
+
+def code_fingerprint(globs: Optional[List[str]] = None) -> str:
+    """גרסת הקוד לפי תוכן הקבצים שמתאימים ל-globs (ברירת מחדל: קבצי הקריאה והניקוי)."""
+    h = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for pattern in globs or _CODE_GLOBS:
+        for path in sorted(glob.glob(os.path.join(_BASE_DIR, pattern))):
+            h.update(os.path.relpath(path, _BASE_DIR).encode())
+            h.update(file_digest(path).encode())
+    return h.hexdigest()
+
+
+def cache_key(source, options: Dict[str, object], digest: Optional[str] = None) -> str:
+    """
+    מפתח לפי תוכן קובץ המקור (נתיב / bytes / אובייקט קובץ) + אפשרויות הניקוי + גרסת הקוד.
+    digest: source_digest שכבר חושב (כדי לא לקרוא את המקור פעמיים).
+    """
+    h = hashlib.sha256()
+    h.update((digest or source_digest(source)).encode())
+    h.update(json.dumps(options, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(code_fingerprint().encode())
+    return h.hexdigest()
+
+
+class ParseCache:
+    """
+    מטמון על הדיסק לתוצאת הקריאה והניקוי ('מעובד' + כותרות O..T מהמקור), לפי מפתח תוכן.
+    רשומה = קובץ pickle אחד; זמן השינוי של הקובץ מתעדכן בכל פגיעה, והפינוי הוא LRU לפי סך הגודל.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_EXT)
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception:
+            # רשומה פגומה/חלקית – כאילו לא קיימת
+            self._remove(path)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass  # תהליך מקביל (batch) פינה את הרשומה בינתיים
+        return payload
+
+    def put(self, key: str, payload: dict) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"  # ייחודי לתהליך: כמה עובדי batch יכולים לכתוב אותו מפתח
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """מוחק את הרשומות הישנות ביותר עד שסך הגודל <= max_bytes. מחזיר כמה נמחקו."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_EXT):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # נמחק ע"י תהליך מקביל
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
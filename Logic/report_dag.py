@@ -0,0 +1,171 @@
+import io
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from copy import copy
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+
+from Logic.run_report import RunReport, rss_bytes, sheet_cells, sheet_rows
+from Logic.sheet_writer import apply_layout, sheet_layout
+from Logic.workbook_session import WorkbookSession
+
+
+class ReportNode:
+    """
+    דוח נגזר אחד בגרף התלויות.
+    run(target, **inputs): בונה את הגיליונות שלו לתוך target (WorkbookSession), מדפיס את הלוג שלו
+        ותופס בעצמו את השגיאות שלו – בדיוק כמו בלוק ה-try/except הקודם; מחזיר False אם נכשל
+        (השלב נרשם ב-run_report עם status "error"), כל ערך אחר = הצליח.
+    inputs: שמות הנתונים המשותפים שהצומת מקבל (df_for_reports, cube, ...).
+    after: שמות הצמתים שהגיליונות שלהם חייבים להיות בסשן לפני שהצומת רץ.
+    צומת בלי after יכול לרוץ בתהליך עובד; צומת עם after רץ בתהליך הראשי אחרי שהתלויות הורכבו.
+    """
+
+    def __init__(self, name: str, run: Callable, inputs: Sequence[str] = (), after: Sequence[str] = (),
+                 enabled: bool = True):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.after = tuple(after)
+        self.enabled = enabled
+
+
+class SheetPart:
+    """
+    גיליון שנבנה בתהליך עובד, בצורה שעוברת בין תהליכים: ערכי התאים והעיצוב שלהם (עותקים של אובייקטי הסגנון),
+    שאר מאפייני הגיליון (sheet_layout – רוחבים, גובהים, תצוגה, מיזוגים, מסנן, עיצוב מותנה),
+    וה-FrameSheet הממתין (אם יש) – הגוף עצמו נשאר DataFrame.
+    """
+
+    def __init__(self, ws, frame=None):
+        self.title = ws.title
+        self.cells: List[Tuple[int, int, object, Optional[tuple]]] = []
+        for row in ws.iter_rows():
+            for c in row:
+                style = None
+                if c.has_style:
+                    style = (copy(c.font), copy(c.fill), copy(c.border), copy(c.alignment),
+                             c.number_format, copy(c.protection))
+                if c.value is not None or style is not None:
+                    self.cells.append((c.row, c.column, c.value, style))
+        self.layout = sheet_layout(ws)
+        self.frame = frame
+
+    def add_to(self, session: WorkbookSession):
+        ws = session.wb.create_sheet(title=self.title)
+        apply_layout(ws, self.layout)  # המיזוגים לפני התאים, כדי שהעיצוב של תאים ממוזגים יישמר
+        for r, c, value, style in self.cells:
+            cell = ws.cell(row=r, column=c, value=value)
+            if style is not None:
+                cell.font, cell.fill, cell.border, cell.alignment, cell.number_format, cell.protection = style
+        if self.frame is not None:
+            session.defer(ws, self.frame)
+        return ws
+
+
+def _rows_in(inputs: Dict[str, object]) -> Optional[int]:
+    rows = [len(v) for v in inputs.values() if isinstance(v, pd.DataFrame)]
+    return sum(rows) if rows else None
+
+
+def _run_node_in_worker(run: Callable, inputs: Dict[str, object], trace: bool = False, track_rss: bool = False,
+                        profile_path: Optional[str] = None):
+    """
+    בתהליך עובד: סשן streaming ריק משלו, הלוג נאסף לטקסט, וכל גיליון שנוצר חוזר כ-SheetPart.
+    מחזיר (לוג, גיליונות, הצליח, זמן קיר, זמן CPU, זיכרון) – המדידות נעשות כאן, בתהליך שעשה את העבודה.
+    profile_path: ה-pstats של הצומת נכתב ישירות מהתהליך העובד.
+    """
+    if trace:
+        tracemalloc.start()
+    prof = None
+    if profile_path:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+    t0, c0 = time.perf_counter(), time.process_time()
+    session = WorkbookSession.new(None, streaming=True)
+    log = io.StringIO()
+    with redirect_stdout(log):
+        ok = run(session, **inputs) is not False
+    parts = [SheetPart(session[name], session.frame(name)) for name in session.sheetnames]
+    wall_s, cpu_s = time.perf_counter() - t0, time.process_time() - c0
+    if prof is not None:
+        prof.disable()
+        prof.dump_stats(profile_path)
+    memory = {}
+    if trace:
+        memory["py_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+    if track_rss:
+        rss, peak = rss_bytes()
+        memory["rss_mb"], memory["rss_peak_mb"] = [None if v is None else round(v / (1024 * 1024), 1) for v in (rss, peak)]
+    return log.getvalue(), parts, ok, wall_s, cpu_s, memory
+
+
+def run_report_dag(session: WorkbookSession, nodes: Sequence[ReportNode], data: Dict[str, object],
+                   workers: int = 1, report: Optional[RunReport] = None) -> Dict[str, List[str]]:
+    """
+    מריץ את הצמתים הפעילים. הסדר ב-nodes הוא גם סדר הלשוניות בקובץ וסדר הלוג, ולכן הוא חייב להיות טופולוגי.
+    workers > 1: צמתים בלי תלויות נשלחים יחד למאגר תהליכים; התוצאות מורכבות לסשן לפי הסדר,
+    וצמתים עם תלויות רצים בתהליך הראשי כשהגיעו לתורם. workers == 1: הכל רץ ישירות על הסשן, כמו קודם.
+    report: כל צומת נרשם כשלב "report:<שם>" (זמנים, שורות נכנסות/יוצאות, תאים).
+    מחזיר {שם צומת: הגיליונות שהוסיף}.
+    """
+    active = [n for n in nodes if n.enabled]
+    seen = set()
+    for node in nodes:
+        missing = [d for d in node.after if d not in seen]
+        if missing:
+            raise ValueError(f"הצומת '{node.name}' מופיע לפני התלויות שלו: {missing}")
+        seen.add(node.name)
+
+    def _inputs(node):
+        return {k: data[k] for k in node.inputs}
+
+    report = report or RunReport()
+    pool = None
+    futures, profiles = {}, {}
+    roots = [n for n in active if not n.after]
+    if workers > 1 and len(roots) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(roots)))
+        profiles = {n.name: report.profiler.next_path(f"report:{n.name}") if report.profiler else None for n in roots}
+        futures = {n.name: pool.submit(_run_node_in_worker, n.run, _inputs(n), report.memory, report.tracks_rss,
+                                       profiles[n.name])
+                   for n in roots}
+
+    added: Dict[str, List[str]] = {}
+    try:
+        for node in active:
+            before = list(session.sheetnames)
+            inputs = _inputs(node)
+            fut = futures.get(node.name)
+            if fut is None:
+                with report.stage(f"report:{node.name}", rows_in=_rows_in(inputs)) as rec:
+                    ok = node.run(session, **inputs) is not False
+                if not ok:
+                    rec.status = "error"
+            else:
+                try:
+                    log, parts, ok, wall_s, cpu_s, memory = fut.result()
+                except Exception as e:  # התהליך עצמו נכשל (pickle / זיכרון) – רק הצומת הזה נופל
+                    print(f"שגיאה בבניית '{node.name}': {type(e).__name__}: {e}", flush=True)
+                    parts, wall_s, cpu_s, memory, status = [], 0.0, 0.0, {}, "error"
+                else:
+                    print(log, end="", flush=True)
+                    status = "ok" if ok else "error"
+                for part in parts:
+                    if part.title in session:
+                        del session.wb[part.title]
+                    part.add_to(session)
+                rec = report.add(f"report:{node.name}", wall_s, cpu_s, rows_in=_rows_in(inputs), status=status,
+                                 memory=memory)
+                if report.profiler is not None and profiles[node.name]:
+                    report.profiler.add_file(rec.name, profiles[node.name])
+            added[node.name] = [n for n in session.sheetnames if n not in before]
+            rec.rows_out = sum(sheet_rows(session, n) for n in added[node.name])
+            rec.cells = sum(sheet_cells(session, n) for n in added[node.name])
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return added
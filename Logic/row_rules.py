@@ -0,0 +1,105 @@
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+
+class ColumnForms:
+    """
+    הצורות המנורמלות של כל עמודה, מחושבות פעם אחת לכל הכללים:
+      text(col)   = astype(str).str.strip()       (מה שהשלבים w27/w50/w55/w60 עושים כל אחד לעצמו)
+      string(col) = astype("string").str.strip()  (w28/w52)
+    עמודה שכלל ColumnRule מחליף – הצורות שלה מחושבות מחדש מהערכים החדשים.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.replaced: Dict[str, pd.Series] = {}
+        self._cache: Dict[Tuple[str, str], pd.Series] = {}
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.df.columns
+
+    def raw(self, col: str) -> pd.Series:
+        if col in self.replaced:
+            return self.replaced[col]
+        return self.df[col]
+
+    def _form(self, col: str, kind: str, make: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        key = (col, kind)
+        if key not in self._cache:
+            self._cache[key] = make(self.raw(col))
+        return self._cache[key]
+
+    def text(self, col: str) -> pd.Series:
+        return self._form(col, "text", lambda s: s.astype(str).str.strip())
+
+    def string(self, col: str) -> pd.Series:
+        return self._form(col, "string", lambda s: s.astype("string").str.strip())
+
+    def replace(self, col: str, values: pd.Series):
+        self.replaced[col] = values
+        for key in [k for k in self._cache if k[0] == col]:
+            del self._cache[key]
+
+
+class RowRule:
+    """
+    כלל סינון: mask(forms) -> סדרה בוליאנית, True = למחוק.
+    title מודפס לפני הכלל (כותרת השלב), report אחריו – format עם n=מה שהכלל הזה הסיר
+    ועם ספירות הכללים הקודמים לפי שם.
+    """
+
+    def __init__(self, name: str, mask: Callable[[ColumnForms], pd.Series],
+                 title: Optional[str] = None, report: Optional[str] = None, report_zero: bool = True):
+        self.name = name
+        self.mask = mask
+        self.title = title
+        self.report = report
+        self.report_zero = report_zero
+
+
+class ColumnRule:
+    """
+    כלל שמחליף ערכי עמודה: values(forms) -> סדרה חדשה (None = בלי שינוי).
+    הכללים שאחריו רואים את הערכים החדשים.
+    """
+
+    def __init__(self, column: str, values: Callable[[ColumnForms], pd.Series], title: Optional[str] = None):
+        self.column = column
+        self.values = values
+        self.title = title
+
+
+Rule = Union[RowRule, ColumnRule]
+
+
+def apply_row_rules(df: pd.DataFrame, rules: List[Rule]) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    מריץ את הכללים לפי הסדר בלי להעתיק את ה-DataFrame: כל כלל מחושב על כל השורות,
+    והספירה שלו היא רק שורות שעוד לא הוסרו ע"י כלל קודם – אותן ספירות כמו בשרשרת הסינונים.
+    בסוף: .loc אחד על המסכה המשולבת + הצבת העמודות שהוחלפו.
+    מחזיר (df מסונן עם אינדקס 0..n-1, {שם כלל: כמה שורות הסיר}).
+    """
+    forms = ColumnForms(df)
+    keep = np.ones(len(df), dtype=bool)
+    counts: Dict[str, int] = {}
+    for rule in rules:
+        if rule.title:
+            print(rule.title, flush=True)
+        if isinstance(rule, ColumnRule):
+            values = rule.values(forms)
+            if values is not None:
+                forms.replace(rule.column, values)
+            continue
+        drop = rule.mask(forms)
+        # None = הכלל לא רלוונטי (העמודות חסרות) – לא מוחק כלום
+        drop = keep & False if drop is None else np.asarray(drop, dtype=bool) & keep
+        counts[rule.name] = n = int(drop.sum())
+        keep &= ~drop
+        if rule.report and (n or rule.report_zero):
+            print(rule.report.format(n=n, **counts), flush=True)
+
+    out = df.loc[keep].reset_index(drop=True)
+    for col, values in forms.replaced.items():
+        out[col] = values.loc[keep].reset_index(drop=True)
+    return out, counts
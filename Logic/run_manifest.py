@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Optional
+
+from Logic.parse_cache import code_fingerprint
+from Logic.utils import ts_now
+
+MANIFEST_NAME = "_run_manifest.json"
+MAX_ENTRIES = 500
+# כל הקוד שמשפיע על קובץ הפלט (ניקוי + דוחות נגזרים + חישוב נוסחאות + כתיבה)
+OUTPUT_CODE_GLOBS = [
+    os.path.join("Logic", "*.py"),
+    os.path.join("pipeline", "run_stage1.py"),
+]
+# הדגלים שמשנים את תוכן הפלט (לא: מטמון, מקביליות, מדידות, פרופיל)
+OUTPUT_OPTIONS = (
+    "sheet_name", "sum_header", "drop_empty", "keep_other",
+    "split_by_manager", "market_private", "market_tedmiti", "region_general",
+    "pivot_private", "pivot_tedmiti", "by_agent", "values_only",
+)
+REUSE_MODES = ("link", "copy", "report")
+
+
+def run_key(input_digest: str, config) -> str:
+    """תוכן ה-QS + הדגלים שמשפיעים על הפלט + גרסת הקוד -> מפתח לריצה שלמה."""
+    h = hashlib.sha256(input_digest.encode())
+    options = {name: getattr(config, name) for name in OUTPUT_OPTIONS}
+    h.update(json.dumps(options, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(code_fingerprint(OUTPUT_CODE_GLOBS).encode())
+    return h.hexdigest()
+
+
+def _stat_sig(path: str) -> Optional[list]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class RunManifest:
+    """
+    <output-dir>/_run_manifest.json: מפתח ריצה -> הפלט שנוצר ממנו (נתיב, גודל + זמן שינוי, שורות, מתי).
+    lookup מחזיר רשומה רק אם הקובץ עדיין קיים ולא השתנה מאז (למשל נפתח ונשמר ב-Excel).
+    הכתיבה אטומית (קובץ זמני + replace); שני תהליכי batch שכותבים יחד – לכל היותר רשומה אחת הולכת לאיבוד.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: Dict[str, dict]) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def lookup(self, key: str) -> Optional[dict]:
+        entry = self._load().get(key)
+        if entry is None or _stat_sig(entry.get("output", "")) != entry.get("sig"):
+            return None
+        return entry
+
+    def latest_with_parts(self) -> Optional[dict]:
+        """הרשומה האחרונה שנשמרו בה חתימות גיליונות (parts) ושהפלט שלה לא השתנה – בסיס ל---incremental."""
+        for entry in reversed(list(self._load().values())):
+            if entry.get("parts") and _stat_sig(entry.get("output", "")) == entry.get("sig"):
+                return entry
+        return None
+
+    def record(self, key: str, output: str, rows: Optional[int], source: str = "",
+               parts: Optional[Dict[str, str]] = None) -> None:
+        """parts: {שם גיליון: sheet_digest} של הגיליונות בפלט (לבנייה חלקית בריצה הבאה)."""
+        entries = self._load()
+        entries.pop(key, None)
+        entries[key] = {"output": output, "sig": _stat_sig(output), "rows": rows, "source": source, "when": ts_now()}
+        if parts:
+            entries[key]["parts"] = parts
+        # רשומות שהפלט שלהן נמחק / הישנות ביותר מעבר ל-MAX_ENTRIES יוצאות
+        live = {k: v for k, v in entries.items() if _stat_sig(v.get("output", "")) is not None}
+        self._save(dict(list(live.items())[-MAX_ENTRIES:]))
+
+
+def reuse_output(previous: str, target: str, mode: str = "link") -> str:
+    """
+    הפלט הקודם תחת השם החדש: link – hard link (נופל להעתקה אם מערכת הקבצים לא תומכת), copy – העתקה,
+    report – בלי קובץ חדש. מחזיר את הנתיב של הפלט לריצה הזו.
+    """
+    if mode == "report" or os.path.abspath(previous) == os.path.abspath(target):
+        return previous
+    if os.path.exists(target):
+        os.remove(target)
+    if mode == "link":
+        try:
+            os.link(previous, target)
+            return target
+        except OSError:
+            pass
+    shutil.copy2(previous, target)
+    return target
@@ -0,0 +1,314 @@
+import _thread
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from Logic.stage_profile import StageProfiler
+
+_MB = 1024 * 1024
+
+
+class MemoryBudgetExceeded(Exception):
+    """שיא הזיכרון של התהליך עבר את --memory-budget; stage = השלב שבו זה קרה."""
+
+    def __init__(self, stage: str, peak_mb: float, budget_mb: float):
+        self.stage, self.peak_mb, self.budget_mb = stage, peak_mb, budget_mb
+        super().__init__(f"חריגה מתקציב הזיכרון בשלב '{stage}': שיא {peak_mb:.0f}MB > תקציב {budget_mb:.0f}MB")
+
+
+def _windows_memory() -> Tuple[Optional[int], Optional[int]]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None, None
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+def rss_bytes() -> Tuple[Optional[int], Optional[int]]:
+    """
+    (RSS נוכחי, שיא RSS של התהליך מההתחלה) בבתים, בלי תלויות חיצוניות:
+    Linux – /proc/self/status (VmRSS / VmHWM), Windows – GetProcessMemoryInfo, אחרת – getrusage (שיא בלבד).
+    None = לא ידוע בפלטפורמה הזו.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            found = {}
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith(("VmRSS:", "VmHWM:")):
+                        key, value = line.split(":", 1)
+                        found[key] = int(value.split()[0]) * 1024
+            return found.get("VmRSS"), found.get("VmHWM")
+        if sys.platform == "win32":
+            return _windows_memory()
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None, None
+
+
+def _mb(n: Optional[int]) -> Optional[float]:
+    return None if n is None else round(n / _MB, 1)
+
+
+def _await_interrupt(timeout: float = 1.0) -> None:
+    """KeyboardInterrupt שכבר נשלח לחוט הראשי מגיע בבדיקת האותות הבאה – מחכים לו כאן, עוד בתוך השלב."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+
+class _RssWatchdog:
+    """
+    בדיקת התקציב בזמן השלב ולא רק בסופו: חוט רקע דוגם את ה-RSS כל interval שניות, ובחריגה שולח
+    KeyboardInterrupt לחוט הראשי (_thread.interrupt_main), ש-RunReport.stage ממיר ל-MemoryBudgetExceeded.
+    פעולת C ארוכה אחת (למשל groupby של pandas) נקטעת רק כשהיא חוזרת לפייתון.
+    """
+
+    def __init__(self, budget_mb: float, interval: float):
+        self.budget_mb = budget_mb
+        self.interval = interval
+        self.breach_mb: Optional[float] = None  # ה-RSS שנמדד בחריגה (None = לא הייתה)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def watch(self):
+        self.breach_mb = None
+        stop = threading.Event()
+        thread = threading.Thread(target=self._run, args=(stop,), name="rss-watchdog", daemon=True)
+        thread.start()
+        delivered = False
+        try:
+            yield
+        except KeyboardInterrupt:
+            delivered = True
+            raise
+        finally:
+            with self._lock:  # אחרי stop החוט כבר לא שולח כלום
+                stop.set()
+            thread.join()
+            if self.breach_mb is not None and not delivered:
+                _await_interrupt()
+
+    def _run(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            rss, peak = rss_bytes()
+            current = rss if rss is not None else peak
+            if current is None:
+                return
+            if current / _MB > self.budget_mb:
+                with self._lock:
+                    if not stop.is_set():
+                        self.breach_mb = _mb(current)
+                        _thread.interrupt_main()
+                return
+
+
+class StageRecord:
+    """
+    שלב אחד בריצה: זמן קיר, זמן CPU, שורות נכנסות/יוצאות ותאים שנכתבו (None = לא רלוונטי לשלב).
+    עם מדידת זיכרון: py_peak_mb – שיא הקצאות פייתון/numpy בתוך השלב (tracemalloc),
+    rss_peak_mb – שיא ה-RSS של התהליך עד סוף השלב, rss_mb – ה-RSS בסוף השלב.
+    """
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.cells: Optional[int] = None
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.status = "ok"
+        self.py_peak_mb: Optional[float] = None
+        self.rss_peak_mb: Optional[float] = None
+        self.rss_mb: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "stage": self.name,
+            "status": self.status,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "cells_written": self.cells,
+            "py_peak_mb": self.py_peak_mb,
+            "rss_peak_mb": self.rss_peak_mb,
+            "rss_mb": self.rss_mb,
+        }
+
+
+class RunReport:
+    """
+    מדידות של ריצה אחת של שלב 1, לפי סדר השלבים. כל שלב נמדד ב-with report.stage(...):
+        with report.stage("normalize_numeric", rows_in=len(df)) as st:
+            df = ...
+            st.rows_out = len(df)
+    בסוף: write(path) -> run_report.json, ו-summary_lines() לטבלה בסוף הלוג.
+
+    memory=True: גם tracemalloc (יש לו מחיר בזמן ריצה) ו-RSS לכל שלב.
+    budget_mb: בזמן כל שלב חוט רקע דוגם RSS כל watch_interval שניות (_RssWatchdog), ובסוף השלב נבדק גם שיא ה-RSS;
+    חריגה -> MemoryBudgetExceeded עם שם השלב. מחוץ לחוט הראשי, או כש-SIGINT מטופל בידי מישהו אחר,
+    אין דגימה באמצע – רק הבדיקה בסוף השלב.
+    profile_dir: cProfile נפרד לכל שלב (StageProfiler); בלי הדגל אין שום פרופיילר פעיל.
+    """
+
+    def __init__(self, source: str = "", memory: bool = False, budget_mb: Optional[float] = None,
+                 profile_dir: Optional[str] = None, watch_interval: float = 0.1):
+        self.source = source
+        self.memory = memory
+        self.budget_mb = budget_mb
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.stages: List[StageRecord] = []
+        self.output: Optional[str] = None
+        self.path: Optional[str] = None  # לאן נכתב run_report.json (גם כשהריצה נעצרת על תקציב הזיכרון)
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.profiler = StageProfiler(profile_dir) if profile_dir else None
+        can_interrupt = (threading.current_thread() is threading.main_thread()
+                         and signal.getsignal(signal.SIGINT) is signal.default_int_handler)
+        self._watchdog = _RssWatchdog(budget_mb, watch_interval) if budget_mb is not None and can_interrupt else None
+
+    @property
+    def tracks_rss(self) -> bool:
+        return self.memory or self.budget_mb is not None
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        rec = StageRecord(name, rows_in)
+        self.stages.append(rec)
+        if self.memory:
+            tracemalloc.reset_peak()
+        prof = self.profiler.start() if self.profiler is not None else None
+        t0, c0 = time.perf_counter(), time.process_time()
+        watchdog = self._watchdog
+        breach_mb = None
+        try:
+            if watchdog is None:
+                yield rec
+            else:
+                with watchdog.watch():
+                    yield rec
+        except KeyboardInterrupt:
+            breach_mb = watchdog.breach_mb if watchdog is not None else None
+            if breach_mb is None:  # Ctrl+C אמיתי
+                rec.status = "error"
+                raise
+        except BaseException:
+            rec.status = "error"
+            raise
+        finally:
+            rec.wall_s = time.perf_counter() - t0
+            rec.cpu_s = time.process_time() - c0
+            if prof is not None:
+                self.profiler.stop(name, prof)
+            if self.memory:
+                rec.py_peak_mb = _mb(tracemalloc.get_traced_memory()[1])
+            if self.tracks_rss:
+                rss, peak = rss_bytes()
+                rec.rss_mb, rec.rss_peak_mb = _mb(rss), _mb(peak)
+        if breach_mb is not None:  # נקטע באמצע – הדגימה היא לפחות השיא
+            rec.rss_peak_mb = max(rec.rss_peak_mb or 0.0, breach_mb)
+        self.check_budget(rec, breached=breach_mb is not None)
+
+    def add(self, name: str, wall_s: float, cpu_s: float, rows_in: Optional[int] = None,
+            rows_out: Optional[int] = None, cells: Optional[int] = None, status: str = "ok",
+            memory: Optional[Dict[str, Optional[float]]] = None) -> StageRecord:
+        """שלב שנמדד במקום אחר (למשל בתהליך עובד); memory: {py_peak_mb, rss_peak_mb, rss_mb} של אותו תהליך."""
+        rec = StageRecord(name, rows_in)
+        rec.rows_out, rec.cells, rec.wall_s, rec.cpu_s, rec.status = rows_out, cells, wall_s, cpu_s, status
+        for key, value in (memory or {}).items():
+            setattr(rec, key, value)
+        self.stages.append(rec)
+        self.check_budget(rec)
+        return rec
+
+    def check_budget(self, rec: StageRecord, breached: bool = False) -> None:
+        """breached: ה-watchdog כבר מצא חריגה באמצע השלב."""
+        if breached or (self.budget_mb is not None and rec.rss_peak_mb is not None and rec.rss_peak_mb > self.budget_mb):
+            rec.status = "over_budget"
+            if self.path:
+                try:
+                    self.write(self.path)
+                except OSError:
+                    pass
+            raise MemoryBudgetExceeded(rec.name, rec.rss_peak_mb, self.budget_mb)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "source": self.source,
+            "output": self.output,
+            "started": self.started,
+            "wall_s": round(time.perf_counter() - self._t0, 4),
+            "cpu_s": round(time.process_time() - self._c0, 4),
+            "memory_budget_mb": self.budget_mb,
+            "stages": [s.to_dict() for s in self.stages],
+        }
+
+    def write(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def summary_lines(self) -> List[str]:
+        data = self.to_dict()
+        width = max([len(s.name) for s in self.stages] + [5])
+        mem = self.tracks_rss
+        lines = [f"    {'שלב':<{width}} {'קיר(ש)':>8} {'CPU(ש)':>8} {'שורות נכנסות':>12} {'שורות יוצאות':>12} {'תאים':>10}"
+                 + (f" {'שיא פייתון MB':>13} {'שיא RSS MB':>10}" if mem else "")]
+        for s in self.stages:
+            cells = [
+                "" if v is None else str(v) for v in (s.rows_in, s.rows_out, s.cells, s.py_peak_mb, s.rss_peak_mb)
+            ]
+            lines.append(f"    {s.name:<{width}} {s.wall_s:>8.3f} {s.cpu_s:>8.3f} {cells[0]:>12} {cells[1]:>12} {cells[2]:>10}"
+                         + (f" {cells[3]:>13} {cells[4]:>10}" if mem else "")
+                         + ("" if s.status == "ok" else f"  [{s.status}]"))
+        total = 'סה"כ'
+        lines.append(f"    {total:<{width}} {data['wall_s']:>8.3f} {data['cpu_s']:>8.3f}")
+        return lines
+
+
+def report_path_for(out_path: str) -> str:
+    """run_report.json ליד קובץ הפלט: <שם הפלט>.run_report.json (כמה ריצות באותה תיקייה לא דורסות זו את זו)."""
+    return os.path.splitext(out_path)[0] + ".run_report.json"
+
+
+def sheet_cells(session, name: str) -> int:
+    """כמה תאים ייכתבו לגיליון: גיליון FrameSheet ממתין – לפי ה-DataFrame ושורות הסיכום, גיליון רגיל – תאים עם ערך."""
+    frame = session.frame(name)
+    ws = session[name]
+    header = sum(1 for c in ws._cells.values() if c.value is not None)
+    if frame is None:
+        return header
+    return header + int(frame.df.notna().to_numpy().sum()) + sum(len(spec) for spec in frame.footer)
+
+
+def sheet_rows(session, name: str) -> int:
+    """מספר שורות הנתונים בגיליון (בלי הכותרת)."""
+    frame = session.frame(name)
+    if frame is not None:
+        return len(frame.df)
+    return max(session[name].max_row - 1, 0)
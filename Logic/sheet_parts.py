@@ -0,0 +1,153 @@
+import hashlib
+import json
+import re
+import zipfile
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.packaging.relationship import RelationshipList
+from openpyxl.styles.numbers import BUILTIN_FORMATS, BUILTIN_FORMATS_MAX_SIZE
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.worksheet._writer import WorksheetWriter, create_temporary_file
+from openpyxl.xml.functions import fromstring
+
+from Logic.formula_values import _sheet_parts
+from Logic.parse_cache import code_fingerprint
+from Logic.sheet_writer import sheet_layout
+
+"""
+בנייה מחדש חלקית (--incremental): גיליון FrameSheet שהתוכן שלו זהה לגיליון באותו שם בפלט הקודם
+לא נכתב מחדש – ה-XML שלו מועתק מהקובץ הקודם כמו שהוא (כולל ערכי הנוסחאות השמורים).
+openpyxl כותב מחרוזות inline, ולכן הדבר היחיד ב-XML של גיליון שתלוי בשאר הקובץ הוא מספרי הסגנונות (s="N"):
+הם ממופים לסגנונות שווים בחוברת החדשה (ומה שחסר נוסף לה) לפני שטבלת הסגנונות נכתבת – הכל בשמירה אחת.
+"""
+
+# הקוד שקובע איך גיליון FrameSheet נראה ב-XML – שינוי בו פוסל את כל החתימות הקודמות
+RENDER_CODE_GLOBS = [
+    "Logic/sheet_writer.py",
+    "Logic/workbook_session.py",
+    "Logic/formula_values.py",
+    "Logic/sheet_parts.py",
+]
+_CELL_STYLE = re.compile(rb'(<c r="[A-Z]{1,3}\d+") s="(\d+)"')
+
+
+def _style_sig(cell) -> str:
+    if not cell.has_style:
+        return ""
+    return repr((cell.font, cell.fill, cell.border, cell.alignment, cell.number_format, cell.protection))
+
+
+def _value_types(col: pd.Series) -> bytes:
+    # hash_pandas_object ממיר object למחרוזת: 1 ו-"1" נותנים אותה חתימה, אבל נכתבים לתא אחרת
+    if col.dtype != object:
+        return str(col.dtype).encode()
+    return pd.util.hash_pandas_object(col.map(lambda v: type(v).__name__), index=False).to_numpy().tobytes()
+
+
+def render_salt(values_only: bool) -> str:
+    return f"{code_fingerprint(RENDER_CODE_GLOBS)}|{openpyxl.__version__}|{values_only}"
+
+
+def sheet_digest(session, name: str, salt: str = "") -> Optional[str]:
+    """
+    חתימת התוכן של גיליון FrameSheet כפי שייכתב: ה-DataFrame (ערכים + סוגים), שורות הסיכום,
+    פורמטים, התאים שכבר בגיליון (הכותרת) ועיצובם, ו-sheet_layout (רוחבים, תצוגה, מיזוגים...).
+    None לגיליון רגיל (הוא תמיד נכתב מחדש).
+    """
+    frame = session.frame(name)
+    if frame is None:
+        return None
+    ws = session[name]
+    df = frame.df
+    h = hashlib.sha256(salt.encode())
+    h.update(json.dumps([
+        [str(c) for c in frame.header], len(df), frame.blank_na, sorted(frame.number_formats.items()),
+        repr(frame.footer),
+        [[(c.column, repr(c.value), _style_sig(c)) for c in row] for row in ws.iter_rows()],
+        sorted(sheet_layout(ws).items()),
+    ], ensure_ascii=False, default=str).encode("utf-8"))
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        for j in range(df.shape[1]):
+            h.update(_value_types(df.iloc[:, j]))
+    return h.hexdigest()
+
+
+class _RawSheetWriter(WorksheetWriter):
+    """כותב של גיליון write-only שה-XML שלו כבר מוכן: הבייטים נכתבים כמו שהם במקום השורות."""
+
+    def __init__(self, ws, data: bytes):
+        self.ws = ws
+        self.out = create_temporary_file()
+        self._rels = RelationshipList()
+        self.xf = None
+        with open(self.out, "wb") as f:
+            f.write(data)
+
+    def write_top(self):
+        pass
+
+    def write_rows(self):
+        pass
+
+    def write_tail(self):
+        pass
+
+
+class SheetPartCopy:
+    """
+    הגיליונות (לפי שם) שה-XML שלהם נלקח מ-source (קובץ פלט קודם).
+    נבדק מראש – לפני השמירה – שלכל אחד יש חלק XML בלי קשרים נוספים (rels); names = מה שבאמת יועתק.
+    בשמירה (WorkbookSession.save_with_values) כל גיליון כזה נכתב ב-write_to – באותה כתיבה של הקובץ החדש.
+    """
+
+    def __init__(self, source: str, names: Iterable[str]):
+        self.source = source
+        self.xml: Dict[str, bytes] = {}
+        with zipfile.ZipFile(source) as z:
+            parts = _sheet_parts(z)
+            entries = set(z.namelist())
+            for name in names:
+                part = parts.get(name)
+                if part is None or part not in entries:
+                    continue
+                rels = part.rsplit("/", 1)
+                if f"{rels[0]}/_rels/{rels[1]}.rels" in entries:
+                    continue  # יש לגיליון קשרים (hyperlinks / ציורים) – לא מעתיקים חלק בודד
+                xml = z.read(part)
+                if b"dxfId=" in xml:
+                    continue  # עיצוב מותנה מפנה לטבלת dxf של הקובץ הקודם
+                self.xml[name] = xml
+            self._styles = Stylesheet.from_tree(fromstring(z.read("xl/styles.xml"))) if self.xml else None
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.xml)
+
+    def _style_id(self, wo, old_id: int) -> int:
+        """סגנון old_id של הקובץ הקודם, כמספר סגנון בחוברת החדשה (נוסף לטבלת הסגנונות שלה אם חסר)."""
+        ss = self._styles
+        st = ss.cell_styles[old_id]
+        cell = WriteOnlyCell(wo)
+        cell.font = ss.fonts[st.fontId]
+        cell.fill = ss.fills[st.fillId]
+        cell.border = ss.borders[st.borderId]
+        cell.alignment = ss.alignments[st.alignmentId]
+        cell.protection = ss.protections[st.protectionId]
+        cell.number_format = (BUILTIN_FORMATS.get(st.numFmtId, "General") if st.numFmtId < BUILTIN_FORMATS_MAX_SIZE
+                              else ss.number_formats[st.numFmtId - BUILTIN_FORMATS_MAX_SIZE])
+        return cell.style_id
+
+    def write_to(self, wo) -> None:
+        """כותב לגיליון write-only wo (בשם זהה) את ה-XML מהקובץ הקודם, עם מספרי סגנונות של החוברת החדשה."""
+        mapping: Dict[bytes, bytes] = {}
+
+        def remap(m) -> bytes:
+            old_id = m[2]
+            if old_id not in mapping:
+                mapping[old_id] = str(self._style_id(wo, int(old_id))).encode()
+            return m[1] + b' s="' + mapping[old_id] + b'"'
+
+        wo._writer = _RawSheetWriter(wo, _CELL_STYLE.sub(remap, self.xml[wo.title]))
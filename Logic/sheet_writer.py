@@ -0,0 +1,323 @@
+from copy import copy
+from typing import Callable, Dict, Iterable, List, Optional
+import pandas as pd
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell._writer import _set_attributes, write_cell
+from openpyxl.comments.comment_sheet import CommentRecord
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.xml.functions import Element, SubElement
+
+HEADER_FILL = "F0F0F0"
+NUMBER_FMT = '#,##0.00'
+SUM_LABEL = "סכום :"
+
+
+def _width_for(max_len: int) -> float:
+    # אותה נוסחה כמו ב-_autosize של כל הבונים
+    return min(max(12, max_len + 2), 60)
+
+
+def _as_excel_value(v):
+    """המרה כמו ב-to_excel של pandas: NA -> ריק, סקלרים של numpy -> int/float של פייתון."""
+    if v is None:
+        return None
+    if pd.api.types.is_scalar(v) and pd.isna(v):
+        return None
+    if pd.api.types.is_integer(v) and not isinstance(v, bool):
+        return int(v)
+    if pd.api.types.is_float(v):
+        return float(v)
+    return v
+
+
+class FrameSheet:
+    """
+    גיליון שמוגדר מראש מתוך DataFrame: עיצוב כותרת, רוחבי עמודות, פורמט מספרים ושורת ה-SUM
+    נקבעים לפני כתיבת השורות. השורות נכתבות ישירות ממערכי העמודות (בלי iterrows),
+    ואין צורך לסרוק שוב את התאים אחרי הכתיבה (_autosize / _style_header).
+
+    number_formats: {עמודה 1-based: פורמט} – מוחל רק על תאים מספריים (כמו _apply_number_formats).
+    blank_na: ערכי NA נכתבים כריקים (ההתנהגות של to_excel ב'מעובד'); אחרת הערכים נכתבים כמו ws.append(row.tolist()).
+    header_border: מסגרת דקה סביב תאי הכותרת (מה ש-pandas מוסיף ב'מעובד').
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        number_formats: Optional[Dict[int, str]] = None,
+        blank_na: bool = False,
+        header_border: bool = False,
+    ):
+        self.df = df
+        self.header = list(df.columns)
+        self.number_formats = dict(number_formats or {})
+        self.blank_na = blank_na
+        self.header_border = header_border
+        # שורות אחרי הנתונים: [] = שורה ריקה, {עמודה: (ערך, bold, number_format)} = שורת סכום
+        self.footer: List[Dict[int, tuple]] = []
+        self.widths: Dict[int, float] = {}
+
+    # ---------- הגדרות מראש ----------
+    @property
+    def data_last_row(self) -> int:
+        return 1 + len(self.df)
+
+    def add_sum_footer(self, label_col: int, first_col: int, last_col: int, skip_if_empty: bool = False):
+        """
+        שורת סכום שתי שורות מתחת לנתונים: 'סכום :' בעמודה label_col ו-=SUM לכל first_col..last_col.
+        הנוסחאות נכתבות כבר עכשיו לפי מספר השורות הנוכחי (כמו שנכתבו קודם לתאים אחרי ה-append).
+        """
+        last_row = self.data_last_row
+        if skip_if_empty and last_row < 2:
+            return
+        row = {label_col: (SUM_LABEL, True, None)}
+        for col in range(first_col, last_col + 1):
+            letter = get_column_letter(col)
+            row[col] = (f"=SUM({letter}2:{letter}{last_row})", True, NUMBER_FMT)
+        self.footer = [{}, row]
+
+    def footer_row(self, col: int) -> Optional[int]:
+        """
+        מספר השורה בגיליון של תא שורת הסכום בעמודה col (השורה האחרונה שיש בה ערך בעמודה הזו),
+        או None אם לשורות שאחרי הנתונים אין ערך בעמודה.
+        """
+        row = None
+        for k, spec in enumerate(self.footer, start=1):
+            if spec.get(col, (None,))[0] not in (None, ""):
+                row = self.data_last_row + k
+        return row
+
+    def body_column(self, col: int) -> List:
+        """ערכי עמודה col (1-based) כפי שייכתבו מתחת לכותרת: שורות הנתונים ואז השורות שאחרי הנתונים."""
+        values = list(self._column_values(col - 1)) if col <= len(self.header) else [None] * len(self.df)
+        for spec in self.footer:
+            values.append(spec[col][0] if col in spec else None)
+        return values
+
+    def set_footer_value(self, row: int, col: int, value) -> None:
+        """מחליף ערך בשורה שאחרי הנתונים (row = מספר השורה בגיליון), עם אותו עיצוב."""
+        spec = self.footer[row - self.data_last_row - 1]
+        _, bold, fmt = spec[col]
+        spec[col] = (value, bold, fmt)
+
+    def validate(self):
+        """
+        בודק מראש שכל הערכים ניתנים לכתיבה (אחרת openpyxl נכשל רק בזמן השמירה, מחוץ ל-try של הבונה).
+        בודק ערך אחד מכל סוג פייתון בכל עמודה שאינה מספרית.
+        """
+        if self.blank_na:
+            return
+        probe = WriteOnlyCell(None)
+        for j in range(self.df.shape[1]):
+            col = self.df.iloc[:, j]
+            if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_extension_array_dtype(col.dtype):
+                continue
+            seen = set()
+            for v in col:
+                t = type(v)
+                if t in seen:
+                    continue
+                seen.add(t)
+                probe.value = v  # מעלה ValueError("Cannot convert ... to Excel") כמו ws.append
+
+    def measure(self):
+        """רוחבי עמודות לפי האורך המקסימלי של הטקסט בעמודה (כותרת + נתונים + שורת הסכום)."""
+        max_len: Dict[int, int] = {}
+        for j, h in enumerate(self.header, start=1):
+            max_len[j] = len(str(h)) if h is not None else 0
+        for j in range(1, len(self.header) + 1):
+            lens = [len(str(v)) for v in self._column_values(j - 1) if v is not None]
+            if lens:
+                max_len[j] = max(max_len[j], max(lens))
+        for row in self.footer:
+            for col, (value, _, _) in row.items():
+                max_len[col] = max(max_len.get(col, 0), len(str(value)))
+        self.widths = {col: _width_for(n) for col, n in max_len.items()}
+        return self.widths
+
+    # ---------- עריכה לפני הכתיבה ----------
+    def drop_rows(self, mask: pd.Series):
+        """מוחק שורות נתונים (mask=True). נוסחאות שורת הסכום לא משתנות – בדיוק כמו ws.delete_rows."""
+        self.df = self.df.loc[~mask.to_numpy()]
+
+    def set_column(self, col: int, value):
+        """מציב ערך קבוע בעמודה (1-based) לכל שורות הנתונים."""
+        self.df = self.df.copy()
+        self.df.isetitem(col - 1, value)
+
+    # ---------- כתיבה ----------
+    def _column_values(self, j: int) -> Iterable:
+        col = self.df.iloc[:, j]
+        if self.blank_na:
+            return map(_as_excel_value, col)
+        return iter(col)
+
+    def write_header(self, ws):
+        ws.append(list(self.header))
+        fill = PatternFill(start_color=HEADER_FILL, end_color=HEADER_FILL, fill_type="solid")
+        thin = Side(style="thin")
+        for j in range(1, len(self.header) + 1):
+            cell = ws.cell(row=1, column=j)
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            cell.fill = fill
+            if self.header_border:
+                cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        ws.freeze_panes = "A2"
+        try:
+            ws.sheet_view.rightToLeft = True
+        except Exception:
+            pass
+        for col, width in self.measure().items():
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+    def iter_body(self, make_cell: Callable[[object], Cell]):
+        """מחזיר את שורות הגוף (נתונים + שורת הסכום) אחת-אחת, מוכנות ל-ws.append."""
+        columns = [self._column_values(j) for j in range(len(self.header))]
+        fmts = [(col - 1, fmt) for col, fmt in self.number_formats.items() if col <= len(self.header)]
+        for row in zip(*columns):
+            if fmts:
+                row = list(row)
+                for j, fmt in fmts:
+                    v = row[j]
+                    if isinstance(v, (int, float)):
+                        cell = make_cell(v)
+                        cell.number_format = fmt
+                        row[j] = cell
+            yield row
+        for spec in self.footer:
+            out = [None] * (max(spec) if spec else 0)
+            for col, (value, bold, fmt) in spec.items():
+                cell = make_cell(value)
+                if bold:
+                    cell.font = Font(bold=True)
+                if fmt:
+                    cell.number_format = fmt
+                out[col - 1] = cell
+            yield out
+
+    def write_body(self, ws):
+        for row in self.iter_body(lambda v: Cell(ws, value=v)):
+            ws.append(row)
+
+
+def sheet_layout(ws) -> dict:
+    """
+    מה שיש בגיליון מלבד התאים: רוחבי עמודות, גובהי שורות, הקפאה, RTL, תאים ממוזגים, מסנן אוטומטי
+    ועיצוב מותנה – בצורה שעוברת בין תהליכים (pickle) ומוחלת ב-apply_layout.
+    """
+    return {
+        "widths": {key: dim.width for key, dim in ws.column_dimensions.items() if dim.customWidth},
+        "heights": {idx: dim.height for idx, dim in ws.row_dimensions.items() if dim.customHeight},
+        "freeze_panes": ws.freeze_panes,
+        "right_to_left": ws.sheet_view.rightToLeft,
+        "merged": [str(rng) for rng in ws.merged_cells.ranges],
+        "auto_filter": ws.auto_filter.ref,
+        "conditional": [(str(cf.sqref), list(cf.rules)) for cf in ws.conditional_formatting],
+    }
+
+
+def apply_layout(target, layout: dict) -> None:
+    """מחיל sheet_layout על גיליון רגיל או write-only (ב-write-only – לפני השורה הראשונה)."""
+    for key, width in layout["widths"].items():
+        target.column_dimensions[key].width = width
+    for idx, height in layout["heights"].items():
+        target.row_dimensions[idx].height = height
+    target.freeze_panes = layout["freeze_panes"]
+    target.sheet_view.rightToLeft = layout["right_to_left"]
+    for rng in layout["merged"]:
+        if hasattr(target, "merge_cells"):
+            target.merge_cells(rng)
+        else:
+            target.merged_cells.add(rng)
+    target.auto_filter.ref = layout["auto_filter"]
+    for sqref, rules in layout["conditional"]:
+        for rule in rules:
+            target.conditional_formatting.add(sqref, rule)
+
+
+class _CachedValueWriter(WorksheetWriter):
+    """
+    כותב ה-XML של גיליון write-only, שלצד נוסחה שיש לה ערך מחושב ב-cached ({(שורה, עמודה): מספר})
+    כותב גם את <v> – כך שהערכים נשמרים באותה כתיבה של הקובץ, בלי מעבר נוסף על ה-zip.
+    """
+
+    def __init__(self, ws, cached: Dict[tuple, object]):
+        super().__init__(ws)
+        self.cached = cached
+        self.written = 0
+
+    def write_row(self, xf, row, row_idx):
+        from Logic.formula_values import _number_text
+
+        attrs = {"r": f"{row_idx}"}
+        attrs.update(self.ws.row_dimensions.get(row_idx, {}))
+        with xf.element("row", attrs):
+            for cell in row:
+                if cell._comment is not None:
+                    self.ws._comments.append(CommentRecord.from_cell(cell))
+                v = self.cached.get((row_idx, cell.column)) if cell.data_type == "f" else None
+                if v is None:
+                    # כמו WorksheetWriter.write_row
+                    if cell._value is not None or cell.has_style or cell._comment:
+                        write_cell(xf, self.ws, cell, cell.has_style)
+                    continue
+                _, el_attrs = _set_attributes(cell, cell.has_style)
+                el = Element("c", el_attrs)
+                SubElement(el, "f").text = cell._value[1:]
+                SubElement(el, "v").text = _number_text(v)
+                xf.write(el)
+                self.written += 1
+
+
+def stream_sheet(ws, wo, frame: Optional[FrameSheet] = None, cached: Optional[Dict[tuple, object]] = None) -> int:
+    """
+    מעתיק גיליון רגיל (ws) לגיליון write-only (wo), ואם יש לו FrameSheet ממתין – מזרים גם את גוף הנתונים.
+    מאפייני הגיליון (sheet_layout) מועתקים לפני השורות (דרישה של write-only).
+    cached: ערכי הנוסחאות של הגיליון ({(שורה, עמודה): ערך}) – נכתבים לצד הנוסחאות. מחזיר כמה נכתבו.
+    """
+    apply_layout(wo, sheet_layout(ws))
+    writer = None
+    if cached:
+        writer = wo._writer = _CachedValueWriter(wo, cached)
+        writer.write_top()
+
+    for row in ws.iter_rows():
+        out = []
+        for c in row:
+            if not c.has_style:
+                out.append(c.value)
+                continue
+            wc = WriteOnlyCell(wo, value=c.value)
+            wc.font = copy(c.font)
+            wc.fill = copy(c.fill)
+            wc.border = copy(c.border)
+            wc.alignment = copy(c.alignment)
+            wc.number_format = c.number_format
+            wc.protection = copy(c.protection)
+            out.append(wc)
+        wo.append(out)
+
+    if frame is not None:
+        for row in frame.iter_body(lambda v: WriteOnlyCell(wo, value=v)):
+            wo.append(row)
+    return writer.written if writer is not None else 0
+
+
+def write_frame_sheet(target, ws, frame: FrameSheet) -> FrameSheet:
+    """
+    כותב את הכותרת מיד, ואת גוף הגיליון:
+      - WorkbookSession במצב streaming -> רק נרשם, ונכתב ב-session.save() ישירות לגיליון write-only.
+      - אחרת -> נכתב עכשיו ל-ws.
+    """
+    from Logic.workbook_session import WorkbookSession
+
+    frame.write_header(ws)
+    if isinstance(target, WorkbookSession) and target.streaming:
+        frame.validate()
+        target.defer(ws, frame)
+    else:
+        frame.write_body(ws)
+    return frame
@@ -0,0 +1,109 @@
+import cProfile
+import os
+import pstats
+import re
+from typing import Dict, List, Tuple
+
+MERGED_NAME = "all_stages.pstats"
+FOLDED_NAME = "stacks.folded"
+
+_Func = Tuple[str, int, str]
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "stage"
+
+
+def _label(func: _Func) -> str:
+    filename, line, name = func
+    if filename == "~":  # פונקציה מובנית (למשל <built-in method ...>)
+        return name.replace(";", ",")
+    return f"{os.path.basename(filename)}:{name}:{line}".replace(";", ",")
+
+
+def folded_stacks(stats: pstats.Stats, root: str, min_us: int = 50, max_depth: int = 64) -> List[str]:
+    """
+    מחסניות מקופלות ("root;a;b;c <מיקרו-שניות>") מתוך גרף הקריאות של cProfile – הקלט של flamegraph.pl /
+    speedscope / inferno. cProfile שומר רק זוגות קורא->נקרא, ולכן הזמן של פונקציה מתחלק בין המסלולים
+    אליה לפי החלק של כל קורא ב-cumtime שלה (כמו flameprof). מסלולים קצרים מ-min_us נחתכים.
+    """
+    raw: Dict[_Func, tuple] = stats.stats
+    callees: Dict[_Func, Dict[_Func, float]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+    roots = [f for f, (_, _, _, _, callers) in raw.items() if not callers]
+
+    out: Dict[str, float] = {}
+
+    def walk(func: _Func, path: List[str], on_path: set, scale: float):
+        _, _, tt, ct, _ = raw[func]
+        stack = path + [_label(func)]
+        key = ";".join(stack)
+        out[key] = out.get(key, 0.0) + tt * scale
+        if len(stack) >= max_depth:
+            return
+        for child, edge_ct in callees.get(func, {}).items():
+            child_ct = raw[child][3]
+            if child in on_path or child_ct <= 0:
+                continue
+            child_scale = scale * min(edge_ct / child_ct, 1.0) if ct > 0 else 0.0
+            if edge_ct * scale * 1e6 < min_us:
+                continue
+            on_path.add(child)
+            walk(child, stack, on_path, child_scale)
+            on_path.discard(child)
+
+    for func in roots:
+        walk(func, [root], {func}, 1.0)
+    return [f"{k} {int(round(v * 1e6))}" for k, v in out.items() if v * 1e6 >= min_us]
+
+
+class StageProfiler:
+    """
+    --profile DIR: cProfile נפרד לכל שלב -> DIR/NN_<שלב>.pstats, ובסוף finish():
+    DIR/all_stages.pstats (כל השלבים יחד) ו-DIR/stacks.folded (מחסניות מקופלות, השלב הוא המסגרת העליונה).
+    """
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self.files: List[Tuple[str, str]] = []  # (שלב, נתיב pstats)
+        self._count = 0
+
+    def next_path(self, stage: str) -> str:
+        self._count += 1
+        return os.path.join(self.out_dir, f"{self._count:02d}_{_safe(stage)}.pstats")
+
+    def start(self) -> cProfile.Profile:
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+
+    def stop(self, stage: str, prof: cProfile.Profile) -> str:
+        prof.disable()
+        path = self.next_path(stage)
+        prof.dump_stats(path)
+        self.files.append((stage, path))
+        return path
+
+    def add_file(self, stage: str, path: str) -> None:
+        """pstats שנכתב בתהליך אחר (צומת שנבנה בתהליך עובד)."""
+        if os.path.exists(path):
+            self.files.append((stage, path))
+
+    def finish(self) -> List[str]:
+        if not self.files:
+            return []
+        merged = pstats.Stats(self.files[0][1])
+        for _, path in self.files[1:]:
+            merged.add(path)
+        merged_path = os.path.join(self.out_dir, MERGED_NAME)
+        merged.dump_stats(merged_path)
+
+        folded_path = os.path.join(self.out_dir, FOLDED_NAME)
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stage, path in self.files:
+                for line in folded_stacks(pstats.Stats(path), _safe(stage)):
+                    f.write(line + "\n")
+        return [merged_path, folded_path]
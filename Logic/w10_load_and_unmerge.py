@@ -1,5 +1,27 @@
 import os
+import tempfile
+from typing import List, Tuple
+import numpy as np
 import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.worksheet.cell_range import CellRange
+
+# הקריאה במעבר יחיד נשענת על ממשקים פנימיים (WorkSheetParser, ws._get_source, STR_NA_VALUES);
+# בלעדיהם – או אם השתנו בגרסה אחרת – נופלים למסלול הציבורי: load_and_unmerge לקובץ זמני + pd.read_excel
+try:
+    from openpyxl.worksheet._reader import WorkSheetParser
+    from pandas._libs.parsers import STR_NA_VALUES
+except ImportError:
+    WorkSheetParser = STR_NA_VALUES = None
+
+
+def _pick_sheet(sheetnames, sheet_hint: str) -> str:
+    for name in sheetnames:
+        if name.lower() == sheet_hint.lower():
+            return name
+    return sheetnames[0]
+
 
 def load_and_unmerge(src_path: str, sheet_hint: str = "sheet1", temp_out_dir: str = None) -> str:
     if temp_out_dir is None:
@@ -8,13 +30,7 @@ def load_and_unmerge(src_path: str, sheet_hint: str = "sheet1", temp_out_dir: st
     tmp_path = os.path.join(temp_out_dir, "_temp_unmerged.xlsx")
 
     wb = openpyxl.load_workbook(src_path, data_only=True)
-    target_name = None
-    for name in wb.sheetnames:
-        if name.lower() == sheet_hint.lower():
-            target_name = name
-            break
-    if target_name is None:
-        target_name = wb.sheetnames[0]
+    target_name = _pick_sheet(wb.sheetnames, sheet_hint)
     ws = wb[target_name]
 
     merged_ranges = list(ws.merged_cells.ranges)
@@ -28,3 +44,160 @@ def load_and_unmerge(src_path: str, sheet_hint: str = "sheet1", temp_out_dir: st
 
     wb.save(tmp_path)
     return tmp_path
+
+
+# ---------- קריאה במעבר יחיד (בלי קובץ זמני) ----------
+
+def _read_value(value, data_type):
+    """ערך תא כפי ש-pd.read_excel מחזיר אותו (שגיאה -> NaN, מספר שלם -> int)."""
+    if value is None:
+        return None
+    if data_type == "e":
+        return np.nan
+    if data_type == "n":
+        as_int = int(value)
+        return as_int if as_int == value else float(value)
+    return value
+
+
+def _merge_fill_value(value, raw_error=None):
+    """
+    הערך שמגיע לכל תאי טווח ממוזג במסלול הישן: ערך התא השמאלי-עליון הוצב מחדש בכל התאים
+    (ws.cell().value = val), נשמר לקובץ זמני ונקרא שוב ב-pandas.
+    מחרוזת '=...' הופכת שם לנוסחה בלי ערך (ריק), וקוד שגיאה מוכר – לתא שגיאה (NaN).
+    """
+    if raw_error is not None:
+        value = raw_error
+    if isinstance(value, str):
+        if value in ERROR_CODES:
+            return np.nan
+        if len(value) > 1 and value.startswith("="):
+            return None
+    return value
+
+
+def _is_blank(v) -> bool:
+    return v is None or (isinstance(v, str) and v == "")
+
+
+def load_unmerged_frame(src_path: str, sheet_hint: str = "sheet1", sheet_name: str = None) -> pd.DataFrame:
+    """הטבלה הגולמית (header=None) אחרי מילוי תאים ממוזגים – ראו read_sheet_unmerged."""
+    return read_sheet_unmerged(src_path, sheet_hint=sheet_hint, sheet_name=sheet_name)[1]
+
+
+def _first_row(ws) -> List[object]:
+    return [c.value for c in next(ws.iter_rows(min_row=1, max_row=1), ())]
+
+
+def _rewind(src):
+    if hasattr(src, "seek"):
+        src.seek(0)
+
+
+def _read_via_temp_file(
+    src_path: str, sheet_hint: str = "sheet1", sheet_name: str = None
+) -> Tuple[str, pd.DataFrame, List[object]]:
+    """המסלול הציבורי (הקריאה המקורית): load_and_unmerge לקובץ זמני ו-pd.read_excel(header=None, dtype=object)."""
+    _rewind(src_path)
+    wb = openpyxl.load_workbook(src_path, read_only=True, data_only=True)
+    try:
+        read_name = sheet_name if sheet_name in wb.sheetnames else wb.sheetnames[0]
+        row1 = _first_row(wb[wb.sheetnames[0]])
+    finally:
+        wb.close()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _rewind(src_path)
+        tmp_path = load_and_unmerge(src_path, sheet_hint=sheet_hint, temp_out_dir=tmp_dir)
+        raw = pd.read_excel(tmp_path, sheet_name=read_name, header=None, dtype=object)
+    return read_name, raw, row1
+
+
+def read_sheet_unmerged(
+    src_path: str, sheet_hint: str = "sheet1", sheet_name: str = None
+) -> Tuple[str, pd.DataFrame, List[object]]:
+    """
+    קורא את הגיליון במעבר XML יחיד (read-only): ערכי התאים נאספים למערך, הגדרות המיזוג נקראות
+    באותו מעבר (הן מופיעות בסוף ה-XML), וכל טווח ממוזג מתמלא בערך השמאלי-עליון ישירות במערך.
+    התוצאה זהה ל-load_and_unmerge + pd.read_excel(header=None, dtype=object) על הקובץ הזמני,
+    בלי לכתוב קובץ ובלי לקרוא אותו שוב:
+      - הגיליון הנקרא: sheet_name אם קיים בדיוק, אחרת הראשון (כמו read_excel עם נפילה לגיליון 0);
+      - המיזוגים מתמלאים רק אם זה גם הגיליון ש-sheet_hint מצביע עליו (כמו ב-load_and_unmerge);
+      - שורות/עמודות ריקות בסוף נחתכות, וריקים / מחרוזות NA של pandas הופכים ל-NaN.
+    מחזיר: (שם הגיליון שנקרא, הטבלה הגולמית, ערכי שורה 1 הפיזית של הגיליון הראשון בקובץ כפי שהם – בלי מילוי מיזוגים;
+    זה המקור של כותרות O..T גם כש-sheet_name מצביע על גיליון אחר).
+    אם הממשקים הפנימיים של openpyxl / pandas לא זמינים – אותה תוצאה דרך _read_via_temp_file.
+    """
+    if WorkSheetParser is None:
+        return _read_via_temp_file(src_path, sheet_hint, sheet_name)
+    try:
+        return _read_single_pass(src_path, sheet_hint, sheet_name)
+    except (AttributeError, TypeError) as e:
+        print(f"    [אזהרה] קריאה במעבר יחיד לא נתמכת בגרסה הזו ({e}) – קריאה דרך קובץ זמני.", flush=True)
+        return _read_via_temp_file(src_path, sheet_hint, sheet_name)
+
+
+def _read_single_pass(src_path, sheet_hint: str, sheet_name: str) -> Tuple[str, pd.DataFrame, List[object]]:
+    _rewind(src_path)
+    wb = openpyxl.load_workbook(src_path, read_only=True, data_only=True)
+    try:
+        read_name = sheet_name if sheet_name in wb.sheetnames else wb.sheetnames[0]
+        fill_merges = read_name == _pick_sheet(wb.sheetnames, sheet_hint)
+        ws = wb[read_name]
+
+        rows, errors, row1 = [], {}, []
+        with ws._get_source() as src:
+            parser = WorkSheetParser(src, ws._shared_strings, data_only=True, epoch=wb.epoch,
+                                     date_formats=wb._date_formats, timedelta_formats=wb._timedelta_formats)
+            for r, cells in parser.parse():
+                while len(rows) < r - 1:
+                    rows.append(())
+                vals = [None] * (cells[-1]["column"] if cells else 0)
+                for c in cells:
+                    if c["column"] > len(vals):
+                        vals.extend([None] * (c["column"] - len(vals)))
+                    vals[c["column"] - 1] = _read_value(c["value"], c["data_type"])
+                    if c["data_type"] == "e" and c["value"] is not None:
+                        errors[(r, c["column"])] = c["value"]
+                if r == 1:
+                    row1 = [None] * len(vals)
+                    for c in cells:
+                        row1[c["column"] - 1] = c["value"]
+                rows.append(vals)
+            merges = [] if not (fill_merges and parser.merged_cells) else [
+                CellRange(m.ref) for m in parser.merged_cells.mergeCell
+            ]
+        if read_name != wb.sheetnames[0]:
+            row1 = _first_row(wb[wb.sheetnames[0]])  # כותרות O..T תמיד מהגיליון הראשון, כמו במקור
+    finally:
+        wb.close()
+
+    n_rows = max([len(rows)] + [m.max_row for m in merges])
+    n_cols = max([len(v) for v in rows] + [m.max_col for m in merges] + [0])
+    arr = np.full((n_rows, n_cols), None, dtype=object)
+    for i, vals in enumerate(rows):
+        if vals:
+            arr[i, :len(vals)] = vals
+
+    for m in merges:
+        top_left = arr[m.min_row - 1, m.min_col - 1]
+        fill = _merge_fill_value(top_left, errors.get((m.min_row, m.min_col)))
+        arr[m.min_row - 1:m.max_row, m.min_col - 1:m.max_col].fill(fill)
+
+    # חיתוך שורות ועמודות ריקות בסוף (כמו ב-reader של pandas)
+    blank = np.frompyfunc(_is_blank, 1, 1)(arr).astype(bool) if arr.size else np.ones(arr.shape, dtype=bool)
+    used_rows = np.flatnonzero(~blank.all(axis=1))
+    n_rows = int(used_rows[-1]) + 1 if len(used_rows) else 0
+    used_cols = np.flatnonzero(~blank[:n_rows].all(axis=0))
+    n_cols = int(used_cols[-1]) + 1 if len(used_cols) else 0
+    arr, blank = arr[:n_rows, :n_cols], blank[:n_rows, :n_cols]
+
+    if n_cols == 1:
+        # עמודה יחידה: pandas מדלג על שורות ריקות
+        keep = [not (v is None or (isinstance(v, str) and not v.strip())) for v in arr[:, 0]]
+        arr, blank = arr[keep], blank[keep]
+
+    na_values = set(STR_NA_VALUES)
+    is_na = blank | np.frompyfunc(lambda v: isinstance(v, str) and v in na_values, 1, 1)(arr).astype(bool)
+    arr[is_na] = np.nan
+    # dtype=object כמו read_excel(dtype=object): בלי הסקת סוג לעמודה (תאריכים + ריקים לא הופכים ל-datetime64 / NaT)
+    return read_name, pd.DataFrame(arr, dtype=object), row1
@@ -1,5 +1,76 @@
 import pandas as pd
 from typing import Optional, List
+from openpyxl.utils import get_column_letter
+from Logic.w10_load_and_unmerge import read_sheet_unmerged
+
+def find_header_row(df_all: pd.DataFrame, search_rows: int = 120) -> int:
+    """אינדקס השורה הראשונה עם >=5 תאים לא ריקים בטבלה גולמית (header=None)."""
+    for i in range(min(search_rows, len(df_all))):
+        if df_all.iloc[i].notna().sum() >= 5:
+            return i
+    raise RuntimeError("Header row not found within first rows")
+
+def _split_at_header(df_all: pd.DataFrame, header_row_idx: int) -> pd.DataFrame:
+    columns = df_all.iloc[header_row_idx].astype(str).str.strip().tolist()
+    df = df_all.iloc[header_row_idx + 1:].reset_index(drop=True)
+    df.columns = columns
+    return df
+
+def frame_from_raw(df_all: pd.DataFrame, search_rows: int = 120) -> pd.DataFrame:
+    """
+    מאתר את שורת הכותרות בטבלה גולמית (header=None) – השורה הראשונה עם >=5 תאים לא ריקים –
+    ומחזיר DataFrame מהשורה שאחריה, עם הכותרות כשמות העמודות.
+    """
+    return _split_at_header(df_all, find_header_row(df_all, search_rows))
+
+
+class IngestResult:
+    """
+    תוצאת קריאה אחת של קובץ ה-QS – כל מה שהשלבים הבאים צריכים מהמקור, בלי לפתוח אותו שוב:
+      sheet_name  – הגיליון שנקרא
+      raw         – הטבלה הגולמית אחרי מילוי תאים ממוזגים (header=None)
+      header_idx  – אינדקס שורת הכותרות בתוך raw
+      header_row  – ערכי שורת הכותרות כפי שנקראו
+      columns     – שמות העמודות (str + strip) לפי מיקום
+      frame       – שורות הנתונים שאחרי הכותרות, עם columns כשמות
+      source_row1 – ערכי שורה 1 הפיזית בגיליון הראשון בקובץ, כמו שהם (בלי מילוי מיזוגים) – מקור כותרות O..T
+    """
+
+    def __init__(self, sheet_name: str, raw: pd.DataFrame, header_idx: int, source_row1: List[object]):
+        self.sheet_name = sheet_name
+        self.raw = raw
+        self.header_idx = header_idx
+        self.header_row = raw.iloc[header_idx].tolist()
+        self.frame = _split_at_header(raw, header_idx)
+        self.columns = list(self.frame.columns)
+        self.source_row1 = source_row1
+
+    def position(self, name: str) -> Optional[int]:
+        """מספר העמודה (1-based) של הכותרת במקור – המופע הראשון, או None."""
+        try:
+            return self.columns.index(name) + 1
+        except ValueError:
+            return None
+
+    def letter(self, name: str) -> Optional[str]:
+        pos = self.position(name)
+        return get_column_letter(pos) if pos else None
+
+    def source_headers(self, first_col: int, last_col: int) -> List[object]:
+        """ערכי שורה 1 במקור בעמודות first_col..last_col (1-based, כולל); None מעבר לסוף השורה."""
+        return [self.source_row1[c - 1] if c <= len(self.source_row1) else None
+                for c in range(first_col, last_col + 1)]
+
+
+def ingest_qs(
+    src_path: str,
+    sheet_hint: str = "sheet1",
+    sheet_name: Optional[str] = None,
+    search_rows: int = 120,
+) -> IngestResult:
+    """קורא את QS פעם אחת (מעבר יחיד, כולל מילוי מיזוגים) ומאתר את שורת הכותרות."""
+    read_name, raw, row1 = read_sheet_unmerged(src_path, sheet_hint=sheet_hint, sheet_name=sheet_name)
+    return IngestResult(read_name, raw, find_header_row(raw, search_rows), row1)
 
 def detect_header_and_frame(
     path: str,
@@ -18,15 +89,4 @@ def detect_header_and_frame(
         # אם השם לא נמצא – ניפול לגיליון הראשון
         df_all = pd.read_excel(path, sheet_name=0, header=None, dtype=object)
 
-    header_row_idx = None
-    for i in range(min(search_rows, len(df_all))):
-        if df_all.iloc[i].notna().sum() >= 5:
-            header_row_idx = i
-            break
-    if header_row_idx is None:
-        raise RuntimeError("Header row not found within first rows")
-
-    columns = df_all.iloc[header_row_idx].astype(str).str.strip().tolist()
-    df_all.columns = columns
-    df = df_all.iloc[header_row_idx + 1:].reset_index(drop=True)
-    return df
+    return frame_from_raw(df_all, search_rows=search_rows)
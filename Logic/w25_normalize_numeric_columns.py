@@ -1,6 +1,13 @@
 import re
+from typing import Dict, Tuple
+import numpy as np
 import pandas as pd
 
+# אחרי ניקוי נשארות רק ספרות, נקודה ומינוס; float() מצליח בדיוק על הצורות האלה
+_VALID_NUMBER = r"-?(?:\d+\.?\d*|\.\d+)"
+_NUMBER_TYPES = (int, float, np.integer, np.floating)
+_BOOL_TYPES = (bool, np.bool_)
+
 def _to_number(val):
     if pd.isna(val):
         return None
@@ -21,9 +28,101 @@ def _to_number(val):
     except Exception:
         return None
 
-def normalize_numeric_columns(df: pd.DataFrame, headers):
+def _parse_strings(s: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    אותו פענוח כמו _to_number, על עמודת מחרוזות שלמה (str ops של pandas).
+    מחזיר (ערכים float עם NaN היכן שאין מספר, מסכת כשלים – תאים לא ריקים שלא פוענחו).
+    """
+    s = s.str.strip()
+    empty = (s == "") | (s == "-")
+    neg = s.str.startswith("(") & s.str.endswith(")")
+    s = s.where(~neg, s.str[1:-1])
+    s = s.str.replace(r"[^\d.\-]", "", regex=True)
+    multi_dot = s.str.count(r"\.") > 1
+    if multi_dot.any():
+        # משאירים רק את הנקודה האחרונה
+        s = s.where(~multi_dot, s.str.replace(r"\.(?=.*\.)", "", regex=True))
+    valid = s.str.fullmatch(_VALID_NUMBER) & ~empty
+
+    values = np.full(len(s), np.nan)
+    ok = valid.to_numpy(dtype=bool)
+    if ok.any():
+        # float() של פייתון על כל ערך (דרך numpy) – בדיוק כמו ב-_to_number
+        values[ok] = s.to_numpy(dtype=object)[ok].astype(float)
+        values[ok & neg.to_numpy(dtype=bool)] *= -1
+    failed = ~ok & ~empty.to_numpy(dtype=bool)
+    return values, failed
+
+def _take_floats(arr: np.ndarray, idx: np.ndarray, values: np.ndarray, failed: np.ndarray):
+    """
+    מעתיק ערכי float קיימים כמו שהם. רק ערכים ש-str() כותב בכתיב מדעי (או inf)
+    עוברים דרך _to_number, כי שם הניקוי משנה את המספר.
+    """
+    finite = np.isfinite(arr)
+    mag = np.abs(arr, where=finite, out=np.zeros_like(arr))
+    plain = finite & ((mag == 0) | ((mag >= 1e-4) & (mag < 1e16)))
+    values[idx[plain]] = arr[plain]
+    for i in np.flatnonzero(~plain & ~np.isnan(arr)):
+        v = _to_number(arr[i])
+        if v is None:
+            failed[idx[i]] = True
+        else:
+            values[idx[i]] = v
+
+def _normalize_column(col: pd.Series) -> Tuple[pd.Series, int]:
+    """מחזיר (עמודה מנורמלת – זהה ל-col.apply(_to_number), מספר תאים שלא פוענחו)."""
+    if col.empty:
+        return col.copy(), 0
+    dtype = col.dtype
+    values = np.full(len(col), np.nan)
+    failed = np.zeros(len(col), dtype=bool)
+
+    if pd.api.types.is_bool_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        # 'True'/'False' -> אין ספרות -> אף ערך לא מפוענח
+        failed[:] = True
+    elif pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        values = col.to_numpy(dtype=float)
+    elif pd.api.types.is_float_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        _take_floats(col.to_numpy(), np.arange(len(col)), values, failed)
+    else:
+        arr = col.to_numpy(dtype=object)
+        # בעמודת object מעורבת: מספרים של פייתון/numpy לא עוברים דרך str() בכלל
+        is_num = np.fromiter(
+            (isinstance(v, _NUMBER_TYPES) and not isinstance(v, _BOOL_TYPES) for v in arr),
+            dtype=bool, count=len(arr),
+        )
+        if is_num.any():
+            idx = np.flatnonzero(is_num)
+            _take_floats(arr[idx].astype(float), idx, values, failed)
+        rest = ~is_num & ~col.isna().to_numpy()
+        if rest.any():
+            # מפענחים כל מחרוזת שונה פעם אחת בלבד (סכומים חוזרים הרבה בדוחות)
+            codes, uniques = pd.factorize(col[rest].astype(str))
+            parsed, bad = _parse_strings(pd.Series(uniques, dtype=object))
+            values[rest] = parsed[codes]
+            failed[rest] = bad[codes]
+
+    parsed_any = ~np.isnan(values)
+    if not parsed_any.any():
+        # apply שלא החזיר אף מספר משאיר עמודת object של None
+        return pd.Series([None] * len(col), index=col.index, dtype=object, name=col.name), int(failed.sum())
+    return pd.Series(values, index=col.index, name=col.name), int(failed.sum())
+
+def normalize_numeric_columns_report(df: pd.DataFrame, headers) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    כמו normalize_numeric_columns, ומחזיר גם {עמודה: כמה תאים לא ריקים לא פוענחו כמספר}.
+    """
     out = df.copy()
+    failures: Dict[str, int] = {}
     for h in headers:
         if h in out.columns:
-            out[h] = out[h].apply(_to_number)
-    return out
+            col = out[h]
+            if isinstance(col, pd.DataFrame):
+                # כותרת כפולה – נשארים במסלול המקורי
+                out[h] = col.apply(_to_number)
+                continue
+            out[h], failures[h] = _normalize_column(col)
+    return out, failures
+
+def normalize_numeric_columns(df: pd.DataFrame, headers):
+    return normalize_numeric_columns_report(df, headers)[0]
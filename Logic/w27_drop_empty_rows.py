@@ -3,8 +3,12 @@ from typing import Iterable, Tuple
 
 DEFAULT_REQUIRED_ANY = ["קוד סוכן", "קוד לקוח קצה", "לקוח קצה"]
 
+def empty_cells(s: pd.Series, stripped: pd.Series) -> pd.Series:
+    """stripped = s.astype(str).str.strip(). תא ריק = NA או מחרוזת ריקה אחרי strip."""
+    return s.isna() | (stripped == "")
+
 def _is_empty_series(s: pd.Series) -> pd.Series:
-    return s.isna() | (s.astype(str).str.strip() == "")
+    return empty_cells(s, s.astype(str).str.strip())
 
 def drop_empty_rows(df: pd.DataFrame, required_any: Iterable[str] = DEFAULT_REQUIRED_ANY) -> Tuple[pd.DataFrame, int, int]:
     """
@@ -15,3 +15,11 @@ def filter_agent_code_required(df: pd.DataFrame, col: str = "קוד סוכן") -
     removed = int((~mask_valid).sum())
     out = df.loc[mask_valid].reset_index(drop=True)
     return out, removed
+
+def agent_code_keep_mask(s: pd.Series, keep_values=("אחר",)) -> pd.Series:
+    """
+    s = 'קוד סוכן' אחרי astype("string").str.strip() (כלומר אחרי normalize_agent_code).
+    True = קוד ספרתי מלא או אחד מ-keep_values; ריק (NA) ⇒ False.
+    """
+    keep = s.str.fullmatch(r"\d+") | s.isin(list(keep_values))
+    return keep.fillna(False).astype(bool)
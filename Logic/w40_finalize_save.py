@@ -1,54 +1,34 @@
 import os
 import pandas as pd
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment, PatternFill
 from .utils import ts_now, base_from_path, safe_mkdir
 from .headers_stage1 import AMOUNT_HEADERS
+from .sheet_writer import NUMBER_FMT, FrameSheet, write_frame_sheet
+from .workbook_session import BookTarget, WorkbookSession, load_book, save_book
 
-def _autosize(ws):
-    for col_idx in range(1, ws.max_column + 1):
-        max_len = 0
-        for row_idx in range(1, ws.max_row + 1):
-            v = ws.cell(row=row_idx, column=col_idx).value
-            if v is None:
-                continue
-            max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max(12, max_len + 2), 60)
+def _amount_formats(header) -> dict:
+    """עמודות הסכומים (1-based) שמקבלות פורמט מספר; בשם כפול – העמודה האחרונה, כמו מיפוי הכותרות בגיליון."""
+    header_map = {name: c for c, name in enumerate(header, start=1)}
+    return {header_map[name]: NUMBER_FMT for name in AMOUNT_HEADERS if name in header_map}
 
-def _apply_header_style(ws):
-    header_fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-    for col_idx in range(1, ws.max_column + 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.fill = header_fill
-    ws.freeze_panes = "A2"
-    try:
-        ws.sheet_view.rightToLeft = True
-    except Exception:
-        pass
-
-def _apply_number_formats(ws):
-    header_map = {ws.cell(row=1, column=c).value: c for c in range(1, ws.max_column + 1)}
-    for name in AMOUNT_HEADERS:
-        col = header_map.get(name)
-        if not col:
-            continue
-        for r in range(2, ws.max_row + 1):
-            cell = ws.cell(row=r, column=col)
-            if isinstance(cell.value, (int, float)):
-                cell.number_format = '#,##0.00'
-
-def save_processed(df: pd.DataFrame, input_path: str, output_dir: str, sheet_name: str = "מעובד") -> str:
+def processed_output_path(input_path: str, output_dir: str) -> str:
     safe_mkdir(output_dir)
     out_name = f"{base_from_path(input_path)}_{ts_now()}.xlsx"
-    out_path = os.path.join(output_dir, out_name)
+    return os.path.join(output_dir, out_name)
 
-    with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        ws = writer.book[sheet_name]
-        _apply_header_style(ws)
-        _autosize(ws)
-        _apply_number_formats(ws)
+def write_processed_sheet(target: BookTarget, df: pd.DataFrame, sheet_name: str = "מעובד"):
+    """
+    כותב את גיליון 'מעובד' (כותרת מודגשת עם מסגרת ורקע, פורמט סכומים, רוחבי עמודות) לתוך target.
+    בסשן streaming גוף הנתונים נכתב רק בשמירה, ישירות מה-DataFrame.
+    """
+    wb = load_book(target)
+    if sheet_name in wb.sheetnames:
+        del wb[sheet_name]
+    ws = wb.create_sheet(title=sheet_name)
+    frame = FrameSheet(df, number_formats=_amount_formats(list(df.columns)), blank_na=True, header_border=True)
+    write_frame_sheet(target, ws, frame)
+    save_book(wb, target)
 
-    return out_path
\ No newline at end of file
+def save_processed(df: pd.DataFrame, input_path: str, output_dir: str, sheet_name: str = "מעובד") -> str:
+    session = WorkbookSession.new(processed_output_path(input_path, output_dir), streaming=True)
+    write_processed_sheet(session, df, sheet_name=sheet_name)
+    return session.save()
@@ -4,11 +4,15 @@ from typing import Tuple
 # דפוס ללא קבוצות לוכדות, כדי למנוע UserWarning
 PATTERN = r'(?:סה\"כ|סהכ|Total|סיכום)'
 
+def summary_rows_mask(s: pd.Series) -> pd.Series:
+    """s = העמודה אחרי astype(str).str.strip(). True = שורת סיכום למחיקה."""
+    return s.str.contains(PATTERN, case=False, regex=True)
+
 def remove_summary_rows(df: pd.DataFrame, col: str = "קוד סוכן") -> Tuple[pd.DataFrame, int]:
     if col not in df.columns:
         return df.copy(), 0
     s = df[col].astype(str).fillna("").str.strip()
-    mask = s.str.contains(PATTERN, case=False, regex=True)
+    mask = summary_rows_mask(s)
     removed = int(mask.sum())
     out = df.loc[~mask].reset_index(drop=True)
     return out, removed
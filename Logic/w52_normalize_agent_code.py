@@ -20,6 +20,20 @@
 from typing import Tuple
 import pandas as pd
 
+def normalized_agent_code(s: pd.Series, keep_values=("אחר",)) -> pd.Series:
+    """
+    s = העמודה אחרי astype("string").str.strip().
+    מחזיר את הערכים המנורמלים (dtype string): keep_values כמו שהם, אחרת ספרות בלבד; ריק ⇒ NA.
+    """
+    # הגנה: אם בטעות יעבור מחרוזת ולא רשימה/טופל, נהפוך לרשימה
+    if isinstance(keep_values, str):
+        keep_values = [keep_values]
+    keep_mask  = s.isin(keep_values)
+    empty_mask = s.isna() | (s == "") | s.str.fullmatch(r"[-–—]+", na=False)
+    digits_only = s.str.replace(r"\D+", "", regex=True).str.strip()
+    new = digits_only.where(~keep_mask, s)
+    return new.mask(empty_mask | (new == ""), other=None)
+
 def normalize_agent_code(
     df: pd.DataFrame,
     col: str = "קוד סוכן",
@@ -33,17 +47,9 @@ def normalize_agent_code(
     """
     if col not in df.columns:
         return df.copy(), 0
-    # הגנה: אם בטעות יעבור מחרוזת ולא רשימה/טופל, נהפוך לרשימה
-    if isinstance(keep_values, str):
-        keep_values = [keep_values]
     out = df.copy()
     s_raw = out[col]
-    s = s_raw.astype("string").str.strip()
-    keep_mask  = s.isin(keep_values)
-    empty_mask = s.isna() | (s == "") | s.str.fullmatch(r"[-–—]+", na=False)
-    digits_only = s.str.replace(r"\D+", "", regex=True).str.strip()
-    new = digits_only.where(~keep_mask, s)
-    new = new.mask(empty_mask | (new == ""), other=None)
+    new = normalized_agent_code(s_raw.astype("string").str.strip(), keep_values)
     before = s_raw.astype("string")
     after  = new.astype("string")
     changes = int((before.fillna("__NA__") != after.fillna("__NA__")).sum())
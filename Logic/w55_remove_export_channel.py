@@ -1,11 +1,17 @@
 import pandas as pd
 from typing import Tuple
 
+EXPORT_CHANNEL = "ייצוא"
+
+def export_channel_mask(s: pd.Series) -> pd.Series:
+    """s = העמודה אחרי astype(str).str.strip(). True = שורה למחיקה."""
+    return s.eq(EXPORT_CHANNEL)
+
 def remove_export_channel(df: pd.DataFrame, col: str = "ערוץ") -> Tuple[pd.DataFrame, int]:
     if col not in df.columns:
         return df.copy(), 0
     s = df[col].astype(str).fillna("").str.strip()
-    mask = s.eq("ייצוא")
+    mask = export_channel_mask(s)
     removed = int(mask.sum())
     out = df.loc[~mask].reset_index(drop=True)
     return out, removed
\ No newline at end of file
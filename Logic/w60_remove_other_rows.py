@@ -4,16 +4,20 @@ from typing import Tuple, List, Iterable
 TARGET_VALUES = {"אחר", "אחר אחר"}
 # DEFAULT_COLS = ["מנהל סחר", "מנהל אזור", "מנהל איזור"]  # נזהה גם 'אזור' וגם 'איזור'
 DEFAULT_COLS = ["מנהל סחר", "סוכן"]  # נזהה גם 'אזור' וגם 'איזור'
+
+def other_rows_mask(stripped: Iterable[pd.Series]) -> pd.Series:
+    """stripped = העמודות אחרי astype(str).str.strip(). אמת אם באחת מהן הערך בדיוק 'אחר' או 'אחר אחר'."""
+    mask_any = None
+    for s in stripped:
+        m = s.isin(TARGET_VALUES)
+        mask_any = m if mask_any is None else (mask_any | m)
+    return mask_any
+
 def remove_other_rows(df: pd.DataFrame, cols: Iterable[str] = DEFAULT_COLS) -> Tuple[pd.DataFrame, int]:
     present = [c for c in cols if c in df.columns]
     if not present:
         return df.copy(), 0
-    # בנה מסכה: אמת אם באחת העמודות הערך בדיוק 'אחר' או 'אחר אחר' (אחרי strip)
-    mask_any = None
-    for c in present:
-        s = df[c].astype(str).fillna("").str.strip()
-        m = s.isin(TARGET_VALUES)
-        mask_any = m if mask_any is None else (mask_any | m)
+    mask_any = other_rows_mask(df[c].astype(str).fillna("").str.strip() for c in present)
     removed = int(mask_any.sum())
     out = df.loc[~mask_any].reset_index(drop=True)
     return out, removed
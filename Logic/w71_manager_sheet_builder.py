@@ -1,9 +1,9 @@
 import re
 from typing import List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment, PatternFill
+from Logic.workbook_session import BookTarget, load_book, save_book
+from Logic.sheet_writer import FrameSheet, write_frame_sheet
 from Logic.w74_helper_suppression import suppress_rows_by_helper
 
 SUM_ANCHOR_AFTER_TODAY = 'סה"כ סכום יתרת חוב עד היום'
@@ -45,33 +45,9 @@ def _dynamic_month_cols(df_cols: List[str], anchor: str, max_cols: int = 4) -> L
         return [c for c in df_cols[idx+1 : idx+1+max_cols] if c in df_cols]
     return []
 
-def _autosize(ws):
-    from openpyxl.utils import get_column_letter
-    for col_idx in range(1, ws.max_column + 1):
-        max_len = 0
-        for row_idx in range(1, ws.max_row + 1):
-            v = ws.cell(row=row_idx, column=col_idx).value
-            if v is None:
-                continue
-            max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max(12, max_len + 2), 60)
-
-def _style_header(ws):
-    header_fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-    for j in range(1, ws.max_column+1):
-        cell = ws.cell(row=1, column=j)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.fill = header_fill
-    ws.freeze_panes = "A2"
-    try:
-        ws.sheet_view.rightToLeft = True
-    except Exception:
-        pass
-
-def _add_column_sums_row(ws, header_names: List[str], total_col: str, today_col: str):
+def _add_column_sums_row(frame: FrameSheet, header_names: List[str], total_col: str, today_col: str):
     """
-    מוסיף שורת סכומים לכל העמודות מ-H עד N (כולל) שתי שורות מתחת לשורה האחרונה.
+    מגדיר שורת סכומים לכל העמודות מ-H עד N (כולל) שתי שורות מתחת לשורה האחרונה.
     מניח שהעמודות כתובות לפי הסדר: ... G('קוד סוכן'), H(total_col), I(today_col), J..M(dyn), N(HELPER_COL_NAME)
     """
     if total_col not in header_names or today_col not in header_names or HELPER_COL_NAME not in header_names:
@@ -83,27 +59,79 @@ def _add_column_sums_row(ws, header_names: List[str], total_col: str, today_col:
     if last_sum_idx0 < first_sum_idx0:
         return
 
-    last_row = ws.max_row
-    sum_row = last_row + 2  # שתי שורות מתחת לשורה האחרונה
-
     # "סכום :" בעמודה שלפני H -> כלומר G (עמודה מספר first_sum_idx0 ב-1-based)
-    label_col_excel = first_sum_idx0
-    if label_col_excel < 1:
-        label_col_excel = 1
-    ws.cell(row=sum_row, column=label_col_excel).value = "סכום :"
-    ws.cell(row=sum_row, column=label_col_excel).font = Font(bold=True)
-
-    start_data_row = 2  # אחרי שורת כותרת
-    for idx0 in range(first_sum_idx0, last_sum_idx0 + 1):
-        col_excel = idx0 + 1
-        col_letter = get_column_letter(col_excel)
-        ws.cell(row=sum_row, column=col_excel).value = f"=SUM({col_letter}{start_data_row}:{col_letter}{last_row})"
-        ws.cell(row=sum_row, column=col_excel).number_format = '#,##0.00'
-        ws.cell(row=sum_row, column=col_excel).font = Font(bold=True)
+    frame.add_sum_footer(label_col=max(1, first_sum_idx0),
+                         first_col=first_sum_idx0 + 1, last_col=last_sum_idx0 + 1)
+
+def _assemble_manager_frame(
+    sub: pd.DataFrame,
+    managers_col: str,
+    region_col: Optional[str],
+    agent_col: Optional[str],
+    channel_col: Optional[str],
+    payer_code_src: Optional[str],
+    payer_name_src: Optional[str],
+    agent_code_col: Optional[str],
+    total_col: Optional[str],
+    today_col: Optional[str],
+    dyn_cols: List[str],
+) -> pd.DataFrame:
+    """עמודות A..N (+ שיטת תשלום) של גיליון מנהל, כולל טור עזר והשתקת שורות (w74), לכל השורות של sub."""
+    col_order = []
+    data = {}
+
+    col_order += ["מנהל סחר", "מנהל אזור", "סוכן", "ערוץ"]
+    data["מנהל סחר"] = sub[managers_col] if managers_col in sub.columns else ""
+    data["מנהל אזור"] = sub[region_col] if region_col in sub.columns else ""
+    data["סוכן"] = sub[agent_col] if agent_col in sub.columns else ""
+    data["ערוץ"] = sub[channel_col] if channel_col in sub.columns else ""
+
+    col_order += ["קוד לקוח משלם", "לקוח משלם"]
+    data["קוד לקוח משלם"] = sub[payer_code_src] if payer_code_src in sub.columns else ""
+    data["לקוח משלם"] = sub[payer_name_src] if payer_name_src in sub.columns else ""
+    # if "שיטת תשלום לקוח משלם" in sub.columns:
+    #     col_order += ["שיטת תשלום לקוח משלם"]
+    #     data["שיטת תשלום לקוח משלם"] = sub["שיטת תשלום לקוח משלם"]
+
+    col_order += ["קוד סוכן"]
+    data["קוד סוכן"] = sub[agent_code_col] if agent_code_col in sub.columns else ""
+
+    if total_col:
+        col_order += [total_col]
+        data[total_col] = pd.to_numeric(sub[total_col], errors="coerce")
+    else:
+        col_order += [SUM_ANCHOR_TOTAL]
+        data[SUM_ANCHOR_TOTAL] = ""
+
+    if today_col:
+        col_order += [today_col]
+        data[today_col] = pd.to_numeric(sub[today_col], errors="coerce")
+    else:
+        col_order += [SUM_ANCHOR_AFTER_TODAY]
+        data[SUM_ANCHOR_AFTER_TODAY] = ""
+
+    for c in dyn_cols:
+        col_order.append(c)
+        data[c] = pd.to_numeric(sub[c], errors="coerce") if c in sub.columns else ""
+
+    # N: טור עזר
+    col_order.append(HELPER_COL_NAME)
+    if dyn_cols:
+        dyn_num = pd.concat([pd.to_numeric(sub[c], errors="coerce") for c in dyn_cols], axis=1)
+        data[HELPER_COL_NAME] = dyn_num.sum(axis=1, skipna=True)
+    else:
+        data[HELPER_COL_NAME] = 0.0
+
+    if "שיטת תשלום לקוח משלם" in sub.columns:
+        col_order.append("שיטת תשלום לקוח משלם")
+        data["שיטת תשלום לקוח משלם"] = sub["שיטת תשלום לקוח משלם"]
+
+    out_df = pd.DataFrame(data)[col_order]
+    return suppress_rows_by_helper(out_df, month_cols=dyn_cols, helper_col=HELPER_COL_NAME, threshold=-1000)
 
 def build_manager_sheets(
     processed_df: pd.DataFrame,
-    output_path: str,
+    output_path: BookTarget,
     managers_col: str = "מנהל סחר",
     max_month_cols_after_today: int = 4
 ) -> Tuple[int, List[str]]:
@@ -139,7 +167,7 @@ def build_manager_sheets(
     )
     managers = sorted(managers)
 
-    wb = load_workbook(output_path)
+    wb = load_book(output_path)
 
     # --- מחיקה עדינה: רק לשוניות מנהלים קודמות ---
     existing = list(wb.sheetnames)
@@ -160,83 +188,36 @@ def build_manager_sheets(
     used_names = set(wb.sheetnames)
     created = []
 
-    for m in managers:
-        sub = df.loc[df[managers_col].astype(str).str.strip() == m].copy()
-        if sub.empty:
+    # בונים את כל העמודות וטור העזר פעם אחת על כל המסגרת, ואז ממיינים לפי מנהל
+    # וחותכים לטווחים רציפים (searchsorted) – במקום סינון מלא של המסגרת לכל מנהל.
+    key = df[managers_col].astype(str).str.strip()
+    in_managers = key.isin(managers).to_numpy()
+    full = _assemble_manager_frame(
+        df.loc[in_managers], managers_col, region_col, agent_col, channel_col,
+        payer_code_src, payer_name_src, agent_code_col, total_col, today_col, dyn_cols,
+    )
+    codes = pd.Categorical(key[in_managers], categories=managers).codes
+    order = np.argsort(codes, kind="stable")  # יציב: סדר השורות בתוך כל מנהל נשמר
+    full = full.iloc[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(managers) + 1))
+
+    for i, m in enumerate(managers):
+        out_df = full.iloc[bounds[i]:bounds[i + 1]]
+        if out_df.empty:
             continue
 
-        col_order = []
-        data = {}
-
-        col_order += ["מנהל סחר", "מנהל אזור", "סוכן", "ערוץ"]
-        data["מנהל סחר"] = sub[managers_col] if managers_col in sub.columns else ""
-        data["מנהל אזור"] = sub[region_col] if region_col in sub.columns else ""
-        data["סוכן"] = sub[agent_col] if agent_col in sub.columns else ""
-        data["ערוץ"] = sub[channel_col] if channel_col in sub.columns else ""
-
-        col_order += ["קוד לקוח משלם", "לקוח משלם"]
-        data["קוד לקוח משלם"] = sub[payer_code_src] if payer_code_src in sub.columns else ""
-        data["לקוח משלם"] = sub[payer_name_src] if payer_name_src in sub.columns else ""
-        # if "שיטת תשלום לקוח משלם" in sub.columns:
-        #     col_order += ["שיטת תשלום לקוח משלם"]
-        #     data["שיטת תשלום לקוח משלם"] = sub["שיטת תשלום לקוח משלם"]
-
-        col_order += ["קוד סוכן"]
-        data["קוד סוכן"] = sub[agent_code_col] if agent_code_col in sub.columns else ""
-
-        if total_col:
-            col_order += [total_col]
-            data[total_col] = pd.to_numeric(sub[total_col], errors="coerce")
-        else:
-            col_order += [SUM_ANCHOR_TOTAL]
-            data[SUM_ANCHOR_TOTAL] = ""
-
-        if today_col:
-            col_order += [today_col]
-            data[today_col] = pd.to_numeric(sub[today_col], errors="coerce")
-        else:
-            col_order += [SUM_ANCHOR_AFTER_TODAY]
-            data[SUM_ANCHOR_AFTER_TODAY] = ""
-
-        for c in dyn_cols:
-            col_order.append(c)
-            data[c] = pd.to_numeric(sub[c], errors="coerce") if c in sub.columns else ""
-
-        # N: טור עזר
-        col_order.append(HELPER_COL_NAME)
-        if dyn_cols:
-            dyn_num = pd.concat([pd.to_numeric(sub[c], errors="coerce") for c in dyn_cols], axis=1)
-            data[HELPER_COL_NAME] = dyn_num.sum(axis=1, skipna=True)
-        else:
-            data[HELPER_COL_NAME] = 0.0
-            
-        if "שיטת תשלום לקוח משלם" in sub.columns:
-            col_order.append("שיטת תשלום לקוח משלם")
-            data["שיטת תשלום לקוח משלם"] = sub["שיטת תשלום לקוח משלם"]
-
-        out_df = pd.DataFrame(data)[col_order]
-        
-        out_df = suppress_rows_by_helper(out_df, month_cols=dyn_cols, helper_col=HELPER_COL_NAME, threshold=-1000)
-
-
         sheet_name = _sanitize_sheet_name(m, used_names)
         ws = wb.create_sheet(title=sheet_name)
 
-        ws.append(out_df.columns.tolist())
-        for _, row in out_df.iterrows():
-            ws.append(row.tolist())
-
-        _style_header(ws)
+        frame = FrameSheet(out_df)
         _add_column_sums_row(
-            ws,
+            frame,
             header_names=out_df.columns.tolist(),
             total_col=(total_col or SUM_ANCHOR_TOTAL),
             today_col=(today_col or SUM_ANCHOR_AFTER_TODAY),
         )
-        _autosize(ws)
+        write_frame_sheet(output_path, ws, frame)
         created.append(sheet_name)
-        
-
 
-    wb.save(output_path)
+    save_book(wb, output_path)
     return len(created), created
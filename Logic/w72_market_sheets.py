@@ -1,8 +1,8 @@
 from typing import List, Optional, Tuple
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
+from Logic.workbook_session import BookTarget, load_book, save_book
+from Logic.sheet_writer import FrameSheet, write_frame_sheet
+from Logic.agg_cube import AggCube, cube_for
 import re
 
 from Logic.w74_helper_suppression import suppress_rows_by_helper
@@ -40,53 +40,23 @@ def _dynamic_month_cols(df_cols: List[str], anchor: str, max_cols: int = 4) -> L
         return [c for c in df_cols[idx+1: idx+1+max_cols] if c in df_cols]
     return []
 
-def _style_header(ws):
-    header_fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-    for j in range(1, ws.max_column+1):
-        cell = ws.cell(row=1, column=j)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.fill = header_fill
-    ws.freeze_panes = "A2"
-    try:
-        ws.sheet_view.rightToLeft = True
-    except Exception:
-        pass
-
-def _autosize(ws):
-    for col_idx in range(1, ws.max_column + 1):
-        max_len = 0
-        for row_idx in range(1, ws.max_row + 1):
-            v = ws.cell(row=row_idx, column=col_idx).value
-            if v is None:
-                continue
-            max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max(12, max_len + 2), 60)
-
-def _add_column_sums_row(ws, header_names: List[str], total_col: str, today_col: str):
-    # סכום לכל H..N, שתי שורות אחרי הנתונים
-    name_to_idx0 = {n:i for i,n in enumerate(header_names)}
-    if total_col not in name_to_idx0 or today_col not in name_to_idx0 or HELPER_COL_NAME not in name_to_idx0:
-        return
-    first_sum_idx0 = name_to_idx0[total_col]           # H
-    last_sum_idx0  = name_to_idx0[HELPER_COL_NAME]     # N
+def _add_column_sums_row(frame: FrameSheet, header_names: List[str], total_col: str, today_col: str):
+    """
+    מגדיר שורת סכומים לכל העמודות מ-H עד N (כולל) שתי שורות מתחת לשורה האחרונה.
+    מניח שהעמודות כתובות לפי הסדר: ... G('קוד סוכן'), H(total_col), I(today_col), J..M(dyn), N(HELPER_COL_NAME)
+    """
+    if total_col not in header_names or today_col not in header_names or HELPER_COL_NAME not in header_names:
+        return  # אין מבנה מלא, לא כותבים סיכום
+
+    name_to_idx0 = {name: i for i, name in enumerate(header_names)}
+    first_sum_idx0 = name_to_idx0[total_col]       # H (0-based)
+    last_sum_idx0  = name_to_idx0[HELPER_COL_NAME] # N (0-based)
     if last_sum_idx0 < first_sum_idx0:
         return
 
-    last_row = ws.max_row
-    sum_row  = last_row + 2
-    label_col_excel = max(1, first_sum_idx0)           # G (עמודה לפני H)
-    ws.cell(row=sum_row, column=label_col_excel).value = "סכום :"
-    ws.cell(row=sum_row, column=label_col_excel).font  = Font(bold=True)
-
-    start_data = 2
-    for idx0 in range(first_sum_idx0, last_sum_idx0+1):
-        col_excel  = idx0 + 1
-        col_letter = get_column_letter(col_excel)
-        c = ws.cell(row=sum_row, column=col_excel)
-        c.value = f"=SUM({col_letter}{start_data}:{col_letter}{last_row})"
-        c.number_format = '#,##0.00'
-        c.font = Font(bold=True)
+    # "סכום :" בעמודה שלפני H -> כלומר G (עמודה מספר first_sum_idx0 ב-1-based)
+    frame.add_sum_footer(label_col=max(1, first_sum_idx0),
+                         first_col=first_sum_idx0 + 1, last_col=last_sum_idx0 + 1)
 
 def _build_manager_like_df(sub: pd.DataFrame, max_month_cols_after_today: int = 4) -> Tuple[pd.DataFrame, str, List[str]]:
     """
@@ -168,14 +138,16 @@ def _build_manager_like_df(sub: pd.DataFrame, max_month_cols_after_today: int =
 # ---------------- builders ----------------
 def build_private_market_like_manager(
     df_processed: pd.DataFrame,
-    output_path: str,
+    output_path: BookTarget,
     manager_name: str = "רפי מור יוסף-סחר",
     channel_value: str = "שוק פרטי",
     max_month_cols_after_today: int = 4,
-    sheet_name: str = "שוק פרטי"
+    sheet_name: str = "שוק פרטי",
+    cube: Optional[AggCube] = None,
 ) -> Tuple[bool, str]:
     """
     סינון לפי מנהל סחר + ערוץ, בניה במבנה מנהלים, דיכוי שורות לפי טור עזר < -1000, סכום H..N, כתיבה לגליון.
+    cube: הקובייה המשותפת של הריצה (w75) – הסינון נעשה לפי הקודים שלה.
     """
     if df_processed.empty:
         return False, sheet_name
@@ -186,22 +158,24 @@ def build_private_market_like_manager(
     if not mgr_col or not ch_col:
         return False, sheet_name
 
-    mgr_series_norm = df_processed[mgr_col].astype(str).map(_norm_text)
-    ch_series_norm  = df_processed[ch_col].astype(str).map(_norm_text)
     target_mgr = _norm_text(manager_name)
     target_ch  = _norm_text(channel_value)
+    is_mgr = lambda s: _norm_text(s) == target_mgr
+    is_ch = lambda s: _norm_text(s) == target_ch
 
-    mask = (mgr_series_norm == target_mgr) & (ch_series_norm == target_ch)
+    # הנרמול רץ על התוויות הייחודיות של הקובייה, לא על כל שורה
+    cube = cube_for(df_processed, cube, max_month_cols_after_today)
+    mask = cube.row_mask(**{"מנהל סחר": is_mgr, "ערוץ": is_ch})
     sub = df_processed.loc[mask].copy()
 
     # לוג בקרה מעודכן:
     total_rows = len(df_processed)
-    mgr_hits   = (mgr_series_norm == target_mgr).sum()
-    ch_hits    = (ch_series_norm  == target_ch).sum()
+    mgr_hits   = cube.count(**{"מנהל סחר": is_mgr})
+    ch_hits    = cube.count(**{"ערוץ": is_ch})
     print(f"[שוק פרטי] סה\"כ שורות: {total_rows} | התאמות מנהל(נרמל): {mgr_hits} | התאמות ערוץ(נרמל): {ch_hits} | חיתוך: {len(sub)}", flush=True)
 
     # לבקרה: כמה שורות נמצאו
-    print(f"[שוק פרטי] סה\"כ שורות: {len(df_processed)} | התאמות מנהל: {(df_processed[mgr_col].astype(str).str.strip()==manager_name).sum()} | התאמות ערוץ: {(df_processed[ch_col].astype(str).str.strip()==channel_value).sum()} | חיתוך: {len(sub)}", flush=True)
+    print(f"[שוק פרטי] סה\"כ שורות: {len(df_processed)} | התאמות מנהל: {cube.count(**{'מנהל סחר': lambda s: s.strip() == manager_name})} | התאמות ערוץ: {cube.count(**{'ערוץ': lambda s: s.strip() == channel_value})} | חיתוך: {len(sub)}", flush=True)
 
     if sub.empty:
         return False, sheet_name
@@ -222,31 +196,29 @@ def build_private_market_like_manager(
     print(f"[שוק פרטי] דוכאו (helper<-1000): {marked} שורות", flush=True)
     out_df = out_df2
 
-    wb = load_workbook(output_path)
+    wb = load_book(output_path)
     if sheet_name in wb.sheetnames:
         del wb[sheet_name]
     ws = wb.create_sheet(title=sheet_name)
 
-    ws.append(out_df.columns.tolist())
-    for _, row in out_df.iterrows():
-        ws.append(row.tolist())
-
-    _style_header(ws)
-    _add_column_sums_row(ws, header_names=out_df.columns.tolist(),
+    frame = FrameSheet(out_df)
+    _add_column_sums_row(frame, header_names=out_df.columns.tolist(),
                          total_col=SUM_ANCHOR_TOTAL, today_col=SUM_ANCHOR_AFTER_TODAY)
-    _autosize(ws)
-    wb.save(output_path)
+    write_frame_sheet(output_path, ws, frame)
+    save_book(wb, output_path)
     return True, sheet_name
 
 def build_tedmiti_full_columns(
     df_processed: pd.DataFrame,
-    output_path: str,
+    output_path: BookTarget,
     manager_name: str = "עמי חכמון",
     sheet_name: str = "שוק תדמיתי",
-    max_month_cols_after_today: int = 4
+    max_month_cols_after_today: int = 4,
+    cube: Optional[AggCube] = None,
 ) -> Tuple[bool, str]:
     """
     סינון לפי מנהל סחר בלבד, בניה במבנה מנהלים, דיכוי לפי טור עזר < -1000, סכום H..N, כתיבה לגליון.
+    cube: כמו ב-build_private_market_like_manager.
     """
     if df_processed.empty:
         return False, sheet_name
@@ -256,7 +228,8 @@ def build_tedmiti_full_columns(
     if not mgr_col:
         return False, sheet_name
 
-    sub = df_processed.loc[(df_processed[mgr_col].astype(str).str.strip() == manager_name)].copy()
+    cube = cube_for(df_processed, cube, max_month_cols_after_today)
+    sub = df_processed.loc[cube.row_mask(**{"מנהל סחר": lambda s: s.strip() == manager_name})].copy()
     if sub.empty:
         return False, sheet_name
 
@@ -269,18 +242,14 @@ def build_tedmiti_full_columns(
 
     out_df = suppress_rows_by_helper(out_df, month_cols=dyn_for_suppress, helper_col=HELPER_COL_NAME, threshold=-1000)
 
-    wb = load_workbook(output_path)
+    wb = load_book(output_path)
     if sheet_name in wb.sheetnames:
         del wb[sheet_name]
     ws = wb.create_sheet(title=sheet_name)
 
-    ws.append(out_df.columns.tolist())
-    for _, row in out_df.iterrows():
-        ws.append(row.tolist())
-
-    _style_header(ws)
-    _add_column_sums_row(ws, header_names=out_df.columns.tolist(),
+    frame = FrameSheet(out_df)
+    _add_column_sums_row(frame, header_names=out_df.columns.tolist(),
                          total_col=SUM_ANCHOR_TOTAL, today_col=SUM_ANCHOR_AFTER_TODAY)
-    _autosize(ws)
-    wb.save(output_path)
+    write_frame_sheet(output_path, ws, frame)
+    save_book(wb, output_path)
     return True, sheet_name
\ No newline at end of file
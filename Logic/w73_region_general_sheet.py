@@ -1,9 +1,8 @@
 import re
 from typing import List, Optional, Tuple
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment, PatternFill
+from Logic.workbook_session import BookTarget, load_book, save_book
+from Logic.sheet_writer import FrameSheet, write_frame_sheet
 from Logic.w74_helper_suppression import suppress_rows_by_helper
 
 
@@ -24,33 +23,13 @@ def _dynamic_month_cols(df_cols: List[str], anchor: str, max_cols: int = 4) -> L
         return [c for c in df_cols[idx+1 : idx+1+max_cols] if c in df_cols]
     return []
 
-def _autosize(ws):
-    for col_idx in range(1, ws.max_column + 1):
-        max_len = 0
-        for row_idx in range(1, ws.max_row + 1):
-            v = ws.cell(row=row_idx, column=col_idx).value
-            if v is None: continue
-            max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max(12, max_len + 2), 60)
-
-def _style_header(ws):
-    header_fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-    for j in range(1, ws.max_column+1):
-        cell = ws.cell(row=1, column=j)
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.fill = header_fill
-    ws.freeze_panes = "A2"
-    try: ws.sheet_view.rightToLeft = True
-    except Exception: pass
-
-def _add_column_sums_row(ws, header_names: List[str], total_col: str, today_col: str):
+def _add_column_sums_row(frame: FrameSheet, header_names: List[str], total_col: str, today_col: str):
     """
-    מוסיף שורת סכומים לכל העמודות מ-H עד N (כולל) שתי שורות מתחת לשורה האחרונה.
-    מניח סדר: ... G('קוד סוכן'), H(total_col), I(today_col), J..M(dyn), N(HELPER_COL_NAME).
+    מגדיר שורת סכומים לכל העמודות מ-H עד N (כולל) שתי שורות מתחת לשורה האחרונה.
+    מניח שהעמודות כתובות לפי הסדר: ... G('קוד סוכן'), H(total_col), I(today_col), J..M(dyn), N(HELPER_COL_NAME)
     """
     if total_col not in header_names or today_col not in header_names or HELPER_COL_NAME not in header_names:
-        return
+        return  # אין מבנה מלא, לא כותבים סיכום
 
     name_to_idx0 = {name: i for i, name in enumerate(header_names)}
     first_sum_idx0 = name_to_idx0[total_col]       # H (0-based)
@@ -58,21 +37,9 @@ def _add_column_sums_row(ws, header_names: List[str], total_col: str, today_col:
     if last_sum_idx0 < first_sum_idx0:
         return
 
-    last_row = ws.max_row
-    sum_row  = last_row + 2  # שתי שורות מתחת לשורה האחרונה
-
-    # "סכום :" בעמודה שלפני H -> כלומר G (0-based H => label col = H-1 => first_sum_idx0)
-    label_col_excel = max(1, first_sum_idx0)
-    ws.cell(row=sum_row, column=label_col_excel).value = "סכום :"
-    ws.cell(row=sum_row, column=label_col_excel).font = Font(bold=True)
-
-    start_data_row = 2  # אחרי שורת כותרת
-    for idx0 in range(first_sum_idx0, last_sum_idx0 + 1):
-        col_excel = idx0 + 1
-        col_letter = get_column_letter(col_excel)
-        ws.cell(row=sum_row, column=col_excel).value = f"=SUM({col_letter}{start_data_row}:{col_letter}{last_row})"
-        ws.cell(row=sum_row, column=col_excel).number_format = '#,##0.00'
-        ws.cell(row=sum_row, column=col_excel).font = Font(bold=True)
+    # "סכום :" בעמודה שלפני H -> כלומר G (עמודה מספר first_sum_idx0 ב-1-based)
+    frame.add_sum_footer(label_col=max(1, first_sum_idx0),
+                         first_col=first_sum_idx0 + 1, last_col=last_sum_idx0 + 1)
 
 def _drop_total_like_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -108,7 +75,7 @@ def _drop_total_like_rows(df: pd.DataFrame) -> pd.DataFrame:
 # ---------- main builder ----------
 def build_region_general_full_columns(
     processed_df: pd.DataFrame,
-    output_path: str,
+    output_path: BookTarget,
     sheet_name: str = "מנהל אזור כללי",
     max_month_cols_after_today: int = 4
 ) -> Tuple[bool, str]:
@@ -191,24 +158,20 @@ def build_region_general_full_columns(
 
 
     # כתיבה לקובץ
-    wb = load_workbook(output_path)
+    wb = load_book(output_path)
     if sheet_name in wb.sheetnames:
         del wb[sheet_name]
     ws = wb.create_sheet(title=sheet_name)
 
-    ws.append(out_df.columns.tolist())
-    for _, row in out_df.iterrows():
-        ws.append(row.tolist())
-
-    _style_header(ws)
+    frame = FrameSheet(out_df)
     _add_column_sums_row(
-        ws,
+        frame,
         header_names=out_df.columns.tolist(),
         total_col=total_col,
         today_col=today_col
     )
-    _autosize(ws)
+    write_frame_sheet(output_path, ws, frame)
     
 
-    wb.save(output_path)
+    save_book(wb, output_path)
     return True, sheet_name
\ No newline at end of file
@@ -1,7 +1,7 @@
 import re
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
-from openpyxl import load_workbook
+from Logic.workbook_session import BookTarget, load_book, save_book
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
@@ -114,7 +114,7 @@ def _collect_month_cols(hmap: Dict[str, int]) -> List[int]:
 
 def build_by_agent_sheet(
     processed_df: pd.DataFrame,   # לא בשימוש כרגע – שמור להרחבות
-    output_path: str,
+    output_path: BookTarget,
     pivot_sheet_name: str = SHEET_PIVOT_PRIVATE_DEFAULT,
     sheet_name: str = SHEET_BY_AGENT_DEFAULT,
     max_month_cols: int = 4,
@@ -183,7 +183,7 @@ def build_by_agent_sheet(
         return rows_local, month_headers_local
 
     # --- קריאה לפיבוטים בערכי חישוב (data_only) ---
-    wb_vals = load_workbook(output_path, data_only=True)
+    wb_vals = load_book(output_path, data_only=True)
     if pivot_sheet_name not in wb_vals.sheetnames:
         print(f"[לפי סוכן] לא נמצא גיליון פיבוט: {pivot_sheet_name}", flush=True)
         return False, sheet_name, 0
@@ -216,7 +216,7 @@ def build_by_agent_sheet(
         return False, sheet_name, 0
 
     # --- כתיבה עם נוסחאות/עיצוב ---
-    wb = load_workbook(output_path)
+    wb = load_book(output_path)
     if sheet_name in wb.sheetnames:
         del wb[sheet_name]
     ws = wb.create_sheet(title=sheet_name)
@@ -285,7 +285,7 @@ def build_by_agent_sheet(
             ws.cell(row=r, column=c).number_format = NUMBER_FMT
 
     _autosize(ws)
-    wb.save(output_path)
+    save_book(wb, output_path)
     print(f"[לפי סוכן] נמצא {len(rows_all)} שורות | חודשי פיגור: {months_count}", flush=True)
     return True, sheet_name, len(rows_all)
 
@@ -1,6 +1,6 @@
 import re
 from typing import Tuple, List
-from openpyxl import load_workbook
+from Logic.workbook_session import BookTarget, load_book, pending_frame, save_book
 
 MANAGER_HEADER = "מנהל סחר"
 REGION_HEADERS = ("מנהל אזור", "מנהל איזור")
@@ -12,7 +12,7 @@ def _match(value, pat: re.Pattern) -> bool:
     return bool(pat.search(s))
 
 def refine_rafi_sheet_rows(
-    xlsx_path: str,
+    xlsx_path: BookTarget,
     target_base: str = "רפי מור יוסף",
     display_text: str = "רפי מור יוסף- סחר",
 ) -> Tuple[bool, List[str], List[int]]:
@@ -21,7 +21,7 @@ def refine_rafi_sheet_rows(
       1) מוחק שורות שבהן בעמודת 'מנהל אזור/איזור' אין התאמה ל'רפי מור יוסף' (כולל וריאציה '- סחר').
       2) מעדכן בשורות שנותרו את 'מנהל סחר' וגם את 'מנהל אזור/איזור' ל-display_text.
     """
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     touched, deleted_counts = [], []
 
     # התאמה: 'רפי מור יוסף' עם/בלי ' - סחר'
@@ -39,6 +39,22 @@ def refine_rafi_sheet_rows(
         if not col_region:
             continue
 
+        frame = pending_frame(xlsx_path, sh)
+        if frame is not None:
+            # הגוף עוד לא נכתב: מסננים את ה-DataFrame עצמו.
+            # השורה הריקה ושורת הסכום נמחקות תמיד (אין בהן מנהל אזור) – בדיוק כמו במחיקת השורות מהגיליון.
+            keep = frame.df.iloc[:, col_region - 1].map(lambda v: _match(v, pat)).astype(bool)
+            n_deleted = int((~keep).sum()) + len(frame.footer)
+            frame.drop_rows(~keep)
+            frame.footer = []
+            if col_manager:
+                frame.set_column(col_manager, display_text)
+            frame.set_column(col_region, display_text)
+            if n_deleted:
+                touched.append(sh)
+                deleted_counts.append(n_deleted)
+            continue
+
         # סימון שורות למחיקה אם "מנהל אזור/איזור" לא רפי
         to_delete = []
         for r in range(2, ws.max_row + 1):
@@ -61,7 +77,7 @@ def refine_rafi_sheet_rows(
             deleted_counts.append(len(to_delete))
 
     if touched:
-        wb.save(xlsx_path)
+        save_book(wb, xlsx_path)
         wb.close()
         return True, touched, deleted_counts
 
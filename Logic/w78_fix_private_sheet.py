@@ -1,4 +1,4 @@
-from openpyxl import load_workbook
+from Logic.workbook_session import BookTarget, load_book, pending_frame, save_book
 from typing import Tuple, List
 
 REGION_HEADERS = ("מנהל אזור", "מנהל איזור")
@@ -13,7 +13,7 @@ def _find_region_col(headers: List[str]) -> int:
     return 0
 
 def refine_private_region_rows(
-    xlsx_path: str,
+    xlsx_path: BookTarget,
     sheet_name: str = "שוק פרטי",
     forbidden_substr: str = "רפי מור יוסף"
 ) -> Tuple[bool, int]:
@@ -21,12 +21,14 @@ def refine_private_region_rows(
     מוחק מגיליון 'שוק פרטי' כל שורה שבה בעמודת מנהל אזור/איזור מופיע 'רפי מור יוסף'.
     מחזיר (בוצע_שינוי, כמות_מחיקות).
     """
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     if sheet_name not in wb.sheetnames:
         return False, 0
 
     ws = wb[sheet_name]
-    if ws.max_row < 2 or ws.max_column < 1:
+    frame = pending_frame(xlsx_path, sheet_name)
+    n_rows = (1 + len(frame.df) + len(frame.footer)) if frame is not None else ws.max_row
+    if n_rows < 2 or ws.max_column < 1:
         return False, 0
 
     headers = [ (ws.cell(row=1, column=c).value or "").strip() for c in range(1, ws.max_column+1) ]
@@ -34,6 +36,15 @@ def refine_private_region_rows(
     if region_col == 0:
         return False, 0
 
+    if frame is not None:
+        # הגוף עוד לא נכתב: מסננים את ה-DataFrame; נוסחאות שורת הסכום נשארות כפי שהיו (כמו אחרי delete_rows)
+        values = frame.df.iloc[:, region_col - 1]
+        drop = values.map(lambda v: forbidden_substr in ("" if v is None else str(v).strip())).astype(bool)
+        if not drop.any():
+            return False, 0
+        frame.drop_rows(drop)
+        return True, int(drop.sum())
+
     rows_to_delete = []
     for r in range(2, ws.max_row + 1):
         val = ws.cell(row=r, column=region_col).value
@@ -48,5 +59,5 @@ def refine_private_region_rows(
     for r in reversed(rows_to_delete):
         ws.delete_rows(r, 1)
 
-    wb.save(xlsx_path)
+    save_book(wb, xlsx_path)
     return True, len(rows_to_delete)
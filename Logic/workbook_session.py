@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple, Union
+from openpyxl import Workbook, load_workbook
+
+
+class WorkbookSession:
+    """
+    Workbook פתוח אחד (בזיכרון) עבור קובץ הפלט של הריצה.
+    כל הבונים והמעצבים עובדים על אותו אובייקט, והשמירה לדיסק מתבצעת פעם אחת ב-save().
+
+    streaming=True: גיליונות שנבנו מ-DataFrame (FrameSheet) מחזיקים בזיכרון רק את שורת הכותרת;
+    גוף הנתונים נכתב ב-save() ישירות ל-Workbook במצב write-only, שורה אחר שורה.
+    קוד שצריך לקרוא/לערוך את גוף גיליון כזה משתמש ב-frame(name) או קורא קודם ל-materialize(name).
+    """
+
+    def __init__(self, path: str, wb: Optional[Workbook] = None, streaming: bool = False):
+        self.path = path
+        self.wb = wb if wb is not None else load_workbook(path)
+        self.streaming = streaming
+        self._frames: Dict[str, Tuple[object, object]] = {}
+
+    @classmethod
+    def new(cls, path: str, streaming: bool = False) -> "WorkbookSession":
+        """סשן לקובץ פלט חדש (בלי הגיליון הריק שנוצר כברירת מחדל)."""
+        wb = Workbook()
+        wb.remove(wb.active)
+        return cls(path, wb=wb, streaming=streaming)
+
+    @property
+    def sheetnames(self):
+        return self.wb.sheetnames
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.wb.sheetnames
+
+    def __getitem__(self, name: str):
+        return self.wb[name]
+
+    @contextmanager
+    def isolate(self):
+        """
+        אם הבלוק נכשל – רשימת הלשוניות חוזרת למה שהייתה לפניו, והחריגה עוברת הלאה:
+        לשוניות שנוצרו בתוכו נמחקות, ולשונית שנמחקה או הוחלפה (בונה שמוחק גיליון קיים באותו שם ויוצר חדש)
+        חוזרת כמו שהייתה. כך נשמרת ההתנהגות הקודמת – בונה שנכשל לא השאיר גיליון חצי-כתוב (כי לא הגיע ל-save).
+
+        מגבלה: זה לא snapshot של תוכן. עריכה במקום של לשונית שהייתה קיימת לפני הבלוק (ערכים, עיצוב,
+        שורות שנמחקו) לא מתבטלת ותישמר בקובץ – בונה שעורך לשונית קיימת צריך לעשות זאת רק אחרי שהחלק
+        שעלול להיכשל הסתיים, או לא לרוץ בתוך isolate.
+        """
+        before, active = list(self.wb._sheets), self.wb._active_sheet_index
+        try:
+            yield self
+        except Exception:
+            self.wb._sheets[:] = before
+            self.wb._active_sheet_index = active
+            raise
+
+    # ---------- גיליונות שגופם נדחה לשמירה ----------
+    def defer(self, ws, frame) -> None:
+        self._frames[ws.title] = (ws, frame)
+
+    def frame(self, name: str):
+        """ה-FrameSheet הממתין של הגיליון (או None אם הגיליון רגיל / כבר נכתב)."""
+        entry = self._frames.get(name)
+        if entry is None or name not in self.wb.sheetnames or self.wb[name] is not entry[0]:
+            return None
+        return entry[1]
+
+    def materialize(self, name: str) -> None:
+        """כותב עכשיו את גוף הגיליון לתוך ה-Workbook (לקוד שקורא תאים ישירות)."""
+        frame = self.frame(name)
+        if frame is not None:
+            frame.write_body(self.wb[name])
+        self._frames.pop(name, None)
+
+    def save(self, path=None):
+        """שמירה לנתיב (ברירת מחדל: של הסשן) או לאובייקט קובץ (BytesIO). מחזיר את היעד."""
+        return self.save_with_values(path)[0]
+
+    def save_with_values(self, path=None, values: Optional[Dict[str, Dict[Tuple[int, int], object]]] = None,
+                         full_calc_on_load: bool = True, copied=None):
+        """
+        כמו save, כשלצד כל נוסחה שיש לה ערך ב-values ({גיליון: {(שורה, עמודה): ערך}}) נכתב גם הערך (<v>) –
+        באותה כתיבה של הקובץ. full_calc_on_load=False: בלי fullCalcOnLoad (Excel לא צריך לחשב הכל בפתיחה).
+        copied: SheetPartCopy – הגיליונות שלו נכתבים מה-XML של הפלט הקודם (שכבר כולל את הערכים).
+        מחזיר (היעד, כמה ערכים נכתבו).
+        """
+        target = path if path is not None else self.path
+        values = values or {}
+        reused = set(copied.names) if copied is not None else set()
+        if not reused and not values and not any(self.frame(n) is not None for n in self.wb.sheetnames):
+            self.wb.save(target)
+            return target, 0
+
+        from Logic.sheet_writer import stream_sheet
+
+        out = Workbook(write_only=True)
+        if not full_calc_on_load:
+            out.calculation.fullCalcOnLoad = None
+        written = 0
+        for ws in self.wb.worksheets:
+            wo = out.create_sheet(title=ws.title)
+            if ws.title in reused:
+                copied.write_to(wo)
+                written += len(values.get(ws.title, ()))
+            else:
+                written += stream_sheet(ws, wo, self.frame(ws.title), values.get(ws.title))
+        out.save(target)
+        return target, written
+
+    def sheet_frame(self, name: str, values: Optional[Dict[Tuple[int, int], object]] = None):
+        """
+        הגיליון כ-DataFrame (שורה 1 = כותרות), בלי לשמור לדיסק.
+        גיליון FrameSheet ממתין -> שורות הנתונים מה-DataFrame שלו (בלי שורת הסכום), עם הכותרות שבגיליון;
+        גיליון רגיל -> ערכי התאים, כשבמקום נוסחה שחושבה נכנס הערך מ-values ({(שורה, עמודה): ערך}).
+        """
+        import pandas as pd
+
+        ws = self.wb[name]
+        frame = self.frame(name)
+        if frame is not None:
+            df = frame.df.copy()
+            header = [c.value for c in ws[1]][:len(df.columns)]
+            if len(header) == len(df.columns):
+                df.columns = header
+            return df
+        rows = [list(r) for r in ws.iter_rows(values_only=True)]
+        for (r, c), v in (values or {}).items():
+            if r <= len(rows) and c <= len(rows[r - 1]):
+                rows[r - 1][c - 1] = v
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows[1:], columns=rows[0])
+
+    def close(self):
+        self.wb.close()
+
+
+BookTarget = Union[str, WorkbookSession]
+
+
+def load_book(target: BookTarget, data_only: bool = False) -> Workbook:
+    """נתיב -> load_workbook (כמו קודם); WorkbookSession -> ה-Workbook הפתוח, בלי קריאה מהדיסק."""
+    if isinstance(target, WorkbookSession):
+        return target.wb
+    return load_workbook(target, data_only=data_only)
+
+
+def pending_frame(target: BookTarget, name: str):
+    """ה-FrameSheet שגופו עדיין לא נכתב (רק בסשן streaming), אחרת None – ואז עובדים על התאים כרגיל."""
+    if isinstance(target, WorkbookSession):
+        return target.frame(name)
+    return None
+
+
+def save_book(wb: Workbook, target: BookTarget) -> None:
+    """נתיב -> wb.save (כמו קודם); WorkbookSession -> לא עושה כלום, השמירה תתבצע ב-session.save()."""
+    if isinstance(target, WorkbookSession):
+        return
+    wb.save(target)
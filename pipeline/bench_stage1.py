@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from pipeline.gen_qs import QSProfile, generate_qs
+from pipeline.run_stage1 import Stage1Config, run_stage1
+
+"""
+בנצ'מרק לשלב 1: מחולל QS סינתטי בכל גודל (gen_qs), מריץ את כל הצינור עם כל הדוחות הנגזרים,
+ושומר לכל גודל את מדידות run_report (זמן קיר / CPU / שורות / תאים / זיכרון) של כל שלב וכל דוח ל-JSON.
+עם --repeat N נשמר לכל שלב המינימום על פני N הרצות (פחות רעש). --compare A.json B.json – השוואה בין שתי ריצות.
+"""
+
+DEFAULT_SIZES = "10000,100000,1000000"
+REPORT_FLAGS = dict(drop_empty=True, split_by_manager=True, market_private=True, market_tedmiti=True,
+                    region_general=True, pivot_private=True, pivot_tedmiti=True, by_agent=True)
+_KEEP = ("wall_s", "cpu_s", "rows_in", "rows_out", "cells_written", "py_peak_mb", "rss_peak_mb", "status")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def input_for(work_dir: str, rows: int, seed: int = 1) -> str:
+    """QS סינתטי ב-work_dir/qs_<rows>.xlsx – מחולל פעם אחת ונשמר לריצות הבאות (אותו seed = אותו קובץ)."""
+    path = os.path.join(work_dir, f"qs_{rows}_s{seed}.xlsx")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        tmp = path + ".tmp.xlsx"
+        generate_qs(tmp, QSProfile(rows=rows, seed=seed))
+        os.replace(tmp, path)
+        print(f"    חולל: {path} ({time.perf_counter() - t0:.1f} ש')", flush=True)
+    return path
+
+
+def _merge_min(best: Dict[str, dict], stages: List[dict]) -> None:
+    """לכל שלב – ההרצה עם זמן הקיר הקצר ביותר."""
+    for st in stages:
+        name = st["stage"]
+        if name not in best or st["wall_s"] < best[name]["wall_s"]:
+            best[name] = {k: st.get(k) for k in _KEEP}
+
+
+def bench_size(path: str, out_dir: str, repeat: int = 1, workers: int = 1, memory: bool = False,
+               keep_output: bool = False) -> dict:
+    """
+    מריץ את שלב 1 על path repeat פעמים; הלוג של כל הרצה נכתב ל-out_dir/_logs.
+    keep_output: הפלט של ההרצה האחרונה נשאר (לבדיקת שקילות מול ריצה אחרת ב-compare_outputs).
+    """
+    log_dir = os.path.join(out_dir, "_logs")
+    os.makedirs(log_dir, exist_ok=True)
+    best: Dict[str, dict] = {}
+    totals = []
+    for i in range(repeat):
+        cfg = Stage1Config(path, output_dir=out_dir, no_cache=True, force=True, report_workers=workers,
+                           memory_report=memory, **REPORT_FLAGS)
+        log_path = os.path.join(log_dir, f"{os.path.splitext(os.path.basename(path))[0]}_{i + 1}.log")
+        with open(log_path, "w", encoding="utf-8") as log, redirect_stdout(log):
+            result = run_stage1(cfg)
+        data = result.run_report.to_dict()
+        totals.append(data["wall_s"])
+        _merge_min(best, data["stages"])
+        last = i == repeat - 1
+        if result.output_path and os.path.exists(result.output_path) and not (keep_output and last):
+            os.remove(result.output_path)  # הקובץ עצמו לא נדרש לבנצ'מרק, רק המדידות
+    return {
+        "input": path,
+        "input_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+        "rows": len(result.processed),
+        "wall_s": min(totals),
+        "wall_s_all": totals,
+        "output": result.output_path if keep_output else None,
+        "stages": best,
+    }
+
+
+def run_bench(sizes: List[int], work_dir: str, repeat: int = 1, workers: int = 1, memory: bool = False,
+              seed: int = 1, keep_output: bool = False) -> dict:
+    os.makedirs(work_dir, exist_ok=True)
+    # תיקיית פלט לכל ריצת בנצ'מרק – שמות הפלט של שלב 1 מדויקים רק לדקה
+    out_dir = os.path.join(work_dir, "out", datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+    results = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "report_workers": workers,
+            "memory_report": memory,
+            "seed": seed,
+        },
+        "sizes": {},
+    }
+    for rows in sizes:
+        print(f"[בנצ'מרק] {rows:,} שורות...", flush=True)
+        path = input_for(work_dir, rows, seed)
+        res = bench_size(path, out_dir, repeat, workers, memory, keep_output)
+        results["sizes"][str(rows)] = res
+        print(f"    {res['wall_s']:.2f} ש' ({len(res['stages'])} שלבים)", flush=True)
+    return results
+
+
+def compare(a: dict, b: dict) -> List[str]:
+    """טבלת השוואה: לכל גודל ושלב – זמן קיר ב-A, ב-B, והיחס B/A (< 1 = B מהיר יותר)."""
+    lines = [f"A: {a['meta'].get('commit')} {a['meta'].get('date')}",
+             f"B: {b['meta'].get('commit')} {b['meta'].get('date')}"]
+    for size in a["sizes"]:
+        if size not in b["sizes"]:
+            continue
+        sa, sb = a["sizes"][size]["stages"], b["sizes"][size]["stages"]
+        names = list(sa) + [n for n in sb if n not in sa]
+        width = max([len(n) for n in names] + [5])
+        lines.append("")
+        lines.append(f"[{int(size):,} שורות]")
+        lines.append(f"    {'שלב':<{width}} {'A(ש)':>9} {'B(ש)':>9} {'B/A':>7}")
+        rows = [(n, sa.get(n, {}).get("wall_s"), sb.get(n, {}).get("wall_s")) for n in names]
+        rows.append(('סה"כ', a["sizes"][size]["wall_s"], b["sizes"][size]["wall_s"]))
+        for name, ta, tb in rows:
+            fa = "" if ta is None else f"{ta:.3f}"
+            fb = "" if tb is None else f"{tb:.3f}"
+            ratio = f"{tb / ta:.2f}" if ta and tb is not None else ""
+            lines.append(f"    {name:<{width}} {fa:>9} {fb:>9} {ratio:>7}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench_stage1", description="בנצ'מרק לשלבים ולדוחות של שלב 1 על QS סינתטי")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"מספרי שורות מופרדים בפסיק (ברירת מחדל: {DEFAULT_SIZES})")
+    parser.add_argument("--work-dir", default=os.path.join(BASE_DIR, "_bench"),
+                        help="תיקייה לקבצי ה-QS המחוללים ולפלטים (הקבצים נשמרים בין ריצות)")
+    parser.add_argument("--out", default=None, help="קובץ JSON לתוצאות (ברירת מחדל: <work-dir>/bench_<תאריך>.json)")
+    parser.add_argument("--repeat", type=int, default=1, help="כמה הרצות לכל גודל (נשמר המינימום לכל שלב)")
+    parser.add_argument("--report-workers", type=int, default=1, help="כמו בשורת הפקודה של שלב 1")
+    parser.add_argument("--memory-report", action="store_true", help="גם שיא זיכרון לכל שלב (מאט את הריצה)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-output", action="store_true",
+                        help="לשמור את קובץ הפלט לכל גודל (לבדיקת שקילות ב-pipeline.compare_outputs)")
+    parser.add_argument("--compare", nargs=2, metavar=("A.json", "B.json"), help="השוואת שתי תוצאות בלי להריץ")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as fa, open(args.compare[1], encoding="utf-8") as fb:
+            for line in compare(json.load(fa), json.load(fb)):
+                print(line, flush=True)
+        return None
+
+    sizes = [int(s.replace("_", "")) for s in args.sizes.split(",") if s.strip()]
+    results = run_bench(sizes, args.work_dir, args.repeat, args.report_workers, args.memory_report, args.seed,
+                        args.keep_output)
+    out = args.out or os.path.join(args.work_dir, f"bench_{datetime.now():%Y-%m-%d_%H-%M}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"תוצאות: {out}", flush=True)
+    return out
+
+
+if __name__ == "__main__":
+    main()
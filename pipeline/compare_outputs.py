@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from Logic.golden_compare import compare_workbooks
+
+"""
+בדיקת שקילות בין פלט "זהב" לפלט חדש (למשל לפני/אחרי אופטימיזציה של w71–w90, על אותו QS מ-gen_qs):
+    python -m pipeline.compare_outputs golden.xlsx new.xlsx --max-diffs 20
+קוד יציאה 0 = זהים, 1 = יש הבדלים.
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="compare_outputs", description="השוואת שני קובצי פלט גיליון-גיליון")
+    parser.add_argument("golden", help="קובץ הייחוס (A)")
+    parser.add_argument("candidate", help="הקובץ החדש (B)")
+    parser.add_argument("--max-diffs", type=int, default=20, help="כמה הבדלים להציג לכל גיליון (כולם נספרים)")
+    parser.add_argument("--ignore-style", action="store_true",
+                        help="רק ערכים, נוסחאות ומיזוגים – בלי פורמט מספר, גופן, מילוי, גבולות, יישור, רוחבים ותצוגה")
+    parser.add_argument("--float-tol", type=float, default=0.0, help="הפרש מספרי מותר (מוחלט) בערכים ובערכים המחושבים")
+    parser.add_argument("--ignore-cached", action="store_true",
+                        help="נוסחאות לפי הטקסט בלבד, בלי הערך המחושב השמור (פלט זהב מלפני שמירת הערכים)")
+    parser.add_argument("--sheet", action="append", default=None, help="רק הגיליון הזה (אפשר כמה פעמים)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    total, results, notes = compare_workbooks(args.golden, args.candidate, args.max_diffs, args.ignore_style,
+                                              args.float_tol, args.sheet, args.ignore_cached)
+    for note in notes:
+        print(f"• {note}", flush=True)
+    for res in results:
+        if not res.count:
+            continue
+        print(f"[{res.name}] {res.count} הבדלים", flush=True)
+        for d in res.shown:
+            print(f"    {d}", flush=True)
+        if res.count > len(res.shown):
+            print(f"    ... ועוד {res.count - len(res.shown)}", flush=True)
+    checked = len(results)
+    if total:
+        print(f"נמצאו {total} הבדלים ב-{checked} גיליונות ({time.perf_counter() - t0:.1f} ש')", flush=True)
+        return 1
+    print(f"זהים: {checked} גיליונות ({time.perf_counter() - t0:.1f} ש')", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
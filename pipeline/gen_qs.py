@@ -0,0 +1,217 @@
+import argparse
+import calendar
+import os
+import random
+import sys
+
+from openpyxl import Workbook
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from Logic.headers_stage1 import DESIRED_HEADERS
+
+"""
+מחולל קובצי QS סינתטיים (לבדיקות ביצועים ולהשוואת פלטים):
+אותן כותרות כמו ב-headers_stage1 (+ 'שיטת תשלום לקוח משלם'), כותרות הסכומים החודשיות מתגלגלות לפי חודש הדוח
+(כמו ב-QS אמיתי: 'טרם חודש Jul', 'לחודש Aug עד היום', ...), אותם שמות מנהלים/סוכנים שהדוחות הנגזרים מחפשים
+(רפי / עמי חכמון / הרשתות הארציות / גילי, יעל, ארז...), ובלוקים של תאים ממוזגים, שורות 'סה"כ',
+שורות 'ייצוא', שורות 'אחר', 'חובות מסופקים', קודי סוכן לא תקינים וסכומים בכל הפורמטים שהמנרמל מכיר.
+הכתיבה במצב write-only, כך שגם מיליון שורות לא נטענות לזיכרון.
+"""
+
+# שורה 1: 4 העמודות הראשונות, שיטת תשלום, קוד לקוח / לקוח / קוד סוכן, ואז כותרות הסכומים
+FRONT_HEADERS = DESIRED_HEADERS[:4] + ["שיטת תשלום לקוח משלם"] + DESIRED_HEADERS[4:7]
+
+
+def amount_headers(month: int) -> list:
+    """9 כותרות הסכומים של QS שהופק בחודש month (1-12) – שני הסה"כ ו-7 העמודות החודשיות המתגלגלות."""
+    name = lambda k: calendar.month_abbr[(month - 1 + k) % 12 + 1]
+    return [
+        DESIRED_HEADERS[7],
+        DESIRED_HEADERS[8],
+        f"סכום יתרת חוב טרם חודש {name(-1)}",
+        f"סכום יתרת חוב לחודש {name(-1)}",
+        f"סכום יתרת חוב לחודש {name(0)} עד היום",
+        f"סכום יתרת חוב לחודש {name(0)} ממחר עד סוף החודש",
+        f"סכום יתרת חוב לחודש {name(1)}",
+        f"סכום יתרת חוב לחודש {name(2)} ",
+        f"סכום יתרת חוב מעבר לחודש {name(2)}",
+    ]
+
+
+PRIVATE_MANAGER = "רפי מור יוסף- סחר"
+PRIVATE_REGIONS = {
+    "שמעון כהן - מנהל אזור": ["אמנון ידידי", "יואב מימון", "משה כספי", "עובדיה אבימלך"],
+    "ישראל דנון- מנהל אזור": ["מרים בואזיזה", "דוד פדלון", "שמוליק מטרני", "דניאל חורי"],
+    "גיל רפאל": ["חאזם קדורה", "חן בן דוד", "לירון בן מוחה", "גיא אלמוזנינו- סוכן", "אוהד אסולין"],
+    PRIVATE_MANAGER: ["גילי סופר", "בטי רובין", "אריק יחזקאל"],
+}
+TEDMITI_MANAGER = "עמי חכמון"
+TEDMITI_AGENTS = ["יעל כץ", "יעל כץ מלונות", "יעל כץ תדמיתי", "אריק יחזקאל", "משה רחמים", "חיים שלו", "ניר עזרא"]
+NATIONAL_MANAGERS = ["ארז ביתן", "הילה אלסיאן- סחר", "אלירן דהן", "ליאור לוי - סחר", "עינב כורם"]
+PAYMENT_METHODS = ["שיק", "העברה", "אשראי", None]
+
+
+class QSProfile:
+    """
+    הפרופיל של הקובץ המחולל: כמות שורות, קרדינליות ושיעורי השורות ה"בעייתיות".
+    managers / regions / agents: מספר מנהלי סחר, אזורים וסוכנים "כלליים" (בנוסף לשמות הקבועים שהדוחות מחפשים).
+    """
+
+    def __init__(
+        self,
+        rows: int = 10_000,
+        managers: int = 12,
+        regions: int = 5,
+        agents: int = 50,
+        merge_rate: float = 0.3,
+        max_block: int = 4,
+        summary_rate: float = 0.02,
+        export_rate: float = 0.05,
+        other_rate: float = 0.02,
+        bad_agent_rate: float = 0.02,
+        bad_code_rate: float = 0.05,
+        blank_rate: float = 0.01,
+        month: int = 8,
+        seed: int = 1,
+    ):
+        self.rows = rows
+        self.managers = managers
+        self.regions = regions
+        self.agents = agents
+        self.merge_rate = merge_rate
+        self.max_block = max_block
+        self.summary_rate = summary_rate
+        self.export_rate = export_rate
+        self.other_rate = other_rate
+        self.bad_agent_rate = bad_agent_rate
+        self.bad_code_rate = bad_code_rate
+        self.blank_rate = blank_rate
+        self.month = month
+        self.seed = seed
+
+
+def _amount(rng: random.Random):
+    """סכום בכל הצורות שמגיעות ב-QS: מספר, מחרוזת עם פסיקים, סוגריים לשלילי, '-', ריק, שלם."""
+    r = rng.random()
+    v = round(rng.uniform(-3000, 20000), 2)
+    if r < 0.55:
+        return v
+    if r < 0.65:
+        return f"{v:,.2f}"
+    if r < 0.70:
+        return f"({abs(v):,.2f})"
+    if r < 0.75:
+        return "-"
+    if r < 0.80:
+        return None
+    return int(v)
+
+
+def _pick_group(rng: random.Random, p: QSProfile):
+    """(מנהל סחר, מנהל אזור, סוכן, ערוץ) לבלוק אחד."""
+    k = rng.random()
+    if k < 0.35:
+        region = rng.choice(list(PRIVATE_REGIONS))
+        return PRIVATE_MANAGER, region, rng.choice(PRIVATE_REGIONS[region]), "שוק פרטי"
+    if k < 0.50:
+        return TEDMITI_MANAGER, TEDMITI_MANAGER, rng.choice(TEDMITI_AGENTS), "שוק תדמיתי"
+    if k < 0.75:
+        mgr = rng.choice(NATIONAL_MANAGERS)
+        return mgr, mgr, f"סוכן {rng.randint(1, max(1, p.agents // 2))}", "רשתות"
+    return (f"מנהל {rng.randint(1, p.managers)}", f"אזור {rng.randint(1, p.regions)}",
+            f"סוכן {rng.randint(max(1, p.agents // 2), p.agents)}", rng.choice(["מסחרי", "שוק פרטי", "רשתות"]))
+
+
+def _agent_code(rng: random.Random, p: QSProfile):
+    code = str(rng.randint(100, 999))
+    r = rng.random()
+    if r < p.bad_code_rate * 0.5:
+        return f" {code}-A"
+    if r < p.bad_code_rate * 0.8:
+        return None
+    if r < p.bad_code_rate:
+        return "אחר"
+    return code
+
+
+def generate_qs(path: str, profile: QSProfile = None) -> int:
+    """כותב QS סינתטי ל-path. מחזיר כמה שורות נתונים נכתבו (כולל שורות סיכום/ריקות)."""
+    p = profile or QSProfile()
+    rng = random.Random(p.seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    headers = FRONT_HEADERS + amount_headers(p.month)
+    ws.append(headers)
+    n_amounts = len(headers) - len(FRONT_HEADERS)
+
+    r = 2  # השורה הבאה בגיליון
+    written = 0
+    while written < p.rows:
+        mgr, region, agent, channel = _pick_group(rng, p)
+        if rng.random() < p.export_rate:
+            channel = "ייצוא"
+        if rng.random() < p.bad_agent_rate:
+            agent = "חובות מסופקים"
+        if rng.random() < p.other_rate:
+            mgr = "אחר" if rng.random() < 0.5 else "אחר אחר"
+        code = _agent_code(rng, p)
+
+        block = rng.randint(2, p.max_block) if rng.random() < p.merge_rate else 1
+        block = min(block, p.rows - written)
+        totals = [0.0] * n_amounts
+        for b in range(block):
+            # בבלוק ממוזג רק השורה הראשונה מחזיקה ערך בעמודות הממוזגות (כמו בקובץ אמיתי)
+            first = b == 0 or block == 1
+            row = [mgr if first else None, region if first else None, agent, channel,
+                   rng.choice(PAYMENT_METHODS), rng.randint(10000, 99999), f"לקוח {rng.randint(1, 500)}", code]
+            amounts = [_amount(rng) for _ in range(n_amounts)]
+            for j, v in enumerate(amounts):
+                if isinstance(v, (int, float)):
+                    totals[j] += v
+            ws.append(row + amounts)
+        if block > 1:
+            for col in "AB":
+                ws.merged_cells.add(f"{col}{r}:{col}{r + block - 1}")
+        r += block
+        written += block
+
+        if written < p.rows and rng.random() < p.summary_rate:
+            ws.append([mgr, region, None, None, None, None, None, 'סה"כ'] + [round(t, 2) for t in totals])
+            r += 1
+            written += 1
+        if written < p.rows and rng.random() < p.blank_rate:
+            ws.append([None] * len(headers))
+            r += 1
+            written += 1
+    wb.save(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gen_qs", description="מחולל קובץ QS סינתטי")
+    parser.add_argument("--output", required=True, help="נתיב קובץ ה-xlsx שייווצר")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--managers", type=int, default=12, help="מנהלי סחר 'כלליים' (בנוסף לקבועים)")
+    parser.add_argument("--regions", type=int, default=5)
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--merge-rate", type=float, default=0.3, help="חלק הבלוקים עם תאים ממוזגים")
+    parser.add_argument("--summary-rate", type=float, default=0.02, help="שורות 'סה\"כ' אחרי בלוק")
+    parser.add_argument("--export-rate", type=float, default=0.05, help="שורות בערוץ 'ייצוא'")
+    parser.add_argument("--other-rate", type=float, default=0.02, help="שורות 'אחר' / 'אחר אחר'")
+    parser.add_argument("--month", type=int, default=8, help="חודש הדוח (1-12) – קובע את כותרות הסכומים")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    profile = QSProfile(rows=args.rows, managers=args.managers, regions=args.regions, agents=args.agents,
+                        merge_rate=args.merge_rate, summary_rate=args.summary_rate,
+                        export_rate=args.export_rate, other_rate=args.other_rate, month=args.month, seed=args.seed)
+    n = generate_qs(args.output, profile)
+    print(f"נכתב: {args.output} ({n} שורות)", flush=True)
+    return args.output
+
+
+if __name__ == "__main__":
+    main()
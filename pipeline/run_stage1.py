@@ -1,30 +1,36 @@
 import argparse
+import io
 import os
-import shutil
+from typing import Dict, Optional
+import numpy as np
 import pandas as pd
 
 #UI Design
-from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.styles import PatternFill, Border, Side
 from openpyxl.styles import PatternFill
 
-from Logic.w10_load_and_unmerge import load_and_unmerge
-from Logic.w15_detect_header import detect_header_and_frame
-from Logic.w25_normalize_numeric_columns import normalize_numeric_columns
+from Logic.w15_detect_header import ingest_qs
+from Logic.parse_cache import ParseCache, cache_key, source_digest
+from Logic.run_manifest import REUSE_MODES, RunManifest, reuse_output, run_key
+from Logic.w25_normalize_numeric_columns import normalize_numeric_columns_report
 from Logic.w21_drop_specific_columns import drop_columns
-from Logic.w55_remove_export_channel import remove_export_channel
-from Logic.w50_remove_summary_rows import remove_summary_rows
-from Logic.w52_normalize_agent_code import normalize_agent_code
-from Logic.w27_drop_empty_rows import drop_empty_rows
-from Logic.w28_filter_agent_code_required import filter_agent_code_required
+from Logic.w55_remove_export_channel import export_channel_mask
+from Logic.w50_remove_summary_rows import summary_rows_mask
+from Logic.w52_normalize_agent_code import normalized_agent_code
+from Logic.w27_drop_empty_rows import empty_cells
+from Logic.w28_filter_agent_code_required import agent_code_keep_mask
+from Logic.row_rules import ColumnForms, ColumnRule, RowRule, apply_row_rules
 from Logic.w30_add_sum_rows import append_sum_rows
-from Logic.w40_finalize_save import save_processed
-from Logic.w60_remove_other_rows import remove_other_rows  
+from Logic.w40_finalize_save import processed_output_path, write_processed_sheet
+from Logic.workbook_session import BookTarget, WorkbookSession, load_book, save_book
+from Logic.w60_remove_other_rows import other_rows_mask
 from Logic.w71_manager_sheet_builder import build_manager_sheets
 from Logic.w72_market_sheets import build_private_market_like_manager, build_tedmiti_full_columns
 from Logic.w73_region_general_sheet import build_region_general_full_columns
 from Logic.w75_pivot_sheets import build_pivot_private, build_pivot_tedmiti
+from Logic.agg_cube import AggCube
+from Logic.run_report import MemoryBudgetExceeded, RunReport, report_path_for, rss_bytes, sheet_cells, sheet_rows
 
 
 
@@ -55,7 +61,7 @@ def _argb(color_hex: str) -> str:
 
 
 def _color_manager_headers(
-    xlsx_path: str,
+    xlsx_path: BookTarget,
     sheet_names: list[str],
     header_row: int = 1,
     col_H: str = "#BFEE90",
@@ -67,7 +73,7 @@ def _color_manager_headers(
     H = col_H,  I = col_I,  J..N = cols_J_to_N
      מתעלם מדפים/עמודות שאינם קיימים.
     """
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     for name in sheet_names:
         if name not in wb.sheetnames:
             continue
@@ -88,16 +94,16 @@ def _color_manager_headers(
         for c in range(10, last + 1):
             paint(c, cols_J_to_N)
 
-    wb.save(xlsx_path)
+    save_book(wb, xlsx_path)
         
     
-def _color_by_agent_headers(xlsx_path: str, sheet_name: str = "לפי סוכן",
+def _color_by_agent_headers(xlsx_path: BookTarget, sheet_name: str = "לפי סוכן",
                             header_row: int = 1,
                             col_H: str = "#BFEE90",
                             col_I: str = "#90BFEE",
                             cols_J_to_N: str = "#EEBF90"):
     """צובע כותרות ב'לפי סוכן': H, I, ו-J..N. בטוח להרצה חוזרת."""
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     if sheet_name not in wb.sheetnames:
         wb.close()
         return
@@ -118,12 +124,12 @@ def _color_by_agent_headers(xlsx_path: str, sheet_name: str = "לפי סוכן",
     for c in range(10, last + 1):
         paint(c, cols_J_to_N)
 
-    wb.save(xlsx_path)
+    save_book(wb, xlsx_path)
     wb.close()
     
 
 def _style_by_agent_columns(
-    xlsx_path: str,
+    xlsx_path: BookTarget,
     sheet_name: str = "לפי סוכן",
     header_row: int = 1,
     hk_color: str = "#EEBF90",   # לכותרות H..K
@@ -134,7 +140,7 @@ def _style_by_agent_columns(
     - כותרות H..K בצבע hk_color
     - כל עמודה L (כולל הכותרת) בצבע colL_color
     """
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     if sheet_name not in wb.sheetnames:
         wb.close()
         return
@@ -157,14 +163,14 @@ def _style_by_agent_columns(
                 end_color=_argb(colL_color),
             )
 
-    wb.save(xlsx_path)
+    save_book(wb, xlsx_path)
     wb.close()
 
 
 
-def _outline_thick(xlsx_path: str, sheet_name: str = "לפי סוכן"):
+def _outline_thick(xlsx_path: BookTarget, sheet_name: str = "לפי סוכן"):
     """מסגרת עבה (outline) לכל הטבלה + קווים דקים בפנים."""
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     if sheet_name not in wb.sheetnames:
         wb.close()
         return
@@ -183,11 +189,11 @@ def _outline_thick(xlsx_path: str, sheet_name: str = "לפי סוכן"):
                 bottom=thick if r == max_r else thin,
             )
 
-    wb.save(xlsx_path)
+    save_book(wb, xlsx_path)
     wb.close()
 
 def _shade_colA_and_group_borders(
-    xlsx_path: str,
+    xlsx_path: BookTarget,
     sheet_name: str = "לפי סוכן",
     data_start_row: int = 2,     # הנתונים מתחילים בשורה 2 (כותרות בשורה 1)
     block_size: int = 5,         # כל 5 שורות קבוצה
@@ -197,7 +203,7 @@ def _shade_colA_and_group_borders(
     צובע את עמודה A בקבוצות של 5 שורות במחזור צבעים,
     ומוסיף קו תחתון עבה בין כל קבוצה (כל 5 שורות).
     """
-    wb = load_workbook(xlsx_path)
+    wb = load_book(xlsx_path)
     if sheet_name not in wb.sheetnames:
         wb.close()
         return
@@ -234,7 +240,7 @@ def _shade_colA_and_group_borders(
                 bottom = thick,
             )
 
-    wb.save(xlsx_path)
+    save_book(wb, xlsx_path)
     wb.close()
     
 
@@ -243,53 +249,78 @@ FRONT_CANDIDATES = [
     "סוכן","ערוץ","שיטת תשלום לקוח משלם","קוד לקוח קצה","לקוח קצה","קוד סוכן"
 ]
 SUM_HEADER = 'סה"כ סכום יתרת חוב'
+AGENT_NAME_MAP = {
+    "יעל כץ מלונות": "יעל כץ",
+    "יעל כץ תדמיתי": "יעל כץ",
+}
+# BAD_AGENTS = {"חובות מסופקים", "לקוחות שוק קמעונאי"}
+BAD_AGENTS = {"חובות מסופקים"}
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, help="נתיב לקובץ המקור (xlsx)")
-    parser.add_argument("--output-dir", required=True, help="תיקיית פלט לשמירת הקובץ המעובד")
-    parser.add_argument("--sheet-name", default="sheet1", help="שם הגיליון המקורי (ברירת מחדל: sheet1)")
-    parser.add_argument("--sum-header", default=SUM_HEADER, help="שם העמודה בה נחשב סכום בסוף")
-    parser.add_argument("--drop-empty", action="store_true", help="מחיקת שורות ריקות/חסרות מזהי מפתח")
-    parser.add_argument("--keep-other", action="store_true", help="אל תנקה 'אחר'/'אחר אחר' במנהלי סחר/אזור")
-    parser.add_argument("--keep-temp", action="store_true", help="השארת קבצים זמניים לבדיקה")
-    parser.add_argument("--with-nov-dec", dest="with_nov_dec", action="store_true",
-                        help="[תאימות לאחור] לא בשימוש במצב דינמי (I..M אחרי H)")
+def _all_empty(forms: ColumnForms, cols):
+    """אמת לשורות שבהן כל העמודות cols ריקות (None אם אין עמודות)."""
+    if not cols:
+        return None
+    return np.logical_and.reduce([empty_cells(forms.raw(c), forms.text(c)) for c in cols])
 
-    # דוחות נגזרים
-    parser.add_argument("--split-by-manager", action="store_true",
-                        help="יצירת לשוניות לכל 'מנהל סחר' מתוך גיליון 'מעובד' (J..M דינמי + 'טור עזר').")
-    parser.add_argument("--market-private", action="store_true",
-                        help="יצירת גיליון 'שוק פרטי' (מנהל סחר=רפי מור יוסף-סחר, ערוץ=שוק פרטי) במבנה כמו מנהלי סחר")
-    parser.add_argument("--market-tedmiti", action="store_true",
-                        help="יצירת גיליון 'שוק תדמיתי' (מנהל סחר=עמי חכמון) עם כל העמודות מה'מעובד'")
-    parser.add_argument("--region-general", action="store_true",
-                        help="יצירת גיליון 'מנהל אזור כללי' עם כל העמודות מ'מעובד'")
-    parser.add_argument("--pivot-private", action="store_true",
-                        help="יצירת גיליון 'פיבוט פרטי' (מנהל סחר=רפי מור יוסף-סחר, ערוץ=שוק פרטי)")
-    parser.add_argument("--pivot-tedmiti", action="store_true",
-                        help="יצירת גיליון 'פיבוט תדמיתי' (מנהל סחר=עמי חכמון)")
-    
-    parser.add_argument("--by-agent", action="store_true",
-                    help="יצירת גיליון 'לפי סוכן' מתוך 'פיבוט פרטי'")
 
+def _row_rules(args, columns: list, step: int, total_steps: int):
+    """
+    סינוני השורות וניקוי העמודות של שלב הניקוי, לפי הסדר, ככללים ל-apply_row_rules.
+    columns: העמודות של 'מעובד' (לשורות ריקות / חסרות מזהים). מחזיר (כללים, מספר השלב הבא).
+    """
+    rules = []
+    rules.append(RowRule("export_channel", lambda f: export_channel_mask(f.text("ערוץ")) if "ערוץ" in f else None,
+                         title=f"[{step}/{total_steps}] מחיקת ערוץ 'ייצוא'...")); step += 1
+    rules.append(RowRule("summary_rows", lambda f: summary_rows_mask(f.text("קוד סוכן")) if "קוד סוכן" in f else None,
+                         title=f"[{step}/{total_steps}] מחיקת שורות סיכום לפי 'קוד סוכן'...")); step += 1
+
+    rules.append(ColumnRule("סוכן", lambda f: f.text("סוכן").replace(AGENT_NAME_MAP) if "סוכן" in f else None,
+                            title=f"[{step}/{total_steps}] נירמול שמות 'סוכן' (יעל כץ...)...")); step += 1
+    # סינון שורות לא רצויות בעמודת 'סוכן'
+    rules.append(RowRule(
+        "bad_agents",
+        lambda f: f.text("סוכן").str.replace(r"\s+", " ", regex=True).str.strip().isin(BAD_AGENTS) if "סוכן" in f else None,
+        report="    הוסרו {n} שורות ('סוכן' בעייתי).", report_zero=False,
+    ))
+
+    rules.append(ColumnRule("קוד סוכן", lambda f: normalized_agent_code(f.string("קוד סוכן")) if "קוד סוכן" in f else None,
+                            title=f"[{step}/{total_steps}] נירמול 'קוד סוכן' לספרות בלבד...")); step += 1
 
-    args = parser.parse_args()
+    if not args.keep_other:
+        # rules.append(RowRule("other_rows", lambda f: other_rows_mask([f.text(c) for c in ["מנהל סחר","מנהל אזור","מנהל איזור"] if c in f]), ...))
+        rules.append(RowRule("other_rows", lambda f: other_rows_mask([f.text(c) for c in ["מנהל סחר", "סוכן"] if c in f]),
+                             title=f"[{step}/{total_steps}] מחיקת 'אחר'/'אחר אחר' ב'מנהל סחר/אזור'...")); step += 1
 
-    os.makedirs(args.output_dir, exist_ok=True)
-    temp_dir = os.path.join(args.output_dir, "_temp")
-    os.makedirs(temp_dir, exist_ok=True)
+    if args.drop_empty:
+        required = [c for c in ["קוד סוכן", "קוד לקוח קצה", "לקוח קצה"] if c in columns]
+        rules.append(RowRule("empty_rows", lambda f: _all_empty(f, columns),
+                             title=f"[{step}/{total_steps}] מחיקת שורות ריקות/חסרות מזהים...")); step += 1
+        rules.append(RowRule("missing_ids", lambda f: _all_empty(f, required),
+                             report="    הוסרו {empty_rows} ריקות ו-{n} ללא מזהים."))
 
-    # חישוב צעדים עד שמירת 'מעובד' (הדוחות הנגזרים אינם נספרים בלוג זה)
-    total_steps = 12 + (0 if args.keep_other else 1) + (1 if args.drop_empty else 0)
+    # *** סינון סופי לפני סכום: 'קוד סוכן' חייב להיות ספרות או 'אחר' ***
+    rules.append(RowRule("agent_code_format", lambda f: ~agent_code_keep_mask(f.string("קוד סוכן")),
+                         title=f"[{step}/{total_steps}] סינון סופי: 'קוד סוכן' – ספרות או 'אחר'...",
+                         report="    הוסרו {n} שורות שאינן ספרתיות ואינן 'אחר'.")); step += 1
+    return rules, step
+
+
+def _ingest_and_clean(args, source, total_steps: int, report: RunReport):
+    """
+    קריאת QS (source: נתיב או אובייקט קובץ) וכל שלבי הניקוי עד 'מעובד' (כולל שורות הסכום).
+    כל שלב נמדד ב-report. מחזיר (df_proc, כותרות O..T משורה 1 במקור).
+    """
     step = 1
 
-    print(f"[{step}/{total_steps}] ביטול מיזוגים ושמירת קובץ זמני...", flush=True); step += 1
-    tmp_path = load_and_unmerge(args.input, sheet_hint=args.sheet_name, temp_out_dir=temp_dir)
+    print(f"[{step}/{total_steps}] קריאת הגיליון ומילוי תאים ממוזגים (מעבר יחיד)...", flush=True); step += 1
+    # הקריאה היחידה של קובץ המקור בריצה – כל השלבים הבאים עובדים מ-ingest
+    with report.stage("ingest") as st:
+        ingest = ingest_qs(source, sheet_hint=args.sheet_name, sheet_name=args.sheet_name)
+        st.rows_out = len(ingest.frame)
 
     print(f"[{step}/{total_steps}] איתור שורת כותרות ובניית DataFrame...", flush=True); step += 1
-    df_all = detect_header_and_frame(tmp_path, args.sheet_name)
+    df_all = ingest.frame
 
     if args.with_nov_dec:
         print("הערה: --with-nov-dec מתעלמים ממנו במצב דינמי (I..M אחרי H).", flush=True)
@@ -327,372 +358,936 @@ def main():
                 if c not in final_cols:
                     final_cols.append(c)
 
-    df_proc = df_all.copy()
-    for c in final_cols:
-        if c not in df_proc.columns:
-            df_proc[c] = None
-    df_proc = df_proc[final_cols]
+    with report.stage("select_columns", rows_in=len(df_all)) as st:
+        df_proc = df_all.copy()
+        for c in final_cols:
+            if c not in df_proc.columns:
+                df_proc[c] = None
+        df_proc = df_proc[final_cols]
+        st.rows_out = len(df_proc)
 
     print(f"[{step}/{total_steps}] נרמול ערכים מספריים ('{args.sum_header}' ועוד 5 הדינמיות)...", flush=True); step += 1
     amount_headers = [h for h in [args.sum_header] + dyn_to_T if h in df_proc.columns]
-    df_proc = normalize_numeric_columns(df_proc, amount_headers)
+    with report.stage("normalize_numeric", rows_in=len(df_proc)) as st:
+        df_proc, parse_failures = normalize_numeric_columns_report(df_proc, amount_headers)
+        st.rows_out = len(df_proc)
+    parse_failures = {h: n for h, n in parse_failures.items() if n}
+    if parse_failures:
+        print(f"    ערכים שלא פוענחו כמספר (נשארו ריקים): {parse_failures}", flush=True)
 
     print(f"[{step}/{total_steps}] מחיקת עמודות לא נדרשות...", flush=True); step += 1
-    df_proc, dropped_cols = drop_columns(df_proc, columns=("שייייטת תשלום")) #("שיטת תשלום לקוח משלם","שיטת תשלום") -> מחקתי שיטת תשלום לקוח משלם כי הלקוח החליט לשחזר עמודה
+    with report.stage("drop_columns", rows_in=len(df_proc)) as st:
+        df_proc, dropped_cols = drop_columns(df_proc, columns=("שייייטת תשלום")) #("שיטת תשלום לקוח משלם","שיטת תשלום") -> מחקתי שיטת תשלום לקוח משלם כי הלקוח החליט לשחזר עמודה
+        st.rows_out = len(df_proc)
     if dropped_cols:
         print(f"    הוסרו עמודות: {dropped_cols}", flush=True)
 
-    print(f"[{step}/{total_steps}] מחיקת ערוץ 'ייצוא'...", flush=True); step += 1
-    df_proc, _ = remove_export_channel(df_proc, col="ערוץ")
-
-    print(f"[{step}/{total_steps}] מחיקת שורות סיכום לפי 'קוד סוכן'...", flush=True); step += 1
-    df_proc, _ = remove_summary_rows(df_proc, col="קוד סוכן")
-
-    print(f"[{step}/{total_steps}] נירמול שמות 'סוכן' (יעל כץ...)...", flush=True); step += 1
-    if "סוכן" in df_proc.columns:
-        df_proc["סוכן"] = df_proc["סוכן"].astype(str).str.strip().replace({
-            "יעל כץ מלונות": "יעל כץ",
-            "יעל כץ תדמיתי": "יעל כץ",
-        })
-        
-     # סינון שורות לא רצויות בעמודת 'סוכן'
-    if "סוכן" in df_proc.columns:
-        # bad_agents = {"חובות מסופקים", "לקוחות שוק קמעונאי"}
-        bad_agents = {"חובות מסופקים"}
-        s_clean = df_proc["סוכן"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
-        removed_mask = s_clean.isin(bad_agents)
-        n_removed = int(removed_mask.sum())
-        if n_removed:
-            df_proc = df_proc[~removed_mask]
-            print(f"    הוסרו {n_removed} שורות ('סוכן' בעייתי).", flush=True)
-   
-
-    print(f"[{step}/{total_steps}] נירמול 'קוד סוכן' לספרות בלבד...", flush=True); step += 1
-    df_proc, _ = normalize_agent_code(df_proc, col="קוד סוכן")
-
-    if not args.keep_other:
-        print(f"[{step}/{total_steps}] מחיקת 'אחר'/'אחר אחר' ב'מנהל סחר/אזור'...", flush=True); step += 1
-        # df_proc, _ = remove_other_rows(df_proc, cols=["מנהל סחר","מנהל אזור","מנהל איזור"])
-        df_proc, _ = remove_other_rows(df_proc, cols=["מנהל סחר", "סוכן"])
-
-    if args.drop_empty:
-        print(f"[{step}/{total_steps}] מחיקת שורות ריקות/חסרות מזהים...", flush=True); step += 1
-        df_proc, rem_full, rem_req = drop_empty_rows(df_proc, required_any=["קוד סוכן","קוד לקוח קצה","לקוח קצה"])
-        print(f"    הוסרו {rem_full} ריקות ו-{rem_req} ללא מזהים.", flush=True)
-
-    # *** סינון סופי לפני סכום: 'קוד סוכן' חייב להיות מספרי ***
-    # print(f"[{step}/{total_steps}] סינון סופי: 'קוד סוכן' – רק ספרות ללא ריקים...", flush=True); step += 1
-    # df_proc, removed_non_numeric = filter_agent_code_required(df_proc, col="קוד סוכן")
-    # print(f"    הוסרו {removed_non_numeric} שורות ללא 'קוד סוכן' מספרי.", flush=True)
-    print(f"[{step}/{total_steps}] סינון סופי: 'קוד סוכן' – ספרות או 'אחר'...", flush=True); step += 1
-    s = df_proc["קוד סוכן"].astype("string").str.strip()
-
-    # לשמור מספרים מלאים או "אחר"
-    keep_mask = s.str.fullmatch(r"\d+") | s.isin(["אחר"])
-
-    removed_non_numeric = int((~keep_mask).sum())
-    df_proc = df_proc[keep_mask]
-
-    print(f"    הוסרו {removed_non_numeric} שורות שאינן ספרתיות ואינן 'אחר'.", flush=True)
-
-
+    # כל סינוני השורות כמסכה אחת: כל עמודה עוברת astype(str)/strip פעם אחת, ו-.loc אחד בסוף
+    rules, step = _row_rules(args, list(df_proc.columns), step, total_steps)
+    with report.stage("row_rules", rows_in=len(df_proc)) as st:
+        df_proc, _ = apply_row_rules(df_proc, rules)
+        st.rows_out = len(df_proc)
 
     print(f"[{step}/{total_steps}] הוספת שורות סכום בסוף '{args.sum_header}'...", flush=True); step += 1
-    df_proc = append_sum_rows(df_proc, args.sum_header)
-
-    print(f"[{step}/{total_steps}] שמירה בשם עם חותמת זמן וגיליון 'מעובד'...", flush=True); step += 1
-    out_path = save_processed(df_proc, input_path=args.input, output_dir=args.output_dir, sheet_name="מעובד")
-    ###################################################################################
-    from openpyxl import load_workbook
-    
-    try:
-        _qs_wb = load_workbook(args.input, data_only=True, read_only=True)
-        _qs_ws = _qs_wb[_qs_wb.sheetnames[0]]
-        _src_headers = [ _qs_ws.cell(row=1, column=c).value for c in range(15, 21) ]  
-        _qs_wb.close()
-        _out_wb = load_workbook(out_path)
-        if "מעובד" in _out_wb.sheetnames:
-            _ws = _out_wb["מעובד"]
-            for idx, val in enumerate(_src_headers, start=15):  # 15..20 => O..T
-                _ws.cell(row=1, column=idx, value=val)
-            _out_wb.save(out_path)
-        _out_wb.close()
-        print('    עודכן: כותרות O..T ב"מעובד" הועתקו אוטומטית מ־QS.', flush=True)
-    except Exception as e:
-        print(f'    [אזהרה] לא הצלחנו לעדכן כותרות O..T ב"מעובד": {_e}', flush=True)
-        
-            
-    # ===== דוחות נגזרים מתוך 'מעובד' =====
-    # לעבודה על דוחות: מסירים שורות "סכום" טקסטואליות
-    df_for_reports = df_proc.copy()
-    if args.sum_header in df_for_reports.columns:
-        df_for_reports = df_for_reports[
-            ~(df_for_reports[args.sum_header].astype(str).str.strip() == "סכום")
-        ]
+    with report.stage("sum_rows", rows_in=len(df_proc)) as st:
+        df_proc = append_sum_rows(df_proc, args.sum_header)
+        st.rows_out = len(df_proc)
 
-    print("\n[דוחות נגזרים] בנייה לפי דגלים...", flush=True)
+    return df_proc, ingest.source_headers(15, 20)
 
 
-    # 1) לשוניות מנהלי סחר
-    if args.split_by_manager:
-        print("• בניית לשוניות מנהלי סחר...", flush=True)
-        try:
-            # בסיס הנתונים ללשוניות מנהלים
-            df_mgr = df_for_reports.copy()
-            if "מנהל סחר" in df_mgr.columns:
-                # 1) נפטרים מ-NaN אמיתיים
-                df_mgr = df_mgr[df_mgr["מנהל סחר"].notna()].copy()
-                # 2) נרמול רווחים וקצוות
-                df_mgr["מנהל סחר"] = (
-                    df_mgr["מנהל סחר"].astype(str)
-                    .str.replace(r"\s+", " ", regex=True)
-                    .str.strip()
-                )
-                # 3) מסירים ערכי־דמה שעלולים לייצר לשונית בשם None/nan
-                df_mgr = df_mgr[~df_mgr["מנהל סחר"].str.fullmatch(r"(?i)none|nan|null|", na=False)]
-                # 4) מדלגים על "עמי חכמון" כדי שלא תיווצר לו לשונית
-                df_mgr = df_mgr[df_mgr["מנהל סחר"] != "עמי חכמון"]
-                # df_mgr = df_mgr[df_mgr["מנהל סחר"] != "עמי חכמון", "ישראל דנון- מנהל אזור", "סיגל אריאלי","אלדד כהן- סחר"]  #  לא מוחקים, רק לא יוצרים לו לשונית בדיוק כמו בקובץ של הלקוח 
+# ===== דוחות נגזרים: כל בלוק הוא צומת ב-DAG (Logic/report_dag.py) =====
+# 1) לשוניות מנהלי סחר
+def _report_managers(session: WorkbookSession, df_for_reports: pd.DataFrame):
+    print("• בניית לשוניות מנהלי סחר...", flush=True)
+    try:
+        # בסיס הנתונים ללשוניות מנהלים
+        df_mgr = df_for_reports.copy()
+        if "מנהל סחר" in df_mgr.columns:
+            # 1) נפטרים מ-NaN אמיתיים
+            df_mgr = df_mgr[df_mgr["מנהל סחר"].notna()].copy()
+            # 2) נרמול רווחים וקצוות
+            df_mgr["מנהל סחר"] = (
+                df_mgr["מנהל סחר"].astype(str)
+                .str.replace(r"\s+", " ", regex=True)
+                .str.strip()
+            )
+            # 3) מסירים ערכי־דמה שעלולים לייצר לשונית בשם None/nan
+            df_mgr = df_mgr[~df_mgr["מנהל סחר"].str.fullmatch(r"(?i)none|nan|null|", na=False)]
+            # 4) מדלגים על "עמי חכמון" כדי שלא תיווצר לו לשונית
+            df_mgr = df_mgr[df_mgr["מנהל סחר"] != "עמי חכמון"]
+            # df_mgr = df_mgr[df_mgr["מנהל סחר"] != "עמי חכמון", "ישראל דנון- מנהל אזור", "סיגל אריאלי","אלדד כהן- סחר"]  #  לא מוחקים, רק לא יוצרים לו לשונית בדיוק כמו בקובץ של הלקוח 
 
+        with session.isolate():
             n_created, names = build_manager_sheets(
-                df_mgr, out_path,
+                df_mgr, session,
                 managers_col="מנהל סחר",
                 max_month_cols_after_today=4
             )
-            print(f"    נוצרו {n_created} גיליונות מנהלים: {', '.join(names)}", flush=True)
-            
-                    # צביעת כותרות H/I/J..N בלשוניות המנהלים בלבד
-            try:
-                _color_manager_headers(
-                    out_path,
-                    names,
-                    header_row=1,
-                    col_H="#BFEE90",
-                    col_I="#90BFEE",
-                    cols_J_to_N="#EEBF90",
-                )
-                print("    עודכנו צבעי כותרות בלשוניות המנהלים (H/I/J..N).", flush=True)
-
-            except Exception as e:
-                print(f"    [אזהרה] כשל בצביעת כותרות: {e}", flush=True)
-
+        print(f"    נוצרו {n_created} גיליונות מנהלים: {', '.join(names)}", flush=True)
 
-        # סינון/נרמול לשונית(ות) רפי – רק שורות שבהן 'מנהל אזור/איזור' הוא רפי,
-        # ואח"כ עדכון הטקסט ל"רפי מור יוסף- סחר"
-            ok_refine, touched, del_counts = refine_rafi_sheet_rows(
-                out_path,
-                target_base="רפי מור יוסף",
-                display_text="רפי מור יוסף- סחר"
+                # צביעת כותרות H/I/J..N בלשוניות המנהלים בלבד
+        try:
+            _color_manager_headers(
+                session,
+                names,
+                header_row=1,
+                col_H="#BFEE90",
+                col_I="#90BFEE",
+                cols_J_to_N="#EEBF90",
             )
-            if ok_refine:
-                total_del = sum(del_counts)
-                print(f"    [רפי] סוננו {total_del} שורות בלשוניות: {', '.join(touched)}", flush=True)
-            else:
-                print("    [רפי] לא נמצאו שורות לסינון/שינוי.", flush=True)
+            print("    עודכנו צבעי כותרות בלשוניות המנהלים (H/I/J..N).", flush=True)
 
         except Exception as e:
-            print(f"שגיאה בבניית לשוניות מנהלים/רפי: {e}", flush=True)
+            print(f"    [אזהרה] כשל בצביעת כותרות: {e}", flush=True)
 
 
-    # 2) שוק פרטי
-    if args.market_private:
-        print("• בניית גיליון 'שוק פרטי'...", flush=True)
-        try:
+    # סינון/נרמול לשונית(ות) רפי – רק שורות שבהן 'מנהל אזור/איזור' הוא רפי,
+    # ואח"כ עדכון הטקסט ל"רפי מור יוסף- סחר"
+        ok_refine, touched, del_counts = refine_rafi_sheet_rows(
+            session,
+            target_base="רפי מור יוסף",
+            display_text="רפי מור יוסף- סחר"
+        )
+        if ok_refine:
+            total_del = sum(del_counts)
+            print(f"    [רפי] סוננו {total_del} שורות בלשוניות: {', '.join(touched)}", flush=True)
+        else:
+            print("    [רפי] לא נמצאו שורות לסינון/שינוי.", flush=True)
+
+    except Exception as e:
+        print(f"שגיאה בבניית לשוניות מנהלים/רפי: {e}", flush=True)
+        return False
+
+
+# 2) שוק פרטי
+def _report_market_private(session: WorkbookSession, df_for_reports: pd.DataFrame, cube=None):
+    print("• בניית גיליון 'שוק פרטי'...", flush=True)
+    try:
+        with session.isolate():
             ok, name = build_private_market_like_manager(
-                df_for_reports, out_path,
+                df_for_reports, session,
                 manager_name="רפי מור יוסף- סחר",  
                 channel_value="שוק פרטי",
                 max_month_cols_after_today=4,
-                sheet_name="שוק פרטי"
+                sheet_name="שוק פרטי",
+                cube=cube,
             )
-            if ok:
-                # פוסט-סינון: מחיקת שורות שבהן 'מנהל אזור/איזור' = 'רפי מור יוסף'
-                did, deleted = refine_private_region_rows(
-                    out_path,
-                    sheet_name=name,                 # משתמשים בשם שחזר מה-builder
-                    forbidden_substr="רפי מור יוסף- סחר"
-                )
-                if did:
-                    print(f"    נבנה: {name} | הוסרו {deleted} שורות ('מנהל אזור'='רפי מור יוסף- סחר')", flush=True)
-                else:
-                    print(f"    נבנה: {name} | אין שורות למחיקה בעמודת 'מנהל אזור'", flush=True)
+        if ok:
+            # פוסט-סינון: מחיקת שורות שבהן 'מנהל אזור/איזור' = 'רפי מור יוסף'
+            did, deleted = refine_private_region_rows(
+                session,
+                sheet_name=name,                 # משתמשים בשם שחזר מה-builder
+                forbidden_substr="רפי מור יוסף- סחר"
+            )
+            if did:
+                print(f"    נבנה: {name} | הוסרו {deleted} שורות ('מנהל אזור'='רפי מור יוסף- סחר')", flush=True)
             else:
-                print("    לא נבנה (אין נתונים)", flush=True)
-        except Exception as e:
-            print(f"שגיאה בבניית גיליון 'שוק פרטי': {e}", flush=True)
+                print(f"    נבנה: {name} | אין שורות למחיקה בעמודת 'מנהל אזור'", flush=True)
+        else:
+            print("    לא נבנה (אין נתונים)", flush=True)
+    except Exception as e:
+        print(f"שגיאה בבניית גיליון 'שוק פרטי': {e}", flush=True)
+        return False
 
 
-    # 3) שוק תדמיתי
-    if args.market_tedmiti:
-        print("• בניית גיליון 'שוק תדמיתי'...", flush=True)
-        try:
+# 3) שוק תדמיתי
+def _report_market_tedmiti(session: WorkbookSession, df_for_reports: pd.DataFrame, cube=None):
+    print("• בניית גיליון 'שוק תדמיתי'...", flush=True)
+    try:
+        with session.isolate():
             ok, name = build_tedmiti_full_columns(
-                df_for_reports, out_path,
+                df_for_reports, session,
                 manager_name="עמי חכמון",
-                sheet_name="שוק תדמיתי"
+                sheet_name="שוק תדמיתי",
+                cube=cube,
             )
-            print(f"    נבנה: {name}" if ok else "    לא נבנה (אין נתונים)", flush=True)
-        except Exception as e:
-            print(f"שגיאה בבניית גיליון 'שוק תדמיתי': {e}", flush=True)
+        print(f"    נבנה: {name}" if ok else "    לא נבנה (אין נתונים)", flush=True)
+    except Exception as e:
+        print(f"שגיאה בבניית גיליון 'שוק תדמיתי': {e}", flush=True)
+        return False
 
-    # 4) מנהל אזור כללי
-    if args.region_general:
-        print("• בניית גיליון 'מנהל אזור כללי'...", flush=True)
-        try:
+
+# 4) מנהל אזור כללי
+def _report_region_general(session: WorkbookSession, df_for_reports: pd.DataFrame):
+    print("• בניית גיליון 'מנהל אזור כללי'...", flush=True)
+    try:
+        with session.isolate():
             ok, name = build_region_general_full_columns(
-                df_for_reports, out_path, sheet_name="מנהל אזור כללי"
+                df_for_reports, session, sheet_name="מנהל אזור כללי"
             )
-            print(f"    נבנה: {name}" if ok else "    לא נבנה", flush=True)
-        except Exception as e:
-            print(f"שגיאה בבניית 'מנהל אזור כללי': {e}", flush=True)
+        print(f"    נבנה: {name}" if ok else "    לא נבנה", flush=True)
+    except Exception as e:
+        print(f"שגיאה בבניית 'מנהל אזור כללי': {e}", flush=True)
+        return False
 
-    # 5) פיבוט פרטי
-    if args.pivot_private:
-        print("• בניית גיליון 'פיבוט פרטי'...", flush=True)
-        try:
+
+# 5) פיבוט פרטי
+def _report_pivot_private(session: WorkbookSession, df_for_reports: pd.DataFrame, cube=None):
+    print("• בניית גיליון 'פיבוט פרטי'...", flush=True)
+    try:
+        with session.isolate():
             ok, name = build_pivot_private(
-                df_for_reports, out_path,
+                df_for_reports, session,
                 manager_name="רפי מור יוסף-סחר",
                 channel_value="שוק פרטי",
                 sheet_name="פיבוט פרטי",
-                max_month_cols_after_today=4
+                max_month_cols_after_today=4,
+                cube=cube,
             )
-            print(f"    נבנה: {name}" if ok else "    לא נבנה (אין נתונים)", flush=True)
-        except Exception as e:
-            print(f"שגיאה בבניית גיליון 'פיבוט פרטי': {e}", flush=True)
+        print(f"    נבנה: {name}" if ok else "    לא נבנה (אין נתונים)", flush=True)
+    except Exception as e:
+        print(f"שגיאה בבניית גיליון 'פיבוט פרטי': {e}", flush=True)
+        return False
 
-    # 6) פיבוט תדמיתי
-    if args.pivot_tedmiti:
-        print("• בניית גיליון 'פיבוט תדמיתי'...", flush=True)
-        try:
+
+# 6) פיבוט תדמיתי
+def _report_pivot_tedmiti(session: WorkbookSession, df_for_reports: pd.DataFrame, cube=None):
+    print("• בניית גיליון 'פיבוט תדמיתי'...", flush=True)
+    try:
+        with session.isolate():
             ok, name = build_pivot_tedmiti(
-                df_for_reports, out_path,
+                df_for_reports, session,
                 manager_name="עמי חכמון",
                 sheet_name="פיבוט תדמיתי",
-                max_month_cols_after_today=4
+                max_month_cols_after_today=4,
+                cube=cube,
             )
-            print(f"    נבנה: {name}" if ok else "    לא נבנה (אין נתונים)", flush=True)
-        except Exception as e:
-            print(f"שגיאה בבניית גיליון 'פיבוט תדמיתי': {e}", flush=True)
-            
+        print(f"    נבנה: {name}" if ok else "    לא נבנה (אין נתונים)", flush=True)
+    except Exception as e:
+        print(f"שגיאה בבניית גיליון 'פיבוט תדמיתי': {e}", flush=True)
+        return False
 
 
-    # 7) לפי סוכן (w90)
-    if args.by_agent:
-        print("• בניית גיליון 'לפי סוכן' (w90)...", flush=True)
-        ok = False
-        try:
-            from Logic.w90_agent import build_by_agent_sheet_w90
+# 7) לפי סוכן (w90)
+def _report_by_agent(session: WorkbookSession):
+    print("• בניית גיליון 'לפי סוכן' (w90)...", flush=True)
+    ok = False
+    try:
+        from Logic.w90_agent import build_by_agent_sheet_w90
+        with session.isolate():
             ok, name, nrows = build_by_agent_sheet_w90(
-                out_path,
+                session,
                 private_pivot="פיבוט פרטי",
                 tedmiti_pivot="פיבוט תדמיתי",
                 sheet_name="לפי סוכן",
             )
-            print(f"    נבנה: {name} (שורות: {nrows})" if ok else "    לא נבנה (אין נתונים/לא נמצא פיבוט)", flush=True)
+        print(f"    נבנה: {name} (שורות: {nrows})" if ok else "    לא נבנה (אין נתונים/לא נמצא פיבוט)", flush=True)
+    except Exception as e:
+        print(f"שגיאה בבניית 'לפי סוכן' (w90): {e}", flush=True)
+        return False
+
+    if ok:
+        print("    פריסה במעבר יחיד: שורות ריקות, נוסחאות סיכום, רשתות ארציות, 'סך פיגור' ואחוזים, רוחבים, צבעים וקווים.", flush=True)
+
+
+def _report_nodes(args) -> list:
+    """
+    גרף הדוחות הנגזרים, בסדר הלשוניות בקובץ. כולם נבנים רק מ-df_for_reports (והקובייה המשותפת),
+    חוץ מ'לפי סוכן' שקורא את הפיבוטים ואת לשוניות המנהלים.
+    """
+    from Logic.report_dag import ReportNode
+    return [
+        ReportNode("מנהלי סחר", _report_managers, inputs=("df_for_reports",), enabled=args.split_by_manager),
+        ReportNode("שוק פרטי", _report_market_private, inputs=("df_for_reports", "cube"), enabled=args.market_private),
+        ReportNode("שוק תדמיתי", _report_market_tedmiti, inputs=("df_for_reports", "cube"), enabled=args.market_tedmiti),
+        ReportNode("מנהל אזור כללי", _report_region_general, inputs=("df_for_reports",), enabled=args.region_general),
+        ReportNode("פיבוט פרטי", _report_pivot_private, inputs=("df_for_reports", "cube"), enabled=args.pivot_private),
+        ReportNode("פיבוט תדמיתי", _report_pivot_tedmiti, inputs=("df_for_reports", "cube"), enabled=args.pivot_tedmiti),
+        ReportNode("לפי סוכן", _report_by_agent, after=("מנהלי סחר", "פיבוט פרטי", "פיבוט תדמיתי"),
+                   enabled=args.by_agent),
+    ]
+
+
+# ===== API לשימוש מתוך תהליך אחר (בלי argparse ובלי קבצים בדרך) =====
+class Stage1Config:
+    """
+    ההגדרות של ריצה אחת – אותם שדות כמו הדגלים של שורת הפקודה (--drop-empty -> drop_empty).
+    input: נתיב, bytes או אובייקט קובץ (BytesIO / קובץ פתוח ב-rb).
+    output_dir: אם ניתן – נשמר גם קובץ עם חותמת זמן (כמו בשורת הפקודה); None = בלי כתיבה לדיסק.
+    return_xlsx: הקובץ המלא חוזר גם כ-BytesIO ב-Stage1Result.xlsx.
+    מטמון הניקוי פעיל רק כשיש לו מקום: cache_dir, או <output_dir>/_cache.
+    עם output_dir: אם אותו QS כבר הורץ עם אותם דגלים ואותו קוד – אין ריצה בכלל (ראו RunManifest);
+    reuse: link / copy / report – מה עושים עם הפלט הקודם, force=True – ריצה מלאה בכל מקרה.
+    incremental: לשוניות מנהלים שהתוכן שלהן זהה לפלט הקודם נכתבות מה-XML שלהן בפלט הקודם במקום להיבנות מחדש.
+    """
+
+    def __init__(
+        self,
+        input,
+        output_dir: Optional[str] = None,
+        sheet_name: str = "sheet1",
+        sum_header: str = SUM_HEADER,
+        drop_empty: bool = False,
+        keep_other: bool = False,
+        split_by_manager: bool = False,
+        market_private: bool = False,
+        market_tedmiti: bool = False,
+        region_general: bool = False,
+        pivot_private: bool = False,
+        pivot_tedmiti: bool = False,
+        by_agent: bool = False,
+        values_only: bool = False,
+        report_workers: int = 1,
+        timing_summary: bool = False,
+        memory_report: bool = False,
+        memory_budget: Optional[float] = None,
+        profile: Optional[str] = None,
+        force: bool = False,
+        reuse: str = "link",
+        incremental: bool = False,
+        return_xlsx: bool = False,
+        source_name: Optional[str] = None,
+        no_cache: bool = False,
+        refresh_cache: bool = False,
+        cache_dir: Optional[str] = None,
+        cache_max_mb: float = 1024,
+        with_nov_dec: bool = False,
+        keep_temp: bool = False,
+    ):
+        self.input = input
+        self.output_dir = output_dir
+        self.sheet_name = sheet_name
+        self.sum_header = sum_header
+        self.drop_empty = drop_empty
+        self.keep_other = keep_other
+        self.split_by_manager = split_by_manager
+        self.market_private = market_private
+        self.market_tedmiti = market_tedmiti
+        self.region_general = region_general
+        self.pivot_private = pivot_private
+        self.pivot_tedmiti = pivot_tedmiti
+        self.by_agent = by_agent
+        self.values_only = values_only
+        self.report_workers = report_workers
+        self.timing_summary = timing_summary
+        self.memory_report = memory_report
+        self.memory_budget = memory_budget
+        self.profile = profile
+        self.force = force
+        self.reuse = reuse
+        self.incremental = incremental
+        self.return_xlsx = return_xlsx
+        self.source_name = source_name
+        self.no_cache = no_cache
+        self.refresh_cache = refresh_cache
+        self.cache_dir = cache_dir
+        self.cache_max_mb = cache_max_mb
+        self.with_nov_dec = with_nov_dec
+        self.keep_temp = keep_temp
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "Stage1Config":
+        return cls(**vars(args))
+
+    @property
+    def name(self) -> str:
+        """שם המקור לשם קובץ הפלט: source_name, נתיב הקלט, או name של אובייקט הקובץ ('QS' אם אין)."""
+        if self.source_name:
+            return self.source_name
+        if isinstance(self.input, (str, os.PathLike)):
+            return os.fspath(self.input)
+        name = getattr(self.input, "name", None)
+        return name if isinstance(name, str) else "QS"
+
+
+class Stage1Result:
+    """
+    processed: 'מעובד' כ-DataFrame (כולל שורות הסכום), עם הכותרות כפי שנכתבו לגיליון (O..T מה-QS).
+    reports: {שם גיליון: DataFrame} לכל דוח נגזר שנבנה – נוצר בגישה הראשונה, נוסחאות מוחלפות בערכן.
+    xlsx: BytesIO של הקובץ (רק עם return_xlsx); output_path: הקובץ שנשמר (רק עם output_dir).
+    session: ה-WorkbookSession הפתוח של הריצה; run_report: מדידות הזמן לפי שלב (RunReport).
+    skipped: רשומת ה-manifest כשהריצה דולגה (אין session; processed / reports נקראים מקובץ הפלט בגישה הראשונה).
+    """
+
+    def __init__(self, processed: Optional[pd.DataFrame], session: Optional[WorkbookSession], values: dict,
+                 xlsx: Optional[io.BytesIO] = None, output_path: Optional[str] = None,
+                 run_report: Optional[RunReport] = None, skipped: Optional[dict] = None):
+        self._processed = processed
+        self.session = session
+        self.xlsx = xlsx
+        self.output_path = output_path
+        self.run_report = run_report
+        self.skipped = skipped
+        self._values = values
+        self._reports = None
+
+    @property
+    def rows(self) -> Optional[int]:
+        """מספר השורות ב'מעובד' (בריצה שדולגה – מה-manifest, בלי לקרוא את הקובץ)."""
+        if self._processed is None and self.skipped is not None:
+            return self.skipped.get("rows")
+        return len(self.processed)
+
+    def _saved_sheets(self) -> Dict[str, pd.DataFrame]:
+        # הנוסחאות נשמרו עם ערך מחושב, כך ש-pandas רואה מספרים
+        return pd.read_excel(self.xlsx if self.xlsx is not None else self.output_path, sheet_name=None)
+
+    @property
+    def processed(self) -> pd.DataFrame:
+        if self._processed is None and self.session is None:
+            df = self._saved_sheets()["מעובד"]
+            extra = [c for c in df.columns[14:] if df[c].isna().all()]  # כותרות O..T שהועתקו מה-QS
+            self._processed = df.drop(columns=extra)
+        return self._processed
+
+    @property
+    def reports(self) -> Dict[str, pd.DataFrame]:
+        if self._reports is None:
+            if self.session is None:
+                self._reports = {name: df for name, df in self._saved_sheets().items() if name != "מעובד"}
+            else:
+                self._reports = {
+                    name: self.session.sheet_frame(name, self._values.get(name))
+                    for name in self.session.sheetnames if name != "מעובד"
+                }
+        return self._reports
+
+
+def _with_sheet_headers(session: WorkbookSession, df: pd.DataFrame, sheet_name: str = "מעובד") -> pd.DataFrame:
+    """df (בלי העתקת הנתונים) עם הכותרות משורה 1 של הגיליון – אותן כותרות שקורא הקובץ השמור יראה."""
+    if sheet_name not in session:
+        return df
+    header = [c.value for c in session[sheet_name][1]][:len(df.columns)]
+    out = df.copy(deep=False)
+    out.columns = [h if h is not None else c for h, c in zip(header, df.columns)] + list(df.columns[len(header):])
+    return out
+
+
+def _open_source(src):
+    """נתיב נשאר נתיב; bytes -> BytesIO; אובייקט קובץ בלי seek נקרא לזיכרון (openpyxl קורא zip עם seek)."""
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return io.BytesIO(bytes(src))
+    if hasattr(src, "read"):
+        if not (hasattr(src, "seekable") and src.seekable()):
+            return io.BytesIO(src.read())
+        return src
+    return os.fspath(src)
+
+
+def _reuse_previous(config: Stage1Config, report: RunReport, manifest: RunManifest, key: str, previous: dict,
+                    out_path: str) -> Stage1Result:
+    """ריצה שדולגה: הפלט הקודם עובר לשם החדש (או רק מדווח), וה-manifest מצביע על הקובץ האחרון."""
+    print(f"[ללא שינוי] אותו QS, אותם דגלים ואותו קוד כמו בריצה של {previous['when']} – מדלגים על כל העבודה.", flush=True)
+    with report.stage("reuse_output"):
+        output = reuse_output(previous["output"], out_path, config.reuse)
+    if output == previous["output"]:
+        print(f"    הפלט הקיים: {output}", flush=True)
+        report.path = None  # אין פלט חדש – לא דורסים את דוח הזמנים של הריצה המקורית
+    else:
+        how = "קושר" if config.reuse == "link" and os.stat(output).st_nlink > 1 else "הועתק"
+        print(f"    הפלט הקודם {how} לשם החדש: {output}", flush=True)
+        manifest.record(key, output, previous.get("rows"), config.name, parts=previous.get("parts"))
+    report.output = output
+    if report.path:
+        try:
+            report.write(report.path)
+        except OSError:
+            pass
+    if config.timing_summary:
+        print("\n[זמנים] לפי שלב:", flush=True)
+        for line in report.summary_lines():
+            print(line, flush=True)
+    xlsx = None
+    if config.return_xlsx:
+        with open(output, "rb") as f:
+            xlsx = io.BytesIO(f.read())
+    return Stage1Result(None, None, {}, xlsx=xlsx, output_path=output, run_report=report, skipped=previous)
+
+
+def _manager_parts(config: Stage1Config, report: RunReport, session: WorkbookSession,
+                   manifest: Optional[RunManifest], names: list):
+    """
+    רק עם incremental: חתימות התוכן של לשוניות המנהלים ({שם: sheet_digest}, נשמרות ב-manifest לריצה הבאה)
+    ו-SheetPartCopy של הלשוניות שהחתימה שלהן זהה לזו שנשמרה לפלט הקודם. מחזיר (parts או None, copier או None).
+    בלי incremental אין חתימות (הן עולות זמן) – ריצת ה---incremental הבאה תכתוב את כל הלשוניות.
+    פיבוטים, 'לפי סוכן' ושאר הגיליונות תמיד נכתבים מחדש – הם מסכמים את כל המנהלים.
+    """
+    if not config.incremental or manifest is None or not names:
+        return None, None
+    from Logic.sheet_parts import SheetPartCopy, render_salt, sheet_digest
+
+    with report.stage("sheet_digest") as st:
+        salt = render_salt(config.values_only)
+        parts = {name: sheet_digest(session, name, salt) for name in names}
+        parts = {name: digest for name, digest in parts.items() if digest is not None}
+        st.rows_in = sum(sheet_rows(session, name) for name in parts)
+    previous = manifest.latest_with_parts()
+    if previous is None:
+        print("• [incremental] אין פלט קודם עם חתימות לשוניות – כל הלשוניות נכתבות.", flush=True)
+        return parts, None
+    same = [name for name, digest in parts.items() if previous["parts"].get(name) == digest]
+    copier = None
+    if same:
+        try:
+            copier = SheetPartCopy(previous["output"], same)
         except Exception as e:
-            print(f"שגיאה בבניית 'לפי סוכן' (w90): {e}", flush=True)
+            print(f"    [אזהרה] קריאת הפלט הקודם נכשלה, כל הלשוניות נכתבות: {e}", flush=True)
+    copied = copier.names if copier is not None else []
+    print(f"• [incremental] לשוניות מנהלים: {len(copied)} הועתקו מ-{os.path.basename(previous['output'])}, "
+          f"{len(parts) - len(copied)} נכתבו מחדש" + (f" ({', '.join(n for n in parts if n not in copied)})"
+                                                     if len(copied) < len(parts) else ""), flush=True)
+    return parts, copier if copied else None
 
-        if ok:
-        # (2) שורות ריקות לקבוצות
-            try:
-                from Logic.w90_agent import ensure_group_blank_rows_w90
-                ensure_group_blank_rows_w90(out_path, sheet_name="לפי סוכן")
-            except Exception as ge:
-                print(f"    [אזהרה] הוספת שורות ריקות נכשלה: {ge}", flush=True)
 
-        # (3) ריתוך נוסחאות הסיכום אחרי ההחדרה
-            try:
-                from Logic.w90_agent import rebind_all_sum_rows_w90
-                rebind_all_sum_rows_w90(out_path, sheet_name="לפי סוכן")
-            except Exception as ge:
-                print(f"    [אזהרה] תיקון נוסחאות סיכום נכשל: {ge}", flush=True)
+def run_stage1(config: Stage1Config) -> Stage1Result:
+    """
+    ריצה אחת של שלב 1 מתוך קוד: קריאה (מנתיב / bytes / אובייקט קובץ), ניקוי, דוחות נגזרים.
+    בלי output_dir ובלי return_xlsx לא נכתב שום קובץ – רק ה-DataFrames חוזרים.
+    """
 
-        # (4) רשתות ארציות
-            try:
-                from Logic.w90_agent import link_national_from_manager_sheets_w90
-                link_national_from_manager_sheets_w90(out_path, sheet_name="לפי סוכן")
-                print("    רשתות ארציות מולאו מנתוני גיליונות המנהלים.", flush=True)
-            except Exception as ge:
-                print(f"    [אזהרה] רשתות ארציות לא מולאו: {ge}", flush=True)
+    args = config  # אותם שמות שדות כמו הדגלים של שורת הפקודה
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    source = _open_source(args.input)
+    # זמני קיר/CPU, שורות ותאים לכל שלב -> <פלט>.run_report.json
+    report = RunReport(config.name, memory=args.memory_report, budget_mb=args.memory_budget,
+                       profile_dir=args.profile)
+    out_path = processed_output_path(config.name, args.output_dir) if args.output_dir else None
+    if out_path:
+        report.output, report.path = out_path, report_path_for(out_path)
+
+    # ריצה שלמה: אותו תוכן QS + אותם דגלי פלט + אותו קוד כמו פלט קיים -> אין מה לחשב
+    manifest = run_key_ = input_digest = None
+    if args.output_dir:
+        manifest = RunManifest(args.output_dir)
+        with report.stage("manifest_lookup"):
+            input_digest = source_digest(source)
+            run_key_ = run_key(input_digest, args)
+            previous = None if args.force else manifest.lookup(run_key_)
+        if previous is not None:
+            return _reuse_previous(config, report, manifest, run_key_, previous, out_path)
+        if os.path.exists(out_path) and os.stat(out_path).st_nlink > 1:
+            os.remove(out_path)  # hard link לפלט קודם (--reuse link באותה דקה) – לא כותבים דרכו לתוך הקובץ המקורי
 
-        # (5) L/C/E
+    # חישוב צעדים עד שמירת 'מעובד' (הדוחות הנגזרים אינם נספרים בלוג זה)
+    total_steps = 12 + (0 if args.keep_other else 1) + (1 if args.drop_empty else 0)
+    # מטמון: אותו QS (לפי תוכן) עם אותן אפשרויות ניקוי -> מדלגים ישר לשמירת 'מעובד'
+    cache = cache_key_ = cached = None
+    if not args.no_cache and (args.cache_dir or args.output_dir):
+        cache = ParseCache(args.cache_dir or os.path.join(args.output_dir, "_cache"),
+                           max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        cache_key_ = cache_key(source, {
+            "sheet_name": args.sheet_name, "sum_header": args.sum_header,
+            "drop_empty": args.drop_empty, "keep_other": args.keep_other,
+        }, digest=input_digest)
+        with report.stage("cache_lookup") as st:
+            cached = None if args.refresh_cache else cache.get(cache_key_)
+            st.rows_out = len(cached["df_proc"]) if cached is not None else None
+        if cached is not None:
+            df_proc, src_headers = cached["df_proc"], cached["src_headers"]
+            print(f"[מטמון] נמצאה תוצאת ניקוי שמורה ({cache_key_[:12]}) – מדלגים על קריאה וניקוי.", flush=True)
+
+    if cached is None:
+        df_proc, src_headers = _ingest_and_clean(args, source, total_steps, report)
+        if cache is not None:
             try:
-                from Logic.w90_agent import ensure_pigor_sum_and_pct_w90
-                ensure_pigor_sum_and_pct_w90(out_path, sheet_name="לפי סוכן")
-                print("    עודכן: 'סך פיגור' (L) + אחוזים ב-C/E בכל השורות.", flush=True)
-            except Exception as ge:
-                print(f"    [אזהרה] חישוב 'סך פיגור' ואחוזים נכשל: {ge}", flush=True)
+                cache.put(cache_key_, {"df_proc": df_proc, "src_headers": src_headers})
+            except Exception as e:
+                print(f"    [אזהרה] שמירה למטמון נכשלה: {e}", flush=True)
+    step = total_steps
 
-        # (6) פריסת עמודות למניעת #####
-            try:
-                from Logic.w90_agent import set_column_layout_w90
-                set_column_layout_w90(out_path, sheet_name="לפי סוכן")
-                print("    עיצוב תצוגה: רוחבי עמודות + RTL + Freeze + shrink-to-fit (למניעת #####).", flush=True)
-            except Exception as ge:
-                print(f"    [אזהרה] עיצוב תצוגה לא הושלם: {ge}", flush=True)
+    print(f"[{step}/{total_steps}] שמירה בשם עם חותמת זמן וגיליון 'מעובד'...", flush=True); step += 1
+    # Workbook יחיד בזיכרון לכל הריצה: כל הדוחות הנגזרים עובדים עליו, ונשמר לדיסק פעם אחת בסוף.
+    # גיליונות הנתונים (מעובד / מנהלים / פיבוטים) נכתבים בשמירה ישירות מה-DataFrame, במצב write-only.
+    session = WorkbookSession.new(out_path, streaming=True)
+    with report.stage("write_processed", rows_in=len(df_proc)) as st:
+        write_processed_sheet(session, df_proc, sheet_name="מעובד")
+        st.rows_out, st.cells = sheet_rows(session, "מעובד"), sheet_cells(session, "מעובד")
+    ###################################################################################
+    try:
+        if "מעובד" in session:
+            _ws = session["מעובד"]
+            for idx, val in enumerate(src_headers, start=15):  # שורה 1 במקור  # 15..20 => O..T
+                _ws.cell(row=1, column=idx, value=val)
+        print('    עודכן: כותרות O..T ב"מעובד" הועתקו אוטומטית מ־QS.', flush=True)
+    except Exception as e:
+        print(f'    [אזהרה] לא הצלחנו לעדכן כותרות O..T ב"מעובד": {e}', flush=True)
+        
+            
+    # ===== דוחות נגזרים מתוך 'מעובד' =====
+    # לעבודה על דוחות: מסירים שורות "סכום" טקסטואליות
+    df_for_reports = df_proc.copy()
+    if args.sum_header in df_for_reports.columns:
+        df_for_reports = df_for_reports[
+            ~(df_for_reports[args.sum_header].astype(str).str.strip() == "סכום")
+        ]
 
-        # (7) צבעי קבוצות/קו עבה/Bold
-            try:
-                from Logic.w90_agent import style_groups_colA_only_w90
-                style_groups_colA_only_w90(out_path, sheet_name="לפי סוכן")
-                print("    עיצוב: עמודה A בקבוצות + Bold לשורות המבוקשות + קווים.", flush=True)
-            except Exception as ge:
-                print(f"    [אזהרה] עיצוב-סיום לא הושלם: {ge}", flush=True)
-                
-                
-        #remove bold line between lines 21 and 22
-            try:
-                from openpyxl import load_workbook
-                from openpyxl.styles import Border
-
-                wb = load_workbook(out_path)
-                if "לפי סוכן" in wb.sheetnames:
-                    ws = wb["לפי סוכן"]
-
-                    # מצא את השורה של 'סה"כ מוקד'
-                    row_sum = None
-                    for r in range(2, ws.max_row + 1):
-                        a = str(ws.cell(row=r, column=1).value or "").strip()
-                        if a == 'סה"כ מוקד':
-                            row_sum = r
-                            break
-
-                    # אם השורה הבאה היא 'אריק יחזקאל' – ננקה את ה-bottom border בשורת 'סה"כ מוקד'
-                    if row_sum and row_sum + 1 <= ws.max_row:
-                        next_a = str(ws.cell(row=row_sum + 1, column=1).value or "").strip()
-                        if next_a == "אריק יחזקאל":
-                            for c in range(1, ws.max_column + 1):
-                                cell = ws.cell(row=row_sum, column=c)
-                                b = cell.border
-                                cell.border = Border(left=b.left, right=b.right, top=b.top, bottom=None)
-
-                    wb.save(out_path)
-            except Exception as ge:
-                print(f'    [אזהרה] ניקוי קו עבה אחרי "סה\\"כ מוקד" נכשל: {ge}', flush=True)
-
-        # (8) בלי קו עבה מעל 'סה\"כ רשתות ארציות'
+    print("\n[דוחות נגזרים] בנייה לפי דגלים...", flush=True)
+
+    # קובייה מסוכמת אחת (מנהל סחר × ערוץ × מנהל אזור × סוכן) לשוק פרטי/תדמיתי ולפיבוטים
+    cube = None
+    if args.market_private or args.market_tedmiti or args.pivot_private or args.pivot_tedmiti:
+        with report.stage("agg_cube", rows_in=len(df_for_reports)):
             try:
-                from Logic.w90_agent import remove_thick_above_national_total
-                remove_thick_above_national_total(out_path, sheet_name="לפי סוכן")
-                print("    עודכן: הוסר הקו העבה מעל 'סה\"כ רשתות ארציות'.", flush=True)
-            except Exception as ge:
-                print(f"    [אזהרה] ניקוי קו עבה מעל רשתות ארציות נכשל: {ge}", flush=True)
-                
-                
-            
+                cube = AggCube(df_for_reports, max_month_cols_after_today=4)
+            except Exception as e:
+                print(f"    [אזהרה] בניית קובייה משותפת נכשלה, כל דוח יסכם בעצמו: {e}", flush=True)
+
+    # דוחות בלי תלויות יכולים לרוץ במקביל בתהליכים (--report-workers); ההרכבה לסשן תמיד לפי סדר הגרף
+    from Logic.report_dag import run_report_dag
+    workers = args.report_workers
+    if args.memory_budget is not None and workers > 1:
+        # הערכה גסה: כל תהליך עובד מחזיק עותק של הנתונים בגודל דומה לתהליך הראשי
+        rss, _ = rss_bytes()
+        if rss is not None and rss / (1024 * 1024) * (1 + workers) > args.memory_budget:
+            print(f"    [זיכרון] {workers} תהליכים לא ייכנסו בתקציב ({args.memory_budget:.0f}MB) – הדוחות ייבנו ברצף.", flush=True)
+            workers = 1
+    added = run_report_dag(session, _report_nodes(args), {"df_for_reports": df_for_reports, "cube": cube},
+                           workers=workers, report=report)
+
+    # ערכי הנוסחאות מחושבים פעם אחת: לטבלאות שמוחזרות, ולצד הנוסחאות בקובץ
+    # (data_only / pandas רואים מספרים, Excel לא חייב לחשב מחדש)
+    from Logic.formula_values import FormulaValues, save_session_with_values
+    with report.stage("formula_values") as st:
+        computed = FormulaValues(session.wb, session.frame).collect()
+        st.cells = sum(len(cells) for cells in computed[0].values())
+    # חתימה לכל לשונית מנהל (נשמרת ב-manifest); עם --incremental – לשונית שלא השתנתה מועתקת מהפלט הקודם
+    parts, copier = _manager_parts(args, report, session, manifest, added.get("מנהלי סחר", []))
+    xlsx = io.BytesIO() if args.return_xlsx else None
+    if xlsx is not None or out_path:
+        with report.stage("save") as st:
+            st.cells = sum(sheet_cells(session, name) for name in session.sheetnames
+                           if copier is None or name not in copier.names)
+            filled, unresolved = save_session_with_values(session, values_only=args.values_only,
+                                                          target=xlsx if xlsx is not None else out_path,
+                                                          computed=computed, copied=copier)
+            if xlsx is not None and out_path:
+                with open(out_path, "wb") as f:
+                    f.write(xlsx.getvalue())
+        kind = "נכתבו כמספרים" if args.values_only else "נשמרו עם ערך מחושב"
+        print(f"• נוסחאות: {filled} {kind}" + (f", {unresolved} נשארו לחישוב ב-Excel" if unresolved else ""), flush=True)
+    if manifest is not None:
+        try:
+            manifest.record(run_key_, out_path, len(df_proc), config.name, parts=parts)
+        except Exception as e:
+            print(f"    [אזהרה] עדכון {os.path.basename(manifest.path)} נכשל: {e}", flush=True)
+
+    if report.path:
+        try:
+            print(f"• דוח זמנים: {report.write(report.path)}", flush=True)
+        except Exception as e:
+            print(f"    [אזהרה] כתיבת דוח הזמנים נכשלה: {e}", flush=True)
+    if report.profiler is not None:
+        try:
+            files = report.profiler.finish()
+            print(f"• פרופיל: {len(report.profiler.files)} קבצי pstats לפי שלב + {', '.join(os.path.basename(f) for f in files)} ב-{args.profile}", flush=True)
+        except Exception as e:
+            print(f"    [אזהרה] איחוד הפרופיל נכשל: {e}", flush=True)
+    if args.timing_summary or args.memory_report:
+        print("\n[זמנים] לפי שלב:", flush=True)
+        for line in report.summary_lines():
+            print(line, flush=True)
+    return Stage1Result(_with_sheet_headers(session, df_proc), session, computed[0], xlsx=xlsx, output_path=out_path,
+                        run_report=report)
 
-    print("\nהפקה הושלמה בהצלחה:", out_path)
+
+def main(argv=None):
+    """הרצה אחת על קובץ QS משורת הפקודה. מחזירה (נתיב הפלט, מספר השורות ב'מעובד')."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="נתיב לקובץ המקור (xlsx)")
+    parser.add_argument("--output-dir", required=True, help="תיקיית פלט לשמירת הקובץ המעובד")
+    parser.add_argument("--sheet-name", default="sheet1", help="שם הגיליון המקורי (ברירת מחדל: sheet1)")
+    parser.add_argument("--sum-header", default=SUM_HEADER, help="שם העמודה בה נחשב סכום בסוף")
+    parser.add_argument("--drop-empty", action="store_true", help="מחיקת שורות ריקות/חסרות מזהי מפתח")
+    parser.add_argument("--keep-other", action="store_true", help="אל תנקה 'אחר'/'אחר אחר' במנהלי סחר/אזור")
+    parser.add_argument("--keep-temp", action="store_true", help="ללא השפעה: הקריאה כבר לא יוצרת קבצים זמניים (נשאר לתאימות)")
+    parser.add_argument("--no-cache", action="store_true", help="בלי מטמון: קריאה וניקוי מלאים, בלי לשמור תוצאה")
+    parser.add_argument("--refresh-cache", action="store_true", help="קריאה וניקוי מלאים גם אם יש תוצאה שמורה, ועדכון המטמון")
+    parser.add_argument("--cache-dir", default=None, help="תיקיית המטמון (ברירת מחדל: <output-dir>/_cache)")
+    parser.add_argument("--cache-max-mb", type=float, default=1024, help="גודל מרבי למטמון ב-MB (פינוי LRU)")
+    parser.add_argument("--with-nov-dec", dest="with_nov_dec", action="store_true",
+                        help="[תאימות לאחור] לא בשימוש במצב דינמי (I..M אחרי H)")
+
+    # דוחות נגזרים
+    parser.add_argument("--split-by-manager", action="store_true",
+                        help="יצירת לשוניות לכל 'מנהל סחר' מתוך גיליון 'מעובד' (J..M דינמי + 'טור עזר').")
+    parser.add_argument("--market-private", action="store_true",
+                        help="יצירת גיליון 'שוק פרטי' (מנהל סחר=רפי מור יוסף-סחר, ערוץ=שוק פרטי) במבנה כמו מנהלי סחר")
+    parser.add_argument("--market-tedmiti", action="store_true",
+                        help="יצירת גיליון 'שוק תדמיתי' (מנהל סחר=עמי חכמון) עם כל העמודות מה'מעובד'")
+    parser.add_argument("--region-general", action="store_true",
+                        help="יצירת גיליון 'מנהל אזור כללי' עם כל העמודות מ'מעובד'")
+    parser.add_argument("--pivot-private", action="store_true",
+                        help="יצירת גיליון 'פיבוט פרטי' (מנהל סחר=רפי מור יוסף-סחר, ערוץ=שוק פרטי)")
+    parser.add_argument("--pivot-tedmiti", action="store_true",
+                        help="יצירת גיליון 'פיבוט תדמיתי' (מנהל סחר=עמי חכמון)")
     
-    if not args.keep_temp:
+    parser.add_argument("--by-agent", action="store_true",
+                    help="יצירת גיליון 'לפי סוכן' מתוך 'פיבוט פרטי'")
+    parser.add_argument("--values-only", action="store_true",
+                        help="נוסחאות הסיכום נכתבות כמספרים בלבד (בלי נוסחה) – הפתיחה הכי מהירה")
+    parser.add_argument("--report-workers", type=int, default=1,
+                        help="מספר תהליכים לבניית דוחות נגזרים בלתי תלויים במקביל (1 = ברצף, בתהליך הראשי)")
+    parser.add_argument("--timing-summary", action="store_true",
+                        help="טבלת זמנים לפי שלב בסוף הלוג (run_report.json נכתב תמיד ליד הפלט)")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="שיא זיכרון לכל שלב (tracemalloc + RSS) ב-run_report.json ובטבלה בסוף הלוג")
+    parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                        help="עצירה באמצע השלב אם ה-RSS עובר את התקציב (דגימה כל 0.1 שנ', עם שם השלב); --report-workers יורד ל-1 אם לא ייכנס")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="cProfile לכל שלב ולכל דוח נגזר: NN_<שלב>.pstats, all_stages.pstats ו-stacks.folded (ל-flamegraph)")
+    parser.add_argument("--force", action="store_true",
+                        help="ריצה מלאה גם אם אותו QS כבר הורץ עם אותם דגלים ואותו קוד (_run_manifest.json)")
+    parser.add_argument("--reuse", choices=REUSE_MODES, default="link",
+                        help="כשאין שינוי: link – hard link של הפלט הקודם בשם החדש, copy – העתקה, report – רק דיווח")
+    parser.add_argument("--incremental", action="store_true",
+                        help="לשוניות מנהלים שלא השתנו מאז הפלט הקודם (_run_manifest.json) מועתקות ממנו במקום להיכתב מחדש")
+
+
+    args = parser.parse_args(argv)
+    try:
+        result = run_stage1(Stage1Config.from_args(args))
+    except MemoryBudgetExceeded as e:
+        raise SystemExit(f"[זיכרון] {e}. הריצה נעצרה.")
+    print("\nהפקה הושלמה בהצלחה:", result.output_path)
+    return result.output_path, result.rows
+
+
+# ===== מצב batch: הרבה קבצי QS במאגר תהליכים "חמים" =====
+BATCH_SUMMARY_NAME = "batch_summary.csv"
+
+
+def _batch_worker_init():
+    """כל תהליך עובד טוען את המודול (pandas/openpyxl) פעם אחת ומריץ בו את כל הקבצים שלו."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+
+
+def _run_batch_item(argv: list, log_path: str) -> dict:
+    """מריץ main על קובץ אחד, עם הלוג שלו בקובץ נפרד. כישלון נשאר בתוך הקובץ הזה."""
+    import time
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+
+    t0 = time.perf_counter()
+    out_path, rows, error = "", None, ""
+    with open(log_path, "w", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
         try:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        except Exception:
-            pass
+            out_path, rows = main(argv)
+        except SystemExit as e:
+            error = e.code if isinstance(e.code, str) else f"ארגומנטים לא תקינים (exit {e.code})"
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+    return {
+        "status": "error" if error else "ok",
+        "rows": rows,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "output": out_path,
+        "error": error,
+        "log": log_path,
+    }
+
+
+def _batch_output_dirs(inputs: list, output_dir: str) -> list:
+    """תיקיית פלט לכל קובץ: output_dir, ואם שני קבצים עם אותו שם – תת-תיקייה לכל אחד (שמות הפלט לפי שם המקור + דקה)."""
+    from Logic.utils import base_from_path
+    bases = [base_from_path(p) for p in inputs]
+    out = []
+    for i, (path, base) in enumerate(zip(inputs, bases), start=1):
+        if bases.count(base) > 1:
+            parent = os.path.basename(os.path.dirname(os.path.abspath(path))) or "root"
+            out.append(os.path.join(output_dir, f"{i:03d}_{parent}"))
+        else:
+            out.append(output_dir)
+    return out
+
+
+def batch_main(argv=None):
+    """
+    python -m pipeline.run_stage1 batch --input-glob "<תבנית>" --output-dir <תיקייה> --workers N [דגלי run_stage1...]
+    כל שאר הדגלים (--drop-empty, --by-agent, ...) עוברים כמו שהם לכל קובץ.
+    בסוף: טבלת סיכום בלוג + batch_summary.csv בתיקיית הפלט.
+    """
+    import csv
+    import glob
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    parser = argparse.ArgumentParser(prog="run_stage1 batch")
+    parser.add_argument("--input-glob", required=True, action="append",
+                        help="תבנית קבצי QS (אפשר כמה פעמים)")
+    parser.add_argument("--output-dir", required=True, help="תיקיית פלט לכל הקבצים")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="מספר תהליכים במקביל")
+    args, passthrough = parser.parse_known_args(argv)
+
+    inputs = sorted({os.path.abspath(p) for pattern in args.input_glob for p in glob.glob(pattern, recursive=True)
+                     if os.path.isfile(p)})
+    if not inputs:
+        print("לא נמצאו קבצים לתבנית:", ", ".join(args.input_glob), flush=True)
+        return []
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    log_dir = os.path.join(args.output_dir, "_logs")
+    os.makedirs(log_dir, exist_ok=True)
+    out_dirs = _batch_output_dirs(inputs, args.output_dir)
+    jobs = []
+    for i, (path, out_dir) in enumerate(zip(inputs, out_dirs), start=1):
+        log_path = os.path.join(log_dir, f"{i:03d}_{os.path.splitext(os.path.basename(path))[0]}.log")
+        jobs.append((["--input", path, "--output-dir", out_dir] + passthrough, log_path))
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"[batch] {len(jobs)} קבצים, {workers} תהליכים", flush=True)
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [_run_batch_item(a, log) for a, log in jobs]
+    else:
+        _batch_worker_init()  # נורש גם לתהליכים שנוצרים ב-spawn
+        with ProcessPoolExecutor(max_workers=workers, initializer=_batch_worker_init) as pool:
+            futures = [pool.submit(_run_batch_item, a, log) for a, log in jobs]
+            results = []
+            for (a, log), fut in zip(jobs, futures):
+                try:
+                    results.append(fut.result())
+                except Exception as e:  # התהליך עצמו קרס (למשל זיכרון)
+                    results.append({"status": "error", "rows": None, "seconds": None, "output": "",
+                                    "error": f"{type(e).__name__}: {e}", "log": log})
+    wall = time.perf_counter() - t0
+
+    for path, r in zip(inputs, results):
+        r["file"] = path
+    summary_path = os.path.join(args.output_dir, BATCH_SUMMARY_NAME)
+    fields = ["file", "status", "rows", "seconds", "output", "error", "log"]
+    with open(summary_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(results)
+
+    print("\n[batch] סיכום:", flush=True)
+    print(f"    {'קובץ':<40} {'סטטוס':<6} {'שורות':>8} {'שניות':>8}", flush=True)
+    for r in results:
+        rows = "" if r["rows"] is None else r["rows"]
+        secs = "" if r["seconds"] is None else f"{r['seconds']:.1f}"
+        print(f"    {os.path.basename(r['file']):<40} {r['status']:<6} {rows:>8} {secs:>8}"
+              + (f"  {r['error']}" if r["error"] else ""), flush=True)
+    ok = sum(r["status"] == "ok" for r in results)
+    print(f"[batch] {ok}/{len(results)} הצליחו, {wall:.1f} שניות סה\"כ. סיכום: {summary_path}", flush=True)
+    return results
+
+
+# ===== מצב watch: תהליך קבוע שמריץ את שלב 1 על כל QS חדש בתיקייה =====
+WATCH_STATE_NAME = "_watch_state.json"
+
+
+def _watch_key(path: str, passthrough: list) -> str:
+    """תוכן הקובץ + הדגלים: אותו QS עם אותם דגלים לא מורץ פעמיים."""
+    import hashlib
+    import json
+    from Logic.parse_cache import file_digest
+    h = hashlib.sha256(file_digest(path).encode())
+    h.update(json.dumps(passthrough, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_watch_state(path: str) -> dict:
+    import json
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_watch_state(path: str, state: dict):
+    import json
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _watch_candidates(watch_dir: str, pattern: str) -> list:
+    import glob
+    out = []
+    for p in sorted(glob.glob(os.path.join(watch_dir, pattern))):
+        name = os.path.basename(p)
+        if name.startswith("~$") or not os.path.isfile(p):  # קובץ נעילה של Excel פתוח
+            continue
+        out.append(p)
+    return out
+
+
+def watch_main(argv=None):
+    """
+    python -m pipeline.run_stage1 watch --watch-dir source_file_stage1 --output-dir outputs_files_stage1 [דגלי run_stage1...]
+    סורק את התיקייה כל --interval שניות (polling, בלי שירות חיצוני). קובץ מורץ רק אחרי שגודלו וזמן השינוי שלו
+    לא השתנו --settle שניות והוא xlsx שלם; קובץ שהתוכן שלו (עם אותם דגלים) כבר עובד – מדולג.
+    לוג לכל הרצה ב---log-dir (ברירת מחדל: _logs בתיקיית הפרויקט), מצב ההרצות ב-<output-dir>/_watch_state.json.
+    """
+    import time
+    import zipfile
+    from Logic.utils import base_from_path, ts_now
+
+    parser = argparse.ArgumentParser(prog="run_stage1 watch")
+    parser.add_argument("--watch-dir", default=os.path.join(BASE_DIR, "source_file_stage1"), help="תיקיית קבצי QS")
+    parser.add_argument("--output-dir", required=True, help="תיקיית פלט")
+    parser.add_argument("--pattern", default="*.xlsx", help="תבנית שמות הקבצים בתיקייה")
+    parser.add_argument("--interval", type=float, default=30, help="שניות בין סריקות")
+    parser.add_argument("--settle", type=float, default=10, help="כמה שניות קובץ צריך להיות יציב לפני הרצה")
+    parser.add_argument("--log-dir", default=os.path.join(BASE_DIR, "_logs"), help="תיקיית לוגים להרצות")
+    parser.add_argument("--once", action="store_true", help="סריקה אחת ויציאה (במקום לולאה)")
+    args, passthrough = parser.parse_known_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    os.makedirs(args.log_dir, exist_ok=True)
+    state_path = os.path.join(args.output_dir, WATCH_STATE_NAME)
+    state = _load_watch_state(state_path)
+    seen = {}  # נתיב -> ((גודל, זמן שינוי), מתי נראה כך לראשונה)
+    print(f"[watch] צופה ב-{args.watch_dir} ({args.pattern}), סריקה כל {args.interval:g} שניות", flush=True)
+
+    def scan(now: float):
+        for path in _watch_candidates(args.watch_dir, args.pattern):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime)
+            prev = seen.get(path)
+            if prev is None or prev[0] != sig:
+                seen[path] = (sig, now)
+                if not args.once:
+                    continue  # השתנה מאז הסריקה הקודמת – עדיין נכתב
+            elif prev[1] == "done" or now - prev[1] < args.settle:
+                continue
+            if not zipfile.is_zipfile(path):
+                continue  # כתיבה חלקית: עוד לא xlsx שלם
+            key = _watch_key(path, passthrough)
+            if key in state:
+                print(f"[watch] {os.path.basename(path)}: כבר עובד ({state[key]['when']}) – מדלגים", flush=True)
+            else:
+                log_path = os.path.join(args.log_dir, f"run_{base_from_path(path)}_{ts_now()}.log")
+                print(f"[watch] {os.path.basename(path)}: מריץ (לוג: {log_path})", flush=True)
+                r = _run_batch_item(["--input", path, "--output-dir", args.output_dir] + passthrough, log_path)
+                secs = f"{r['seconds']:.1f}"
+                if r["status"] == "ok":
+                    state[key] = {"file": path, "when": ts_now(), "output": r["output"], "rows": r["rows"]}
+                    _save_watch_state(state_path, state)
+                    print(f"[watch]     הושלם: {r['output']} ({r['rows']} שורות, {secs} שניות)", flush=True)
+                else:
+                    # לא מנסים שוב את אותה גרסה של הקובץ – רק אחרי שהוא משתנה
+                    print(f"[watch]     נכשל ({secs} שניות): {r['error']}", flush=True)
+            seen[path] = (sig, "done")
+
+    try:
+        while True:
+            scan(time.time())
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("[watch] נעצר.", flush=True)
+    return state
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        results = batch_main(sys.argv[2:])
+        sys.exit(0 if all(r["status"] == "ok" for r in results) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "watch":
+        watch_main(sys.argv[2:])
+    else:
+        main()
     
     
     
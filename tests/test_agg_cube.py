@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Logic.agg_cube import EMPTY_AGENT_LABEL, SUM_ANCHOR_AFTER_TODAY, SUM_ANCHOR_TOTAL, AggCube, cube_for
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May"]
+
+
+def _frame(rows: int = 400, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    agents = ["סוכן 1", " סוכן 1 ", "סוכן 2", "", "  ", None, np.nan, "אחר"]
+    df = pd.DataFrame({
+        "מנהל סחר": rng.choice(["רפי", "עמי", "דני", None], rows),
+        "ערוץ": rng.choice(["שוק פרטי", "רשתות", "ייצוא"], rows),
+        "מנהל איזור": rng.choice(["צפון", "דרום", ""], rows),
+        "סוכן": pd.Series(agents, dtype=object).iloc[rng.integers(0, len(agents), rows)].to_numpy(),
+        "קוד סוכן": rng.integers(100, 200, rows),
+        SUM_ANCHOR_TOTAL: rng.integers(-500, 500, rows).astype(float),
+        SUM_ANCHOR_AFTER_TODAY: rng.integers(-500, 500, rows).astype(float),
+    })
+    for m in MONTHS:
+        df[m] = rng.integers(0, 100, rows).astype(float)
+    # ריקים, טקסט ועמודה שכולה ריקה בקבוצה מסוימת – min_count=1 נותן NaN ולא 0
+    df.loc[rng.random(rows) < 0.2, SUM_ANCHOR_TOTAL] = np.nan
+    df[MONTHS[1]] = df[MONTHS[1]].astype(object)
+    df.loc[rng.random(rows) < 0.1, MONTHS[1]] = "abc"
+    df.loc[df["סוכן"] == "אחר", MONTHS[0]] = np.nan
+    return df
+
+
+def _plain_pivot(df: pd.DataFrame, keep: np.ndarray) -> pd.DataFrame:
+    """הדרך הישירה: סינון שורות, סוכן אחרי strip, groupby().sum(min_count=1)."""
+    sums = [SUM_ANCHOR_TOTAL, SUM_ANCHOR_AFTER_TODAY] + MONTHS[:4]
+    rows = df.loc[keep]
+    agent = rows["סוכן"].astype(str).str.strip().replace("", EMPTY_AGENT_LABEL)
+    values = pd.DataFrame({c: pd.to_numeric(rows[c], errors="coerce") for c in sums}, index=rows.index)
+    return values.groupby(agent.rename("סוכן")).sum(min_count=1).reset_index()
+
+
+FILTERS = {
+    "all": {},
+    "private": {"ערוץ": lambda s: s == "שוק פרטי"},
+    "manager_region": {"מנהל סחר": lambda s: s.strip() == "רפי", "מנהל אזור": lambda s: s != ""},
+    "none": {"ערוץ": lambda s: s == "אין כזה"},
+}
+
+
+@pytest.mark.parametrize("name", list(FILTERS))
+def test_pivot_by_agent_matches_groupby(name):
+    df = _frame()
+    cube = AggCube(df)
+    filters = FILTERS[name]
+    assert cube.sum_cols == [SUM_ANCHOR_TOTAL, SUM_ANCHOR_AFTER_TODAY] + MONTHS[:4]
+
+    keep = np.ones(len(df), dtype=bool)
+    for dim, predicate in filters.items():
+        src = "מנהל איזור" if dim == "מנהל אזור" else dim
+        keep &= df[src].astype(str).map(predicate).to_numpy(dtype=bool)
+    np.testing.assert_array_equal(cube.row_mask(**filters), keep)
+    assert cube.count(**filters) == int(keep.sum())
+
+    got = cube.pivot_by_agent(cube.cell_mask(**filters))
+    if not keep.any():
+        assert got is None
+        return
+    pd.testing.assert_frame_equal(got, _plain_pivot(df, keep), check_exact=False, rtol=1e-12)
+    assert got[MONTHS[0]].isna().any()  # 'אחר' – כל הערכים ריקים
+
+
+def test_cube_for_reuses_only_matching_frame():
+    df = _frame(50)
+    cube = AggCube(df)
+    assert cube_for(df, cube) is cube
+    assert cube_for(df.iloc[:-1], cube) is not cube
+    assert cube_for(df.drop(columns=[MONTHS[3]]), cube).sum_cols[-1] == MONTHS[4]
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+from openpyxl import Workbook
+
+from pipeline.gen_qs import QSProfile, generate_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _batch(pattern, out_dir):
+    return subprocess.run([sys.executable, "-m", "pipeline.run_stage1", "batch", "--input-glob", pattern,
+                           "--output-dir", str(out_dir), "--workers", "1", "--drop-empty"],
+                          cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+
+
+def test_batch_exit_code_follows_the_results(tmp_path):
+    good = tmp_path / "good"
+    good.mkdir()
+    generate_qs(str(good / "QS.xlsx"), QSProfile(rows=200, seed=3))
+    ok = _batch(str(good / "*.xlsx"), tmp_path / "out_ok")
+    assert ok.returncode == 0, ok.stdout + ok.stderr
+
+    # קובץ אחד בלי הגיליון/העמודות של QS – הבאץ' ממשיך, אבל יוצא עם 1
+    broken = Workbook()
+    broken.active.title = "לא QS"
+    broken.save(good / "broken.xlsx")
+    failed = _batch(str(good / "*.xlsx"), tmp_path / "out_failed")
+    assert failed.returncode == 1, failed.stdout + failed.stderr
+    assert "1/2 הצליחו" in failed.stdout
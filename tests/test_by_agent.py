@@ -0,0 +1,133 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from Logic.formula_values import FormulaValues
+from Logic.golden_compare import compare_workbooks
+from Logic.sheet_writer import FrameSheet, write_frame_sheet
+from Logic.w90_agent import (TODAY_KEY, TOTAL_KEY, _lookup_last_formula, _manager_total_formula,
+                             build_by_agent_sheet_w90)
+from Logic.workbook_session import WorkbookSession
+from tests.by_agent_reference import build_by_agent_old_chain
+
+MONTHS = ["טרם חודש Jul", "לחודש Aug עד היום", "חודש Jun", "חודש May"]
+
+
+def _pivot(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["סוכן", TOTAL_KEY, TODAY_KEY] + MONTHS)
+
+
+def _empty_book(path) -> str:
+    wb = Workbook()
+    wb.active.title = "מעובד"
+    wb.save(path)
+    return str(path)
+
+
+def _row(ws, label: str, channel: str):
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        if row[0] == label and row[1] == channel:
+            return list(row)
+    raise AssertionError(f"{label} / {channel} not found")
+
+
+def test_all_nan_group_is_written_as_zero(tmp_path):
+    # sum(min_count=1) של קבוצה שכולה ריקה נותן NaN – בגיליון הוא היה תא ריק, שנקרא כ-None ונכתב כ-0
+    private = _pivot([
+        ["אמנון ידידי", 10, 5, np.nan, 2.5, np.nan, np.nan],
+        ["יואב מימון", np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],
+    ])
+    path = _empty_book(tmp_path / "out.xlsx")
+    ok, _, _ = build_by_agent_sheet_w90(path, pivots={"פיבוט פרטי": private})
+    assert ok
+
+    ws = load_workbook(path)["לפי סוכן"]
+    assert _row(ws, "אמנון ידידי", "שוק פרטי")[5:11] == [10, 5, 0, 2.5, 0, 0]
+    assert _row(ws, "יואב מימון", "שוק פרטי")[5:11] == [0] * 6
+
+
+def _fixture(path):
+    """פיבוטים (כולל NaN, קבוצה ריקה וסוכנים חסרים) + לשונית מנהל רשת ארצית עם שורת סכום."""
+    private = _pivot([
+        ["אמנון ידידי", 100, 40, 10, np.nan, 5, 1],
+        ["יואב מימון", np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],
+        ["חן בן דוד", 20.5, 3, 1, 2, 3, 4],
+        ["גילי סופר", 7, np.nan, 0, 0, 1, 0],
+        ["אריק יחזקאל", 9, 9, 9, 9, 9, 9],
+        ["לא ברשימה", 1, 1, 1, 1, 1, 1],
+    ])
+    tedmiti = _pivot([
+        ["יעל כץ", 50, 25, np.nan, 4, 3, 2],
+        ["אריק יחזקאל", 1, 2, 3, 4, 5, 6],
+    ])
+    wb = Workbook()
+    wb.active.title = "מעובד"
+    for name, df in (("פיבוט פרטי", private), ("פיבוט תדמיתי", tedmiti)):
+        ws = wb.create_sheet(name)
+        ws.append(list(df.columns))
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+            ws.append(list(row))
+    mgr = wb.create_sheet("ארז ביתן")
+    mgr.append(["מנהל סחר", "ערוץ", "c", "d", "e", "f", "g", TOTAL_KEY, TODAY_KEY] + MONTHS)
+    mgr.append(["ארז ביתן", "רשתות", None, None, None, None, None, 10, 4, 1, 2, 3, 4])
+    mgr.append(["ארז ביתן", "רשתות", None, None, None, None, None, 30, 6, 1, 1, 1, 1])
+    mgr.append(['סה"כ', None, None, None, None, None, None, "=SUM(H2:H3)", "=SUM(I2:I3)",
+                "=SUM(J2:J3)", "=SUM(K2:K3)", "=SUM(L2:L3)", "=SUM(M2:M3)"])
+    wb.save(path)
+    return {"פיבוט פרטי": private, "פיבוט תדמיתי": tedmiti}
+
+
+def test_single_pass_matches_old_chain(tmp_path):
+    old = str(tmp_path / "old.xlsx")
+    pivots = _fixture(old)
+    new = str(tmp_path / "new.xlsx")
+    shutil.copy(old, new)
+
+    assert build_by_agent_old_chain(old)
+    ok, _, nrows = build_by_agent_sheet_w90(new, pivots=pivots)
+    assert ok and nrows == 36
+
+    total, _, notes = compare_workbooks(old, new, sheets=["לפי סוכן"])
+    assert total == 0, notes
+    ws = load_workbook(new)["לפי סוכן"]
+    assert _row(ws, "יואב מימון", "שוק פרטי")[5:11] == [0] * 6
+    assert _row(ws, "ארז ביתן", "רשתות ארציות")[5] == "='ארז ביתן'!H4"
+
+
+def _manager_frame(rows: int = 3) -> pd.DataFrame:
+    cols = ["מנהל סחר", "ערוץ", "c", "d", "e", "f", "g", TOTAL_KEY, TODAY_KEY, MONTHS[0]]
+    return pd.DataFrame([["ארז ביתן", "רשתות", *[None] * 5, 10.0 * i, 1.0 * i, None] for i in range(1, rows + 1)],
+                        columns=cols)
+
+
+def test_national_link_uses_footer_row_of_pending_frame():
+    session = WorkbookSession.new(None, streaming=True)
+    frame = FrameSheet(_manager_frame())
+    frame.add_sum_footer(label_col=1, first_col=8, last_col=9)
+    write_frame_sheet(session, session.wb.create_sheet("ארז ביתן"), frame)
+    assert frame.footer_row(8) == 6  # 3 שורות נתונים, שורה ריקה, שורת הסכום
+
+    assert _manager_total_formula(session, session.wb, "ארז ביתן", 8) == "='ארז ביתן'!H6"
+    assert _manager_total_formula(session, session.wb, "ארז ביתן", 9) == "='ארז ביתן'!I6"
+    # לעמודה J אין תא בשורת הסכום – נשארים עם LOOKUP
+    assert _manager_total_formula(session, session.wb, "ארז ביתן", 10) == _lookup_last_formula("ארז ביתן", 10)
+
+
+def test_national_link_scans_plain_sheet_and_keeps_the_value():
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ארז ביתן"
+    for r, v in enumerate([10, 20, None, 30], start=2):
+        ws.cell(row=r, column=8, value=v)
+    ws["H7"] = "=SUM(H2:H5)"
+    link = _manager_total_formula("out.xlsx", wb, "ארז ביתן", 8)
+    assert link == "='ארז ביתן'!H7"
+    assert _manager_total_formula("out.xlsx", wb, "ארז ביתן", 9) == _lookup_last_formula("ארז ביתן", 9)
+
+    # אותו ערך כמו ה-LOOKUP של השרשרת הקודמת
+    summary = wb.create_sheet("לפי סוכן")
+    summary["F2"], summary["G2"] = link, _lookup_last_formula("ארז ביתן", 8)
+    calc = FormulaValues(wb)
+    assert calc.cached_value("לפי סוכן", 2, 6) == calc.cached_value("לפי סוכן", 2, 7) == 60
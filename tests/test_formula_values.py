@@ -0,0 +1,101 @@
+import os
+import stat
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+import Logic.formula_values as fv
+from Logic.formula_values import FormulaValues, save_session_with_values, write_cached_values
+from Logic.sheet_writer import FrameSheet, write_frame_sheet
+from Logic.workbook_session import WorkbookSession
+
+LOOKUP_LAST = """=LOOKUP(2,1/('נתונים'!H:H<>""),'נתונים'!H:H)"""
+
+
+def _book():
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "נתונים"
+    for r, v in enumerate([10, 20.5, 30], start=2):
+        ws.cell(row=r, column=8, value=v)
+    ws["H5"] = "=SUM(H2:H4)"
+    ws["I5"] = "=H5+H2"
+    ws["J5"] = "=IFERROR(H2/H6,0)"  # חלוקה בריק -> 0
+    ws["K5"] = "=H5-H2"
+    ws["L5"] = "=VLOOKUP(1,A:B,2,0)"  # צורה לא מוכרת
+    summary = wb.create_sheet("סיכום")
+    summary["A1"] = "='נתונים'!H5"
+    summary["B1"] = LOOKUP_LAST
+    loop = wb.create_sheet("מעגל")
+    loop["H2"], loop["H3"] = 1, 2
+    loop["H4"] = "=SUM(H2:H4)"  # הפניה מעגלית, כמו SUM(H2:H1490) בתוך H1490
+    return wb
+
+
+def test_evaluator_forms():
+    calc = FormulaValues(_book())
+    assert calc.cached_value("נתונים", 5, 8) == 60.5
+    assert calc.cached_value("נתונים", 5, 9) == 70.5
+    assert calc.cached_value("נתונים", 5, 10) == 0
+    assert calc.cached_value("נתונים", 5, 11) == 50.5
+    assert calc.cached_value("נתונים", 5, 12) is None
+    assert calc.cached_value("סיכום", 1, 1) == 60.5
+    assert calc.cached_value("סיכום", 1, 2) == 60.5  # התא האחרון שאינו ריק ב-H (הנוסחה ב-H5)
+
+
+def test_circular_sum_stays_unresolved():
+    values, unresolved = FormulaValues(_book()).collect()
+    assert "מעגל" not in values
+    assert unresolved == 2  # VLOOKUP + המעגל
+    assert values["נתונים"] == {(5, 8): 60.5, (5, 9): 70.5, (5, 10): 0, (5, 11): 50.5}
+
+
+def _session(path):
+    session = WorkbookSession.new(path, streaming=True)
+    df = pd.DataFrame({"סוכן": ["א", "ב", "ג"], "סכום": [1.5, 2, 3]})
+    frame = FrameSheet(df)
+    frame.add_sum_footer(label_col=1, first_col=2, last_col=2)
+    write_frame_sheet(session, session.wb.create_sheet("מנהל"), frame)
+    other = session.wb.create_sheet("סיכום")
+    other["A1"] = "='מנהל'!B6"
+    other["B1"] = "=A1+A1"
+    return session
+
+
+def test_values_written_in_the_single_save(tmp_path, monkeypatch):
+    def second_pass(*args, **kwargs):
+        raise AssertionError("the saved file was rewritten")
+
+    monkeypatch.setattr(fv, "write_cached_values", second_pass)
+    path = str(tmp_path / "out.xlsx")
+    filled, unresolved = save_session_with_values(_session(path))
+    assert (filled, unresolved) == (3, 0)
+
+    wb = load_workbook(path, data_only=True)
+    assert wb["מנהל"]["B6"].value == 6.5
+    assert (wb["סיכום"]["A1"].value, wb["סיכום"]["B1"].value) == (6.5, 13)
+    assert load_workbook(path)["סיכום"]["B1"].value == "=A1+A1"
+    with zipfile.ZipFile(path) as z:
+        assert b"fullCalcOnLoad" not in z.read("xl/workbook.xml")  # כל הנוסחאות קיבלו ערך
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+
+def test_values_only_writes_numbers(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    filled, _ = save_session_with_values(_session(path), values_only=True)
+    wb = load_workbook(path)
+    assert filled == 3
+    assert (wb["מנהל"]["B6"].value, wb["סיכום"]["B1"].value) == (6.5, 13)
+
+
+def test_write_cached_values_keeps_permissions(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    _session(path).save()
+    os.chmod(path, 0o640)
+    assert write_cached_values(path, {"סיכום": {(1, 1): 6.5}}) == 1
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert load_workbook(path, data_only=True)["סיכום"]["A1"].value == 6.5
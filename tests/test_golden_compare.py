@@ -0,0 +1,68 @@
+import pytest
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill
+
+from Logic.golden_compare import compare_workbooks
+from pipeline.compare_outputs import main
+
+
+def _book(path, value=12.5, bold=False, fill=None, width=None, merge=False, extra_sheet=False) -> str:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "מעובד"
+    ws.append(["סוכן", "סכום"])
+    ws.append(["יעל כץ", value])
+    ws.append(["סה\"כ", "=SUM(B2:B2)"])
+    ws["A1"].font = Font(bold=bold)
+    if fill:
+        ws["B2"].fill = PatternFill("solid", start_color=fill)
+    if width:
+        ws.column_dimensions["A"].width = width
+    if merge:
+        ws.merge_cells("A5:B5")
+    if extra_sheet:
+        wb.create_sheet("לפי סוכן")
+    wb.save(path)
+    return str(path)
+
+
+def _rc(capsys, *argv) -> int:
+    rc = main([str(a) for a in argv])
+    capsys.readouterr()
+    return rc
+
+
+def test_identical_and_value_difference(tmp_path, capsys):
+    golden = _book(tmp_path / "golden.xlsx")
+    assert _rc(capsys, golden, _book(tmp_path / "same.xlsx")) == 0
+
+    changed = _book(tmp_path / "changed.xlsx", value=13)
+    assert main([golden, changed]) == 1
+    assert "מעובד!B2 [ערך]: 12.5 | 13" in capsys.readouterr().out
+    # גם --ignore-style ו---float-tol קטן לא מסתירים הבדל ערך אמיתי
+    assert _rc(capsys, golden, changed, "--ignore-style", "--float-tol", "1e-6") == 1
+
+
+def test_ignore_style_suppresses_only_style(tmp_path, capsys):
+    golden = _book(tmp_path / "golden.xlsx")
+    styled = _book(tmp_path / "styled.xlsx", bold=True, fill="FFFF00", width=30)
+    total, results, _ = compare_workbooks(golden, styled)
+    assert total == 3 and {d.kind for d in results[0].shown} == {"font", "fill", "רוחב עמודה"}
+    assert _rc(capsys, golden, styled) == 1
+    assert _rc(capsys, golden, styled, "--ignore-style") == 0
+
+    # מיזוגים וגיליונות חסרים הם מבנה, לא עיצוב
+    assert _rc(capsys, golden, _book(tmp_path / "merged.xlsx", merge=True), "--ignore-style") == 1
+    assert _rc(capsys, golden, _book(tmp_path / "extra.xlsx", extra_sheet=True), "--ignore-style") == 1
+
+
+@pytest.mark.parametrize("value,tol,rc", [
+    (12.5 + 1e-9, 0.0, 1),
+    (12.5 + 1e-9, 1e-6, 0),
+    (12.5 - 1e-7, 1e-6, 0),
+    (12.5 + 1e-3, 1e-6, 1),
+])
+def test_float_tol(tmp_path, capsys, value, tol, rc):
+    golden = _book(tmp_path / "golden.xlsx")
+    candidate = _book(tmp_path / "candidate.xlsx", value=value)
+    assert _rc(capsys, golden, candidate, "--float-tol", tol) == rc
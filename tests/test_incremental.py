@@ -0,0 +1,66 @@
+import json
+
+import openpyxl
+
+from Logic.golden_compare import compare_workbooks
+from Logic.run_manifest import MANIFEST_NAME, RunManifest
+from pipeline.gen_qs import QSProfile, generate_qs
+from pipeline.run_stage1 import Stage1Config, run_stage1
+
+CHANGED = "מנהל 3"
+
+
+def _run(path, out_dir, **flags):
+    config = Stage1Config(str(path), output_dir=str(out_dir), drop_empty=True, split_by_manager=True, **flags)
+    return run_stage1(config).output_path
+
+
+def _change_manager(src, dst):
+    # רק הסכומים של מנהל אחד משתנים – שאר לשוניות המנהלים זהות לפלט הקודם
+    wb = openpyxl.load_workbook(src)
+    ws = wb.worksheets[0]
+    changed = 0
+    for row in ws.iter_rows(min_row=2):
+        if row[0].value == CHANGED:
+            for cell in row[8:]:
+                if isinstance(cell.value, (int, float)):
+                    cell.value += 1
+                    changed += 1
+    wb.save(dst)
+    return changed
+
+
+def test_incremental_matches_full_rebuild(tmp_path, capsys):
+    (tmp_path / "v1").mkdir()
+    (tmp_path / "v2").mkdir()
+    qs = tmp_path / "v1" / "QS.xlsx"
+    generate_qs(str(qs), QSProfile(rows=600, managers=4, seed=3))
+    _run(qs, tmp_path / "inc", incremental=True)  # אין פלט קודם: הכול נכתב, החתימות נשמרות
+    changed_qs = tmp_path / "v2" / "QS.xlsx"
+    assert _change_manager(qs, changed_qs) > 0
+
+    capsys.readouterr()
+    incremental = _run(changed_qs, tmp_path / "inc", incremental=True)
+    log = capsys.readouterr().out
+    full = _run(changed_qs, tmp_path / "full")
+
+    line = next(l for l in log.splitlines() if "[incremental] לשוניות מנהלים" in l)
+    assert line.endswith(f"1 נכתבו מחדש ({CHANGED})")
+    total, _, notes = compare_workbooks(incremental, full)
+    assert total == 0, notes
+    assert openpyxl.load_workbook(incremental).sheetnames == openpyxl.load_workbook(full).sheetnames
+
+
+def test_digests_only_with_incremental(tmp_path):
+    qs = tmp_path / "QS.xlsx"
+    generate_qs(str(qs), QSProfile(rows=300, managers=3, seed=4))
+    plain = run_stage1(Stage1Config(str(qs), output_dir=str(tmp_path / "out"), drop_empty=True,
+                                    split_by_manager=True))
+    assert "sheet_digest" not in [s.name for s in plain.run_report.stages]
+    with open(tmp_path / "out" / MANIFEST_NAME, encoding="utf-8") as f:
+        assert all("parts" not in entry for entry in json.load(f).values())
+
+    inc = run_stage1(Stage1Config(str(qs), output_dir=str(tmp_path / "out"), drop_empty=True,
+                                  split_by_manager=True, incremental=True, force=True))
+    assert "sheet_digest" in [s.name for s in inc.run_report.stages]
+    assert RunManifest(str(tmp_path / "out")).latest_with_parts()["output"] == inc.output_path
@@ -0,0 +1,40 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from Logic.run_report import _MB, MemoryBudgetExceeded, RunReport, rss_bytes
+
+
+def _current_mb() -> float:
+    rss, peak = rss_bytes()
+    return (rss if rss is not None else peak) / _MB
+
+
+def test_budget_stops_the_stage_while_it_runs():
+    report = RunReport("t", budget_mb=_current_mb() + 64, watch_interval=0.01)
+    finished, blocks = False, []
+    t0 = time.perf_counter()
+    with pytest.raises(MemoryBudgetExceeded) as e:
+        with report.stage("grow"):
+            blocks.append(np.ones(256 * _MB // 8))  # נכתב בפועל – נכנס ל-RSS
+            while time.perf_counter() - t0 < 10:
+                time.sleep(0.01)
+            finished = True
+    assert not finished and time.perf_counter() - t0 < 10
+    assert e.value.stage == "grow" and e.value.peak_mb > e.value.budget_mb
+    assert report.stages[-1].status == "over_budget"
+    assert not any(t.name == "rss-watchdog" for t in threading.enumerate())
+
+
+def test_stage_under_budget_and_ctrl_c_pass_through():
+    report = RunReport("t", budget_mb=_current_mb() + 4096, watch_interval=0.01)
+    with report.stage("small") as st:
+        time.sleep(0.05)
+        st.rows_out = 1
+    with pytest.raises(KeyboardInterrupt):
+        with report.stage("interrupted"):
+            raise KeyboardInterrupt
+    assert [s.status for s in report.stages] == ["ok", "error"]
+    assert not any(t.name == "rss-watchdog" for t in threading.enumerate())
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Logic.w25_normalize_numeric_columns import _normalize_column, _to_number, normalize_numeric_columns_report
+
+STRINGS = ["1,234.50", "(12.5)", "₪ 99", "-7", "1.2.3", "abc", "", "-", "  ", "( )", "12-3", "0.5%", ".5", "5."]
+COLUMNS = {
+    "strings": STRINGS * 3,
+    "with_blanks": ["10", None, np.nan, "x", "(3)", None],
+    "ints": [1, -2, 0, 40],
+    "floats": [1.5, np.nan, 1e20, 1e-5, -0.0, np.inf, 123456.789],
+    "mixed": [1, 2.5, "3", True, None, np.int64(7), np.float64(1e17), "שלום", pd.NaT],
+    "all_bad": ["א", "ב", None],
+    "bools": [True, False],
+    "empty": [],
+}
+
+
+def _old(col: pd.Series):
+    """המסלול המקורי: apply(_to_number), וכשל = תא לא ריק (לא '' / '-') ש-_to_number לא פענח."""
+    failures = sum(1 for v in col if not pd.isna(v) and str(v).strip() not in ("", "-") and _to_number(v) is None)
+    return col.apply(_to_number), failures
+
+
+@pytest.mark.parametrize("name", list(COLUMNS))
+def test_normalize_column_matches_to_number(name):
+    col = pd.Series(COLUMNS[name], name=name, dtype=object if name in ("empty", "strings") else None)
+    got, failed = _normalize_column(col)
+    expected, expected_failed = _old(col)
+    pd.testing.assert_series_equal(got, expected)
+    assert failed == expected_failed
+
+
+def test_report_counts_failures_per_column():
+    df = pd.DataFrame({"a": ["1", "x", "", "(2)"], "b": [1.0, 2.0, None, 3.0], "c": ["y", "z", "-", None]})
+    out, failures = normalize_numeric_columns_report(df, ["a", "b", "c", "חסר"])
+    assert failures == {"a": 1, "b": 0, "c": 2}
+    pd.testing.assert_frame_equal(out, df.apply(lambda c: c.apply(_to_number)))
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import Logic.w10_load_and_unmerge as w10
+
+
+def _qs(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "sheet1"
+    # עמודה H: בלי כותרת, רק תאריכים וריקים
+    ws.append(["מנהל סחר", "מנהל אזור", "סוכן", "ערוץ", "תאריך", "סכום", "NA", None, "הערה"])
+    rows = [
+        ["דני", "צפון", "סוכן 1", "פרטי", datetime(2025, 1, 5), 10, "x", datetime(2025, 1, 6), None],
+        [None, None, "סוכן 2", "פרטי", None, 2.5, "NA", None, ""],
+        [None, "דרום", "סוכן 3", "תדמיתי", datetime(2025, 2, 1), 0, None, datetime(2025, 2, 2), "#N/A"],
+        ["רונית", None, "סוכן 4", "פרטי", None, -3, "n/a", None, None],
+        [None, None, None, None, None, None, None, None, None],
+        ["רונית", "מרכז", "סוכן 5", "יצוא", datetime(2025, 3, 9, 12, 30), 7, None, None, "סוף"],
+    ]
+    for row in rows:
+        ws.append(row)
+    ws.merge_cells("A2:A4")  # דני על שלוש שורות
+    ws.merge_cells("B3:B4")  # ריק ממוזג
+    ws.merge_cells("A5:A6")
+    ws.merge_cells("C6:D7")  # טווח שכולל את השורה הריקה
+    other = wb.create_sheet("אחר")
+    other.append(["a", "b", "c", "d", "e"])
+    wb.save(path)
+    return path
+
+
+def _old_path(path, tmp_dir, sheet="sheet1"):
+    tmp = w10.load_and_unmerge(str(path), sheet_hint=sheet, temp_out_dir=str(tmp_dir))
+    return pd.read_excel(tmp, sheet_name=sheet, header=None, dtype=object)
+
+
+@pytest.fixture
+def qs(tmp_path):
+    return _qs(tmp_path / "QS.xlsx")
+
+
+def test_single_pass_matches_temp_file_path(qs, tmp_path):
+    name, raw, row1 = w10.read_sheet_unmerged(str(qs), sheet_hint="sheet1", sheet_name="sheet1")
+    expected = _old_path(qs, tmp_path)
+    assert name == "sheet1"
+    assert (raw.dtypes == object).all()
+    pd.testing.assert_frame_equal(raw, expected)
+    assert type(raw.iloc[1, 7]) is datetime and raw.iloc[2, 7] is not pd.NaT
+    assert row1[:3] == ["מנהל סחר", "מנהל אזור", "סוכן"]
+
+
+def test_header_names_from_blank_date_column(qs, tmp_path):
+    from Logic.w15_detect_header import frame_from_raw
+    fast = frame_from_raw(w10.read_sheet_unmerged(str(qs), sheet_name="sheet1")[1])
+    old = frame_from_raw(_old_path(qs, tmp_path))
+    assert list(fast.columns) == list(old.columns)
+    assert "nan" in fast.columns and "NaT" not in fast.columns
+
+
+def test_fallback_without_private_api(qs, tmp_path, monkeypatch):
+    expected = w10.read_sheet_unmerged(str(qs), sheet_name="sheet1")
+    monkeypatch.setattr(w10, "WorkSheetParser", None)
+    name, raw, row1 = w10.read_sheet_unmerged(str(qs), sheet_name="sheet1")
+    assert name == expected[0]
+    pd.testing.assert_frame_equal(raw, expected[1])
+    assert row1[:len(expected[2])] == expected[2]
+
+
+def test_row1_comes_from_first_sheet(qs, tmp_path, monkeypatch):
+    # כמו במקור: כותרות O..T נלקחות משורה 1 של הגיליון הראשון גם כשנקרא גיליון אחר
+    name, raw, row1 = w10.read_sheet_unmerged(str(qs), sheet_name="אחר")
+    assert name == "אחר" and raw.iloc[0].tolist() == ["a", "b", "c", "d", "e"]
+    assert row1[:3] == ["מנהל סחר", "מנהל אזור", "סוכן"]
+    monkeypatch.setattr(w10, "WorkSheetParser", None)
+    assert w10.read_sheet_unmerged(str(qs), sheet_name="אחר")[2][:3] == row1[:3]
@@ -0,0 +1,85 @@
+import pickle
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Border, PatternFill, Side
+
+from Logic.golden_compare import compare_workbooks
+from Logic.report_dag import ReportNode, SheetPart, run_report_dag
+from Logic.run_report import RunReport
+from Logic.sheet_writer import FrameSheet, write_frame_sheet
+from Logic.workbook_session import WorkbookSession
+
+
+def _build_ok(session, df):
+    # גיליון FrameSheet – השמירה עוברת במסלול ה-streaming (stream_sheet) גם לשאר הגיליונות
+    write_frame_sheet(session, session.wb.create_sheet("טוב"), FrameSheet(df))
+
+
+def _build_failing(session, df):
+    # כמו הבונים ב-run_stage1: השגיאה נתפסת ומודפסת, והצומת מחזיר False
+    try:
+        raise ValueError("Cannot convert <NA> to Excel")
+    except Exception as e:
+        print(f"שגיאה: {e}", flush=True)
+        return False
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_node_is_recorded_as_error(workers):
+    session = WorkbookSession.new(None, streaming=True)
+    report = RunReport()
+    nodes = [ReportNode("טוב", _build_ok, inputs=("df",)), ReportNode("נכשל", _build_failing, inputs=("df",))]
+    added = run_report_dag(session, nodes, {"df": pd.DataFrame({"a": [1, 2]})}, workers=workers, report=report)
+    status = {s.name: s.status for s in report.stages}
+    assert status == {"report:טוב": "ok", "report:נכשל": "error"}
+    assert added == {"טוב": ["טוב"], "נכשל": []}
+
+
+def _build_layout(session, df):
+    ws = session.wb.create_sheet("פריסה")
+    ws.append(["קבוצה", "", "סכום"])
+    for i, v in enumerate(df["a"], start=2):
+        ws.append([f"ק{i}", None, v])
+    ws.merge_cells("A1:B1")
+    ws["A1"].border = Border(bottom=Side(style="thin"))
+    ws["B1"].border = Border(bottom=Side(style="thin"))
+    ws.row_dimensions[1].height = 30
+    ws.column_dimensions["C"].width = 18
+    ws.auto_filter.ref = "A1:C3"
+    ws.conditional_formatting.add("C2:C3", CellIsRule(operator="lessThan", formula=["0"],
+                                                      fill=PatternFill(start_color="FFC7CE", fill_type="solid")))
+    ws.freeze_panes = "A2"
+    ws.sheet_view.rightToLeft = True
+
+
+def test_sheet_part_keeps_layout():
+    src = WorkbookSession.new(None, streaming=True)
+    _build_layout(src, pd.DataFrame({"a": [1, -2]}))
+    part = pickle.loads(pickle.dumps(SheetPart(src["פריסה"])))
+    dst = WorkbookSession.new(None, streaming=True)
+    ws = part.add_to(dst)
+    assert [str(r) for r in ws.merged_cells.ranges] == ["A1:B1"]
+    assert ws.row_dimensions[1].height == 30 and ws.column_dimensions["C"].width == 18
+    assert ws.auto_filter.ref == "A1:C3"
+    assert [str(cf.sqref) for cf in ws.conditional_formatting] == ["C2:C3"]
+    assert ws["B1"].border.bottom.style == "thin"
+
+
+def test_workers_match_sequential_output(tmp_path):
+    data = {"df": pd.DataFrame({"a": [1, -2]})}
+    nodes = [ReportNode("טוב", _build_ok, inputs=("df",)), ReportNode("פריסה", _build_layout, inputs=("df",))]
+    paths = []
+    for workers in (1, 2):
+        path = str(tmp_path / f"w{workers}.xlsx")
+        session = WorkbookSession.new(path, streaming=True)
+        run_report_dag(session, nodes, data, workers=workers)
+        session.save()
+        paths.append(path)
+    total, _, notes = compare_workbooks(*paths)
+    assert total == 0, notes
+    ws = load_workbook(paths[1])["פריסה"]
+    assert [str(r) for r in ws.merged_cells.ranges] == ["A1:B1"] and ws.auto_filter.ref == "A1:C3"
+    assert ws.row_dimensions[1].height == 30 and len(list(ws.conditional_formatting)) == 1
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Logic.row_rules import apply_row_rules
+from Logic.w27_drop_empty_rows import drop_empty_rows
+from Logic.w50_remove_summary_rows import remove_summary_rows
+from Logic.w52_normalize_agent_code import normalize_agent_code
+from Logic.w55_remove_export_channel import remove_export_channel
+from Logic.w60_remove_other_rows import remove_other_rows
+from pipeline.run_stage1 import AGENT_NAME_MAP, BAD_AGENTS, Stage1Config, _row_rules
+
+COLUMNS = ["מנהל סחר", "סוכן", "ערוץ", "קוד סוכן", "קוד לקוח קצה", "לקוח קצה", "סכום"]
+ROWS = [
+    ["דני", "יעל כץ מלונות", "פרטי", "123", 5, "לקוח", 10.0],
+    ["דני", " סוכן 2 ", " ייצוא ", "124", 6, "לקוח", 1.0],
+    ["דני", "סוכן 3", "פרטי", 'סה"כ', None, None, 50.0],
+    ["רונית", "חובות  מסופקים", "פרטי", "125", 7, "לקוח", 2.0],
+    ["אחר", "סוכן 4", "פרטי", "126", 8, "לקוח", 3.0],
+    ["רונית", "אחר אחר", "פרטי", "127", 9, "לקוח", 4.0],
+    [None, None, None, None, None, None, None],  # 'סוכן' הופך ל-'None' – לא ריקה, רק בלי מזהים
+    ["", "  ", None, " ", None, "", None],
+    ["רונית", "סוכן 5", "פרטי", None, None, "  ", 6.0],
+    ["רונית", "סוכן 6", "פרטי", "AB-12", 10, "לקוח", 7.0],
+    ["רונית", "סוכן 7", "פרטי", "---", 11, "לקוח", 8.0],
+    ["רונית", "סוכן 8", "תדמיתי", "אחר", 12, "לקוח", 9.0],
+    ["רונית", "יעל כץ תדמיתי", "תדמיתי", "abc", 13, "לקוח", np.nan],
+    ["רונית", "סוכן 9", "פרטי", "Total", 14, "לקוח", 1.5],
+]
+
+
+def _stages(df: pd.DataFrame, keep_other: bool, drop_empty: bool):
+    """השרשרת המקורית של run_stage1: כל שלב מעתיק ומסנן בתורו. מחזיר (df, ספירות לפי שם כלל)."""
+    counts = {}
+    df, counts["export_channel"] = remove_export_channel(df, col="ערוץ")
+    df, counts["summary_rows"] = remove_summary_rows(df, col="קוד סוכן")
+    df["סוכן"] = df["סוכן"].astype(str).str.strip().replace(AGENT_NAME_MAP)
+    bad = df["סוכן"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip().isin(BAD_AGENTS)
+    counts["bad_agents"] = int(bad.sum())
+    df = df[~bad]
+    df, _ = normalize_agent_code(df, col="קוד סוכן")
+    if not keep_other:
+        df, counts["other_rows"] = remove_other_rows(df, cols=["מנהל סחר", "סוכן"])
+    if drop_empty:
+        df, counts["empty_rows"], counts["missing_ids"] = drop_empty_rows(
+            df, required_any=["קוד סוכן", "קוד לקוח קצה", "לקוח קצה"])
+    s = df["קוד סוכן"].astype("string").str.strip()
+    # קוד שהתרוקן בנירמול (NA) נמחק גם במקור; כאן הוא גם נספר
+    keep = (s.str.fullmatch(r"\d+") | s.isin(["אחר"])).fillna(False).astype(bool)
+    counts["agent_code_format"] = int((~keep).sum())
+    return df[keep].reset_index(drop=True), counts
+
+
+@pytest.mark.parametrize("keep_other,drop_empty", [(False, True), (True, True), (False, False)])
+def test_rules_match_stage_by_stage(keep_other, drop_empty, capsys):
+    df = pd.DataFrame(ROWS, columns=COLUMNS, dtype=object)
+    args = Stage1Config(None, keep_other=keep_other, drop_empty=drop_empty)
+    rules, step = _row_rules(args, COLUMNS, 1, 20)
+    got, counts = apply_row_rules(df.copy(), rules)
+    expected, expected_counts = _stages(df.copy(), keep_other, drop_empty)
+
+    pd.testing.assert_frame_equal(got, expected)
+    assert counts == expected_counts
+    assert step == 1 + 5 + (not keep_other) + drop_empty
+    assert f"הוסרו {counts['agent_code_format']} שורות שאינן ספרתיות" in capsys.readouterr().out
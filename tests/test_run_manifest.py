@@ -0,0 +1,44 @@
+import json
+import os
+
+import openpyxl
+
+from Logic.run_manifest import MANIFEST_NAME
+from pipeline.gen_qs import QSProfile, generate_qs
+from pipeline.run_stage1 import Stage1Config, run_stage1
+
+
+def _run(qs, out_dir, **flags):
+    return run_stage1(Stage1Config(str(qs), output_dir=str(out_dir), drop_empty=True, **flags))
+
+
+def test_manifest_round_trip(tmp_path):
+    qs = tmp_path / "QS.xlsx"
+    generate_qs(str(qs), QSProfile(rows=300, seed=5))
+    out_dir = tmp_path / "out"
+
+    first = _run(qs, out_dir)
+    assert first.skipped is None and first.session is not None
+
+    # אותו QS, אותם דגלים – אין ריצה, הפלט הקודם חוזר
+    again = _run(qs, out_dir)
+    assert again.skipped is not None and again.session is None
+    assert again.skipped["output"] == first.output_path
+    assert os.path.samefile(again.output_path, first.output_path)
+    assert again.rows == len(first.processed)
+
+    # הפלט נפתח ונשמר (כמו ב-Excel) – הרשומה כבר לא תקפה, ריצה מלאה
+    wb = openpyxl.load_workbook(first.output_path)
+    wb.active["A1"] = "נערך"
+    wb.save(first.output_path)
+    rejected = _run(qs, out_dir)
+    assert rejected.skipped is None and rejected.session is not None
+
+    # הרשומה עודכנה לפלט החדש, ו---force מריץ בכל זאת
+    assert _run(qs, out_dir).skipped is not None
+    forced = _run(qs, out_dir, force=True)
+    assert forced.skipped is None and forced.session is not None
+    with open(out_dir / MANIFEST_NAME, encoding="utf-8") as f:
+        entries = json.load(f)
+    assert len(entries) == 1
+    assert list(entries.values())[0]["output"] == forced.output_path
@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+
+import openpyxl
+import pandas as pd
+
+from Logic.run_manifest import MANIFEST_NAME
+from pipeline.gen_qs import QSProfile, generate_qs
+from pipeline.run_stage1 import Stage1Config, run_stage1
+
+REPORTS = dict(drop_empty=True, split_by_manager=True, pivot_private=True, pivot_tedmiti=True, by_agent=True)
+
+
+def _files(root) -> list:
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, files in os.walk(root) for f in files)
+
+
+def test_bytes_input_writes_no_files(tmp_path, monkeypatch):
+    qs = tmp_path / "src" / "QS.xlsx"
+    qs.parent.mkdir()
+    generate_qs(str(qs), QSProfile(rows=300, managers=3, seed=8))
+    data = qs.read_bytes()
+    work, temp = tmp_path / "cwd", tmp_path / "tmp"
+    work.mkdir()
+    temp.mkdir()
+    monkeypatch.chdir(work)
+    monkeypatch.setattr(tempfile, "tempdir", str(temp))
+    before = _files(tmp_path)
+
+    result = run_stage1(Stage1Config(data, return_xlsx=True, **REPORTS))
+
+    assert _files(tmp_path) == before  # לא בתיקייה הנוכחית, לא ליד ה-QS, לא מטמון ולא קובץ זמני שנשאר
+    assert result.output_path is None and result.skipped is None and result.run_report.path is None
+    assert isinstance(result.xlsx, io.BytesIO)
+    wb = openpyxl.load_workbook(result.xlsx, read_only=True)
+    assert wb.sheetnames[0] == "מעובד" and "לפי סוכן" in wb.sheetnames
+    assert sorted(result.reports) == sorted(wb.sheetnames[1:])
+    assert result.rows == len(result.processed) > 0
+
+
+def test_skipped_run_result_matches_the_original(tmp_path):
+    qs = tmp_path / "QS.xlsx"
+    generate_qs(str(qs), QSProfile(rows=300, managers=3, seed=9))
+    out_dir = tmp_path / "out"
+    first = run_stage1(Stage1Config(str(qs), output_dir=str(out_dir), **REPORTS))
+    report_mtime = os.path.getmtime(first.run_report.path)
+
+    again = run_stage1(Stage1Config(str(qs), output_dir=str(out_dir), reuse="report", return_xlsx=True, **REPORTS))
+
+    assert again.session is None and again.skipped is not None
+    assert again.skipped["output"] == again.output_path == first.output_path
+    assert again.run_report.path is None and os.path.getmtime(first.run_report.path) == report_mtime
+    assert [s.name for s in again.run_report.stages] == ["manifest_lookup", "reuse_output"]
+    # rows מה-manifest, processed / reports מקובץ הפלט – אותם מספרים כמו בריצה המקורית
+    assert again.rows == again.skipped["rows"] == first.rows == len(again.processed)
+    pd.testing.assert_frame_equal(again.processed, first.processed.reset_index(drop=True), check_dtype=False)
+    assert sorted(again.reports) == sorted(first.reports)
+    with open(first.output_path, "rb") as f:
+        assert again.xlsx.getvalue() == f.read()
+    assert sorted(os.listdir(out_dir)) == sorted(
+        [os.path.basename(first.output_path), os.path.basename(first.run_report.path), MANIFEST_NAME, "_cache"])
@@ -1,8 +1,24 @@
 def test_imports():
     import Logic.headers_stage1 as h
     from Logic.w10_load_and_unmerge import load_and_unmerge
-    from Logic.w15_detect_header import detect_header_and_frame
+    from Logic.w15_detect_header import detect_header_and_frame, ingest_qs
     from Logic.w20_select_columns import select_and_order_columns
+    from Logic.w25_normalize_numeric_columns import normalize_numeric_columns_report
+    from Logic.row_rules import ColumnRule, RowRule, apply_row_rules
     from Logic.w30_add_sum_rows import append_sum_rows
     from Logic.w40_finalize_save import save_processed
+    from Logic.agg_cube import AggCube, cube_for
+    from Logic.formula_values import FormulaValues, save_session_with_values
+    from Logic.report_dag import ReportNode, run_report_dag
+    from Logic.run_report import MemoryBudgetExceeded, RunReport, rss_bytes
+    from Logic.stage_profile import StageProfiler, folded_stacks
+    from Logic.golden_compare import compare_workbooks
+    from Logic.run_manifest import RunManifest, reuse_output, run_key
+    from Logic.sheet_parts import SheetPartCopy, sheet_digest
+    from Logic.workbook_session import WorkbookSession, load_book, save_book
+    from Logic.sheet_writer import FrameSheet, write_frame_sheet
+    from pipeline.run_stage1 import Stage1Config, run_stage1
+    from pipeline.gen_qs import QSProfile, generate_qs
+    from pipeline.bench_stage1 import compare, run_bench
+    from pipeline.compare_outputs import main as compare_outputs_main
     assert isinstance(h.DESIRED_HEADERS, list)
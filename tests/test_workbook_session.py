@@ -0,0 +1,36 @@
+import pytest
+
+from Logic.workbook_session import WorkbookSession
+
+
+def _session() -> WorkbookSession:
+    session = WorkbookSession.new(None)
+    for name in ("מעובד", "שוק פרטי", "פיבוט פרטי"):
+        session.wb.create_sheet(name)["A1"] = name
+    return session
+
+
+def test_isolate_restores_created_deleted_and_replaced_sheets():
+    session = _session()
+    original = session["שוק פרטי"]
+    with pytest.raises(ValueError):
+        with session.isolate():
+            session.wb.create_sheet("חדש")
+            del session.wb["פיבוט פרטי"]
+            del session.wb["שוק פרטי"]
+            session.wb.create_sheet("שוק פרטי")["A1"] = "חצי"
+            raise ValueError("builder failed")
+
+    assert session.sheetnames == ["מעובד", "שוק פרטי", "פיבוט פרטי"]
+    assert session["שוק פרטי"] is original and original["A1"].value == "שוק פרטי"
+    assert session["פיבוט פרטי"]["A1"].value == "פיבוט פרטי"
+
+
+def test_isolate_keeps_in_place_edits_of_existing_sheets():
+    # המגבלה המתועדת: רק רשימת הלשוניות משוחזרת, לא התוכן שלהן
+    session = _session()
+    with pytest.raises(ValueError):
+        with session.isolate():
+            session["מעובד"]["A1"] = "נערך"
+            raise ValueError("builder failed")
+    assert session["מעובד"]["A1"].value == "נערך"